@@ -12,8 +12,10 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from django.core.management.utils import get_random_secret_key
 import sys
+import tempfile
 import dj_database_url
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,7 +25,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/3.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", get_random_secret_key())
+# A random key (development) invalidates sessions and signatures on restart,
+# aeronautica.settings_production requires DJANGO_SECRET_KEY
+SECRET_KEY = os.getenv("DJANGO_SECRET_KEY") or get_random_secret_key()
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DEBUG", "False") == "True"
@@ -59,6 +63,8 @@ INSTALLED_APPS = [
 ] + DRF_AUTH_APPS
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,8 +72,42 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.HashingPoolSaturatedMiddleware',
 ]
 
+# Per request instrumentation (core.middleware.RequestMetricsMiddleware):
+# Server-Timing header and a log line for a sample of the requests, and a
+# log of the REQUEST_METRICS_SLOW_SQL slowest queries (only those are kept
+# while a request runs) of requests slower than REQUEST_METRICS_SLOW_MS
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", "0"))
+REQUEST_METRICS_SLOW_MS = float(os.getenv("REQUEST_METRICS_SLOW_MS", "1000"))
+REQUEST_METRICS_SLOW_SQL = int(os.getenv("REQUEST_METRICS_SLOW_SQL", "5"))
+
+# Sampling profiler (core.middleware.ProfilerMiddleware): requests with a
+# signed X-Profile header and a sample of the others are profiled, staff
+# users download the collapsed stacks from /profiler/
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_DIR = os.getenv(
+    "PROFILER_DIR", os.path.join(tempfile.gettempdir(), "aeronautica-profiles"))
+PROFILER_KEEP = int(os.getenv("PROFILER_KEEP", "200"))
+PROFILER_SIGNATURE_MAX_AGE = int(os.getenv("PROFILER_SIGNATURE_MAX_AGE", "3600"))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.requests': {
+            'handlers': ['console'],
+            'level': os.getenv("REQUEST_METRICS_LOG_LEVEL", "INFO"),
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'aeronautica.urls'
 
 TEMPLATES = [
@@ -101,13 +141,21 @@ if DEVELOPMENT_MODE is True:
             "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
         }
     }
-elif len(sys.argv) > 0 and sys.argv[1] != 'collectstatic':
+elif sys.argv[1:2] != ['collectstatic']:
     if os.getenv("DATABASE_URL", None) is None:
         raise Exception("DATABASE_URL environment variable not defined")
     DATABASES = {
-        "default": dj_database_url.parse(os.environ.get("DATABASE_URL")),
+        "default": dj_database_url.parse(
+            os.environ.get("DATABASE_URL"),
+            conn_max_age=int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        ),
     }
 
+# Persistent connections are pinged before reuse when they were idle for
+# DB_CONN_HEALTH_CHECK_INTERVAL seconds, see core.db
+DB_CONN_HEALTH_CHECKS = os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True"
+DB_CONN_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_CONN_HEALTH_CHECK_INTERVAL", "30"))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -126,6 +174,21 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing pool, PBKDF2 runs in a process pool instead of the request
+# worker when PASSWORD_HASHING_POOL_SIZE is set. Requests are answered with 503
+# when more than PASSWORD_HASHING_QUEUE_DEPTH hashes are pending (0: unbounded).
+PASSWORD_HASHING_POOL_SIZE = int(os.getenv("PASSWORD_HASHING_POOL_SIZE", "0"))
+PASSWORD_HASHING_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASHING_QUEUE_DEPTH", "32"))
+PASSWORD_HASHING_TIMEOUT = float(os.getenv("PASSWORD_HASHING_TIMEOUT", "10"))
+
+if PASSWORD_HASHING_POOL_SIZE:
+    PASSWORD_HASHERS = [
+        'core.hashers.PooledPBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    ]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.1/topics/i18n/
@@ -168,18 +231,105 @@ REST_AUTH_SERIALIZERS = {'LOGIN_SERIALIZER': 'users.api.serializers.LoginSeriali
 
 SITE_ID = 1
 
+# The API encodes and decodes JSON with orjson (core.renderers, stdlib json
+# without it). The browsable API is only served with DEBUG or API_BROWSABLE,
+# form and multipart bodies are still parsed
+API_BROWSABLE = os.getenv("API_BROWSABLE", str(DEBUG)) == "True"
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'users.api.authentication.CachedTokenAuthentication',
+        'users.api.authentication.SignedAccessTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': ['core.renderers.FastJSONRenderer'] + (
+        ['rest_framework.renderers.BrowsableAPIRenderer'] if API_BROWSABLE else []),
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Django caches, per process unless SHARED_CACHE_BACKEND names a backend
+# shared by the workers (memcached, database...), added as 'shared'
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
 }
+if os.getenv("SHARED_CACHE_BACKEND"):
+    CACHES["shared"] = {
+        "BACKEND": os.getenv("SHARED_CACHE_BACKEND"),
+        "LOCATION": os.getenv("SHARED_CACHE_LOCATION", ""),
+    }
+
+# Current user / profile payload cache (see users.api.payloads), a per
+# process LRU in front of the shared cache when there is one
+PAYLOAD_CACHE_SIZE = int(os.getenv("PAYLOAD_CACHE_SIZE", "4096"))
+PAYLOAD_CACHE_LOCAL_TTL = int(os.getenv("PAYLOAD_CACHE_LOCAL_TTL", "60"))
+PAYLOAD_CACHE_ALIAS = os.getenv("PAYLOAD_CACHE_ALIAS", "shared" if "shared" in CACHES else None)
+PAYLOAD_CACHE_TTL = int(os.getenv("PAYLOAD_CACHE_TTL", "300"))
+PAYLOAD_CACHE_LOCK_TIMEOUT = float(os.getenv("PAYLOAD_CACHE_LOCK_TIMEOUT", "5"))
+
+# Token authentication cache, a per process LRU in front of a shared cache
+# (a CACHES alias). By default nothing is cached without the shared cache:
+# a logout or deactivation would not reach the other workers. With
+# TOKEN_AUTH_CACHE_LOCAL_ONLY=True the LRU alone is used, and the other
+# workers keep accepting a revoked token for TOKEN_AUTH_CACHE_LOCAL_TTL
+# seconds.
+TOKEN_AUTH_CACHE_SIZE = int(os.getenv("TOKEN_AUTH_CACHE_SIZE", "1024"))
+TOKEN_AUTH_CACHE_LOCAL_TTL = int(os.getenv("TOKEN_AUTH_CACHE_LOCAL_TTL", "30"))
+TOKEN_AUTH_CACHE_LOCAL_ONLY = os.getenv("TOKEN_AUTH_CACHE_LOCAL_ONLY", "False") == "True"
+TOKEN_AUTH_CACHE_ALIAS = os.getenv("TOKEN_AUTH_CACHE_ALIAS", "shared" if "shared" in CACHES else None)
+TOKEN_AUTH_CACHE_TTL = int(os.getenv("TOKEN_AUTH_CACHE_TTL", "300"))
+
+# Signed access tokens, when on rest-auth login returns short lived HS256
+# access tokens (verified without a query) and refresh tokens.
+# The revocation list needs a cache shared by all workers, the 'shared'
+# one by default (SHARED_CACHE_BACKEND); signed tokens refuse to start
+# without it.
+API_SIGNED_TOKENS = os.getenv("API_SIGNED_TOKENS", "False") == "True"
+SIGNED_TOKEN_SECRET = os.getenv("SIGNED_TOKEN_SECRET", None)
+SIGNED_TOKEN_ACCESS_LIFETIME = int(os.getenv("SIGNED_TOKEN_ACCESS_LIFETIME", "300"))
+SIGNED_TOKEN_REFRESH_LIFETIME = int(os.getenv("SIGNED_TOKEN_REFRESH_LIFETIME", "604800"))
+SIGNED_TOKEN_REVOCATION_CACHE = os.getenv("SIGNED_TOKEN_REVOCATION_CACHE", "shared")
+if API_SIGNED_TOKENS and SIGNED_TOKEN_REVOCATION_CACHE not in CACHES:
+    raise ImproperlyConfigured(
+        "API_SIGNED_TOKENS needs the SIGNED_TOKEN_REVOCATION_CACHE cache "
+        "shared by the workers, set SHARED_CACHE_BACKEND")
+
+# Admin changelists estimate (PostgreSQL) or cache counts of tables
+# larger than ADMIN_COUNT_THRESHOLD rows
+ADMIN_COUNT_THRESHOLD = int(os.getenv("ADMIN_COUNT_THRESHOLD", "10000"))
+ADMIN_COUNT_CACHE_TTL = int(os.getenv("ADMIN_COUNT_CACHE_TTL", "300"))
+
+# Admin profile list page size, clients may ask up to PROFILE_MAX_PAGE_SIZE
+PROFILE_PAGE_SIZE = int(os.getenv("PROFILE_PAGE_SIZE", "50"))
+PROFILE_MAX_PAGE_SIZE = int(os.getenv("PROFILE_MAX_PAGE_SIZE", "500"))
+# Most ids a profile batch request (profiles/batch/?ids=) may ask for
+PROFILE_BATCH_MAX_IDS = int(os.getenv("PROFILE_BATCH_MAX_IDS", "100"))
+# Most updates a bulk profile PATCH (profiles/bulk/) may carry
+PROFILE_BULK_MAX_ITEMS = int(os.getenv("PROFILE_BULK_MAX_ITEMS", "100"))
+# Rows fetched per round trip by the streaming profile export
+PROFILE_EXPORT_CHUNK_SIZE = int(os.getenv("PROFILE_EXPORT_CHUNK_SIZE", "2000"))
 
 ### EMAIL SETUP
+# Blocked domains, subdomains are blocked too (see core.domain_policy).
+# Large lists go to EMAIL_DOMAIN_BLACKLIST_FILE, reloaded when it changes.
 EMAIL_DOMAIN_BLACKLIST = ['hotmail.com', 'yahoo.com',
                           'yandex.com', 'mail.ru']
-
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_DOMAIN_BLACKLIST_FILE = os.getenv("EMAIL_DOMAIN_BLACKLIST_FILE", None)
+EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL = int(os.getenv("EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL", "5"))
+
+# Mail is queued in the database (core.mail) and sent by the
+# send_queued_email command through EMAIL_QUEUE_BACKEND
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "core.mail.QueuedEmailBackend")
+EMAIL_QUEUE_BACKEND = os.getenv("EMAIL_QUEUE_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_QUEUE_BATCH_SIZE = int(os.getenv("EMAIL_QUEUE_BATCH_SIZE", "100"))
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv("EMAIL_QUEUE_MAX_ATTEMPTS", "5"))
+EMAIL_QUEUE_RETRY_DELAY = int(os.getenv("EMAIL_QUEUE_RETRY_DELAY", "60"))
+EMAIL_QUEUE_CLAIM_TIMEOUT = int(os.getenv("EMAIL_QUEUE_CLAIM_TIMEOUT", "600"))
 EMAIL_HOST = os.environ.get('EMAIL_HOST')
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER_AERO')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD_AERO') 
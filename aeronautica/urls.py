@@ -65,6 +65,9 @@ web_user_urls = [
 urlpatterns = [
     path('', core_views.home_view, name='index'),
     path('admin/', admin.site.urls),
+    path('metrics/', core_views.metrics_view, name='metrics'),
+    path('profiler/', core_views.profiler_view, name='profiler'),
+    path('profiler/<str:name>', core_views.profiler_download_view, name='profiler-download'),
     path('api/user/', include('users.api.urls')),
     path('api-auth/', include('rest_framework.urls')),  # For browsable api page
 ] + web_user_urls 
@@ -0,0 +1,202 @@
+"""gunicorn sync workers against uvicorn (ASGI) at high concurrency
+
+Starts each server on a test database, then --concurrency clients send
+--requests GETs in total to the current user, own profile and admin
+profile endpoints (a new connection per request, gunicorn sync workers
+do not keep connections alive). gunicorn serves the sync views, uvicorn
+serves the async ones (users.api.async_views) and, for reference, the
+sync ones.
+
+    python -m benchmarks.asgi_vs_wsgi --workers 2 --concurrency 200
+
+Uses DATABASE_URL when set, a temporary SQLite file otherwise.
+"""
+import asyncio
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from core.models import Profile  # noqa: E402
+
+HOST = '127.0.0.1'
+
+
+def database_url(settings_dict):
+    if connection.vendor == 'sqlite':
+        return 'sqlite:///' + settings_dict['NAME']
+    return 'postgres://{}:{}@{}:{}/{}'.format(
+        quote(settings_dict['USER'] or ''), quote(settings_dict['PASSWORD'] or ''),
+        settings_dict['HOST'] or 'localhost', settings_dict['PORT'] or 5432,
+        settings_dict['NAME'])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port, workers):
+    if server == 'gunicorn':
+        return [
+            'gunicorn', 'aeronautica.wsgi', '--worker-class', 'sync',
+            '--workers', str(workers), '--bind', f'{HOST}:{port}',
+            '--log-level', 'warning',
+        ]
+    return [
+        'uvicorn', 'aeronautica.asgi:application', '--workers', str(workers),
+        '--host', HOST, '--port', str(port), '--log-level', 'warning',
+        '--no-access-log',
+    ]
+
+
+def start_server(server, port, workers, env):
+    if shutil.which(server) is None:
+        raise SystemExit(f'{server} is not installed')
+    process = subprocess.Popen(
+        server_command(server, port, workers), env=env, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise SystemExit(f'{server} exited with {process.returncode}')
+            time.sleep(0.2)
+    stop_server(process)
+    raise SystemExit(f'{server} did not start')
+
+
+def stop_server(process):
+    """Stops the server and its workers"""
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+async def fetch(port, request):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    return int(status_line.split()[1])
+
+
+async def load(port, path, token, concurrency, total):
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {HOST}\r\n'
+        f'Authorization: Token {token}\r\nConnection: close\r\n\r\n'
+    ).encode()
+    samples = []
+    errors = 0
+    remaining = total
+
+    async def client():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, request)
+            except (OSError, IndexError, ValueError):
+                errors += 1
+                continue
+            samples.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'errors': errors,
+        'requests_per_second': round(len(samples) / elapsed, 1),
+        'latency_ms': common.summary(samples) if samples else None,
+    }
+
+
+def main():
+    parser = common.parser(__doc__)
+    parser.add_argument('--workers', type=int, default=2, help='Server processes')
+    parser.add_argument('--concurrency', type=int, default=100, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per run')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    test_name = os.path.join(tmpdir, 'bench.sqlite3') if connection.vendor == 'sqlite' else None
+    results = []
+    try:
+        with common.test_database(test_name):
+            admin = get_user_model().objects.create_user(
+                email='admin@domain.com', first_name='Admin', last_name='Bench',
+                password=common.SEED_PASSWORD, is_staff=True)
+            token = Token.objects.create(user=admin).key
+            common.seed_users(max(args.sizes))
+            profile_id = Profile.objects.order_by('-id').values_list('id', flat=True)[0]
+
+            env = dict(
+                os.environ, DATABASE_URL=database_url(connection.settings_dict),
+                DJANGO_ALLOWED_HOSTS=HOST, DJANGO_SECRET_KEY='benchmark',
+                DJANGO_SETTINGS_MODULE='aeronautica.settings')
+            env.pop('DEVELOPMENT_MODE', None)
+            # the servers get their own connections
+            connection.close()
+
+            endpoints = {
+                'sync': {
+                    'current_user': reverse('users:current-user'),
+                    'own_profile': reverse('users:current-user-profile'),
+                    'admin_profile': reverse('users:profile-detail', args=[profile_id]),
+                },
+                'async': {
+                    'current_user': reverse('users:async-current-user'),
+                    'own_profile': reverse('users:async-current-user-profile'),
+                    'admin_profile': reverse('users:async-profile-detail', args=[profile_id]),
+                },
+            }
+            runs = [('gunicorn', 'sync'), ('uvicorn', 'async'), ('uvicorn', 'sync')]
+            for server, views in runs:
+                port = free_port()
+                process = start_server(server, port, args.workers, env)
+                try:
+                    for endpoint, path in endpoints[views].items():
+                        # warm up the workers
+                        asyncio.run(load(port, path, token, args.workers, args.workers * 5))
+                        result = asyncio.run(
+                            load(port, path, token, args.concurrency, args.requests))
+                        results.append(dict(
+                            server=server, views=views, endpoint=endpoint,
+                            workers=args.workers, concurrency=args.concurrency,
+                            **result))
+                finally:
+                    stop_server(process)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    common.report(results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Shared helpers of the benchmark scripts
+
+Scripts are run from the repository root, for example
+
+    python -m benchmarks.profile_list --sizes 1000,10000,50000
+
+They run against a throw-away test database created the same way
+manage.py test does (in-memory SQLite in DEVELOPMENT_MODE, or a
+test_<name> database next to DATABASE_URL) and print their results as
+JSON.
+"""
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Password hash shared by every seeded user, seeding must not run PBKDF2
+SEED_PASSWORD = 'Testing321..'
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aeronautica.settings')
+    if not os.environ.get('DATABASE_URL'):
+        os.environ.setdefault('DEVELOPMENT_MODE', 'True')
+    import django
+    django.setup()
+
+
+def parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--sizes', default='1000,10000',
+        type=lambda value: [int(size) for size in value.split(',')],
+        help='Comma separated table sizes')
+    parser.add_argument(
+        '--repeat', type=int, default=50, help='Samples per measurement')
+    return parser
+
+
+@contextmanager
+def test_database(test_name=None):
+    """test_name replaces the in-memory SQLite database with a file,
+        for benchmarks running servers in other processes
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    if test_name:
+        connection.settings_dict['TEST']['NAME'] = test_name
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+_password_hash = None
+
+
+def seed_users(count, start=0, batch_size=5000):
+    """Creates users user<start>..user<start+count-1>@domain.com with profiles
+        All of them share one SEED_PASSWORD hash.
+    """
+    global _password_hash
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from core.models import Profile
+    from core.search import search_text_for
+
+    User = get_user_model()
+    if _password_hash is None:
+        _password_hash = make_password(SEED_PASSWORD)
+
+    for offset in range(start, start + count, batch_size):
+        stop = min(offset + batch_size, start + count)
+        emails = [f'user{i}@domain.com' for i in range(offset, stop)]
+        User.objects.bulk_create([
+            User(email=email, first_name=f'First{i}', last_name=f'LAST{i}',
+                 password=_password_hash,
+                 search_text=search_text_for(email, f'First{i}', f'LAST{i}'))
+            for i, email in zip(range(offset, stop), emails)
+        ])
+        ids = User.objects.filter(email__in=emails).values_list('pk', flat=True)
+        Profile.objects.bulk_create([
+            Profile(user_id=pk, title='mr.', company=f'Company{pk % 100}',
+                    position='Engineer', country='Kyrat', city='SomeCity')
+            for pk in ids
+        ])
+
+
+def timed(func, repeat):
+    """Calls func repeat times, returns the durations in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summary(samples):
+    from core.metrics import percentiles
+    result = {
+        key: round(value, 3)
+        for key, value in percentiles(samples).items()
+    }
+    result['mean'] = round(sum(samples) / len(samples), 3)
+    return result
+
+
+@contextmanager
+def count_queries(connection):
+    """Yields a list whose length is the number of queries run in the block"""
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
+def report(results):
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,71 @@
+"""Requests per second with and without persistent connections
+
+Runs the own profile GET through the WSGI handler, so request_started /
+request_finished close or keep the connection exactly as in production,
+with CONN_MAX_AGE=0 (a new connection per request), persistent
+connections, and persistent connections pinged on every checkout.
+
+Needs DATABASE_URL pointing at a local PostgreSQL server, the in-memory
+SQLite test database is never closed by Django.
+"""
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from core import db  # noqa: E402
+
+MODES = [
+    ('no_reuse', 0, False),
+    ('persistent', 600, False),
+    ('persistent_ping_every_request', 600, True),
+]
+
+
+def main():
+    args = common.parser(__doc__).parse_args()
+    if connection.vendor == 'sqlite':
+        raise SystemExit('Set DATABASE_URL to a PostgreSQL database')
+    results = []
+    with common.test_database():
+        user = get_user_model().objects.create_user(
+            email='bench@domain.com', first_name='Bench', last_name='User',
+            password=common.SEED_PASSWORD)
+        token = Token.objects.create(user=user)
+        environ = RequestFactory().get(
+            reverse('users:current-user-profile'),
+            HTTP_AUTHORIZATION=f'Token {token.key}').environ
+        handler = WSGIHandler()
+
+        def request():
+            response = handler(dict(environ), lambda status, headers: None)
+            # sends request_finished
+            response.close()
+
+        for name, max_age, ping in MODES:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            with override_settings(
+                    DB_CONN_HEALTH_CHECKS=ping, DB_CONN_HEALTH_CHECK_INTERVAL=0):
+                request()
+                opened = db.connection_stats()['opened']
+                samples = common.timed(request, args.repeat)
+                opened = db.connection_stats()['opened'] - opened
+            results.append({
+                'mode': name,
+                'requests_per_second': round(1000 * len(samples) / sum(samples), 1),
+                'connections_opened': opened,
+                'request_ms': common.summary(samples),
+            })
+        connection.close()
+    common.report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""JSON encode / decode time of the API payloads, stdlib vs orjson
+
+Renders the UserDisplaySerializer payload of one user and the
+ProfileSerializerForAdmin payload of --sizes profiles (a list page holds
+PROFILE_PAGE_SIZE of them) with DRF's JSONRenderer and with
+core.renderers.FastJSONRenderer, then parses the list back with both
+parsers. Serialization itself is not timed, the data is built once.
+"""
+import io
+
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from core.models import Profile  # noqa: E402
+from core.renderers import FastJSONParser, FastJSONRenderer  # noqa: E402
+from users.api.serializers import ProfileSerializerForAdmin, UserDisplaySerializer  # noqa: E402
+
+
+def compare(name, data, repeat):
+    stdlib = JSONRenderer()
+    fast = FastJSONRenderer()
+    body = stdlib.render(data)
+    assert fast.render(data) == body, f'{name}: outputs differ'
+
+    encode = {
+        'stdlib': common.summary(common.timed(lambda: stdlib.render(data), repeat)),
+        'orjson': common.summary(common.timed(lambda: fast.render(data), repeat)),
+    }
+    decode = {
+        'stdlib': common.summary(common.timed(
+            lambda: JSONParser().parse(io.BytesIO(body)), repeat)),
+        'orjson': common.summary(common.timed(
+            lambda: FastJSONParser().parse(io.BytesIO(body)), repeat)),
+    }
+    return {
+        'payload': name,
+        'bytes': len(body),
+        'encode_ms': encode,
+        'encode_speedup': round(encode['stdlib']['mean'] / encode['orjson']['mean'], 1),
+        'decode_ms': decode,
+        'decode_speedup': round(decode['stdlib']['mean'] / decode['orjson']['mean'], 1),
+    }
+
+
+def main():
+    parser = common.parser(__doc__)
+    parser.set_defaults(sizes=[50, 500, 5000], repeat=200)
+    args = parser.parse_args()
+    results = []
+    with common.test_database():
+        common.seed_users(max(args.sizes))
+        user = get_user_model().objects.select_related('profile').first()
+        results.append(compare('user_display', UserDisplaySerializer(user).data, args.repeat))
+        for size in sorted(args.sizes):
+            profiles = Profile.objects.select_related('user').order_by('id')[:size]
+            data = ProfileSerializerForAdmin(profiles, many=True).data
+            results.append(dict(
+                compare('profile_list', data, args.repeat), profiles=size))
+    common.report(results)
+
+
+if __name__ == '__main__':
+    main()
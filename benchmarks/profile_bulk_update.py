@@ -0,0 +1,77 @@
+"""Throughput of the bulk profile PATCH vs one PATCH per profile
+
+Updates the position and city of --sizes profiles as an admin would:
+with N PATCH requests to profiles/<id>/ (UpdateModelMixin, one save()
+and transaction each) and with one PATCH to profiles/bulk/ carrying the
+N updates (one bulk_update in one transaction). Requests go through the
+test client, so the whole middleware stack runs. Reports milliseconds
+per batch, updates per second and queries per batch.
+"""
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from core.models import Profile  # noqa: E402
+
+
+def individual(client, ids, round_):
+    for pk in ids:
+        resp = client.patch(
+            reverse('users:profile-detail', args=[pk]),
+            {'position': f'Position{round_}', 'city': f'City{round_}'}, format='json')
+        assert resp.status_code == 200, resp.content
+
+
+def bulk(client, ids, round_):
+    resp = client.patch(reverse('users:profile-bulk'), [
+        {'id': pk, 'position': f'Position{round_}', 'city': f'City{round_}'} for pk in ids
+    ], format='json')
+    assert resp.status_code == 200, resp.content
+    assert all(item['status'] == 200 for item in resp.json()['results'])
+
+
+def measure(way, client, ids, connection, repeat):
+    rounds = iter(range(repeat + 1))
+    with common.count_queries(connection) as queries:
+        way(client, ids, next(rounds))
+    samples = common.timed(lambda: way(client, ids, next(rounds)), repeat)
+    stats = common.summary(samples)
+    return {
+        'ms': stats,
+        'updates_per_s': round(len(ids) / stats['mean'] * 1000),
+        'queries': len(queries),
+    }
+
+
+def main():
+    parser = common.parser(__doc__)
+    parser.set_defaults(sizes=[10, 50, 100], repeat=10)
+    args = parser.parse_args()
+    results = []
+    with common.test_database() as connection:
+        admin = get_user_model().objects.create_user(
+            email='admin@domain.com', first_name='Admin', last_name='Bench',
+            password=common.SEED_PASSWORD, is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        common.seed_users(max(args.sizes))
+        for size in sorted(args.sizes):
+            ids = list(Profile.objects.exclude(user=admin).order_by('id')
+                       .values_list('id', flat=True)[:size])
+            result = {
+                'updates': size,
+                'individual': measure(individual, client, ids, connection, args.repeat),
+                'bulk': measure(bulk, client, ids, connection, args.repeat),
+            }
+            result['speedup'] = round(
+                result['individual']['ms']['mean'] / result['bulk']['ms']['mean'], 1)
+            results.append(result)
+    common.report(results)
+
+
+if __name__ == '__main__':
+    main()
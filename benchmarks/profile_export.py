@@ -0,0 +1,60 @@
+"""Streaming profile export throughput and memory
+
+Consumes /api/user/profiles/export/ for every size and reports rows per
+second and the peak Python memory allocated while streaming, which
+should stay flat as the table grows.
+"""
+import time
+import tracemalloc
+
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+
+def consume(client, url, export_format):
+    resp = client.get(url, {'export_format': export_format})
+    lines = 0
+    for chunk in resp.streaming_content:
+        lines += chunk.count(b'\n')
+    return lines
+
+
+def main():
+    args = common.parser(__doc__).parse_args()
+    results = []
+    with common.test_database():
+        admin = get_user_model().objects.create_user(
+            email='admin@domain.com', first_name='Admin', last_name='Bench',
+            password=common.SEED_PASSWORD, is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        url = reverse('users:profile-export')
+
+        seeded = 0
+        for size in sorted(args.sizes):
+            common.seed_users(size - seeded, start=seeded)
+            seeded = size
+            for export_format in ('ndjson', 'csv'):
+                tracemalloc.start()
+                started = time.perf_counter()
+                lines = consume(client, url, export_format)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results.append({
+                    'size': size,
+                    'format': export_format,
+                    'lines': lines,
+                    'rows_per_second': round(size / elapsed),
+                    'peak_memory_kb': round(peak / 1024),
+                })
+    common.report(results)
+
+
+if __name__ == '__main__':
+    main()
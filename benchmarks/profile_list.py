@@ -0,0 +1,64 @@
+"""Admin profile list latency as the table grows
+
+Compares the cursor paginated endpoint (first page and a page deep in
+the table) with serializing the whole table the way the endpoint did
+before pagination (Profile.objects.all() + StringRelatedField).
+"""
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.pagination import Cursor  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from core.models import Profile  # noqa: E402
+from users.api.pagination import ProfileCursorPagination  # noqa: E402
+from users.api.serializers import ProfileSerializerForAdmin  # noqa: E402
+
+
+def deep_page_url(url, position):
+    paginator = ProfileCursorPagination()
+    paginator.base_url = url
+    return paginator.encode_cursor(
+        Cursor(offset=0, reverse=False, position=str(position)))
+
+
+def main():
+    args = common.parser(__doc__).parse_args()
+    results = []
+    with common.test_database() as connection:
+        admin = get_user_model().objects.create_user(
+            email='admin@domain.com', first_name='Admin', last_name='Bench',
+            password=common.SEED_PASSWORD, is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        url = 'http://testserver' + reverse('users:profile-list')
+
+        seeded = 0
+        for size in sorted(args.sizes):
+            common.seed_users(size - seeded, start=seeded)
+            seeded = size
+            deep_id = Profile.objects.order_by('-id').values_list('id', flat=True)[100]
+            deep_url = deep_page_url(url, deep_id)
+
+            with common.count_queries(connection) as queries:
+                client.get(url)
+            first_page = common.timed(lambda: client.get(url), args.repeat)
+            deep_page = common.timed(lambda: client.get(deep_url), args.repeat)
+            full_table = common.timed(
+                lambda: ProfileSerializerForAdmin(Profile.objects.all(), many=True).data,
+                1)
+            results.append({
+                'size': size,
+                'queries_per_page': len(queries),
+                'first_page_ms': common.summary(first_page),
+                'deep_page_ms': common.summary(deep_page),
+                'unpaginated_ms': common.summary(full_table),
+            })
+    common.report(results)
+
+
+if __name__ == '__main__':
+    main()
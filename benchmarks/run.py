@@ -0,0 +1,282 @@
+"""Latency, throughput and queries per request of the auth and profile endpoints
+
+Seeds N users, then drives register, web login, rest-auth login, current
+user, profile GET / PATCH and the admin profile list through the WSGI
+application, in-process (the handler is called directly) and over a
+local socket (a wsgiref server thread). The whole middleware stack runs,
+CSRF checks included. Queries per request are read from the
+Server-Timing header of core.middleware.RequestMetricsMiddleware, so
+they are counted the same way in both modes.
+
+    python -m benchmarks.run --sizes 1000,10000 --repeat 100 > before.json
+
+The JSON output carries the commit it was produced on, so runs of two
+commits can be compared.
+"""
+import http.client
+import io
+import json
+import logging
+import re
+import subprocess
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+HOST = 'testserver'
+QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class InProcessClient:
+    """Calls the WSGI handler directly"""
+    mode = 'in_process'
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, body=b'', headers=None):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': HOST,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0),
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in (headers or {}).items():
+            key = name.upper().replace('-', '_')
+            if key == 'CONTENT_TYPE':
+                environ[key] = value
+            else:
+                environ[f'HTTP_{key}'] = value
+
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'] = int(status.split()[0])
+            started['headers'] = response_headers
+
+        response = self.app(environ, start_response)
+        try:
+            content = b''.join(response)
+        finally:
+            response.close()
+        return started['status'], started['headers'], content
+
+    def close(self):
+        pass
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SocketClient:
+    """Talks HTTP to a wsgiref server thread on 127.0.0.1"""
+    mode = 'socket'
+
+    def __init__(self, app):
+        self.server = make_server('127.0.0.1', 0, app, handler_class=QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.server.server_port)
+
+    def request(self, method, path, body=b'', headers=None):
+        headers = dict(headers or {}, Host=HOST)
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        # wsgiref answers HTTP/1.0 and closes the connection
+        self.connection.close()
+        return response.status, response.getheaders(), content
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def header(headers, name):
+    for key, value in headers:
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def json_request(data):
+    return json.dumps(data).encode(), {'Content-Type': 'application/json'}
+
+
+class Scenarios:
+    """Builds the request of a scenario:
+        (method, path, body, headers, expected status)
+    """
+
+    def __init__(self, client, user_token, admin_token, counter):
+        self.client = client
+        self.user_auth = {'Authorization': f'Token {user_token}'}
+        self.admin_auth = {'Authorization': f'Token {admin_token}'}
+        self.counter = counter
+        self.csrf_token = self.get_csrf_token()
+
+    def get_csrf_token(self):
+        _, headers, _ = self.client.request('GET', reverse('web-login'))
+        cookies = SimpleCookie()
+        for key, value in headers:
+            if key.lower() == 'set-cookie':
+                cookies.load(value)
+        return cookies['csrftoken'].value
+
+    def register(self):
+        i = next(self.counter)
+        email = f'bench{i}@domain.com'
+        body, headers = json_request({
+            'email': email, 'verify_email': email,
+            'first_name': 'Bench', 'last_name': 'User',
+            'password': common.SEED_PASSWORD, 'verify_password': common.SEED_PASSWORD,
+            'title': 'mr.', 'company': 'Bench', 'position': 'Engineer',
+            'country': 'Kyrat', 'city': 'SomeCity',
+        })
+        return 'POST', reverse('users:api-user-register'), body, headers, 201
+
+    def web_login(self):
+        body = urlencode({
+            'email': 'user0@domain.com', 'password': common.SEED_PASSWORD,
+            'csrfmiddlewaretoken': self.csrf_token,
+        }).encode()
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Cookie': f'csrftoken={self.csrf_token}',
+        }
+        return 'POST', reverse('web-login'), body, headers, 302
+
+    def rest_auth_login(self):
+        body, headers = json_request({
+            'email': 'user0@domain.com', 'password': common.SEED_PASSWORD})
+        return 'POST', reverse('users:rest_login'), body, headers, 200
+
+    def current_user(self):
+        return 'GET', reverse('users:current-user'), b'', self.user_auth, 200
+
+    def profile_get(self):
+        return 'GET', reverse('users:current-user-profile'), b'', self.user_auth, 200
+
+    def profile_patch(self):
+        body, headers = json_request({'company': f'Company{next(self.counter)}'})
+        return ('PATCH', reverse('users:current-user-profile'), body,
+                dict(headers, **self.user_auth), 200)
+
+    def admin_profile_list(self):
+        return 'GET', reverse('users:profile-list'), b'', self.admin_auth, 200
+
+
+SCENARIOS = [
+    'register', 'web_login', 'rest_auth_login', 'current_user',
+    'profile_get', 'profile_patch', 'admin_profile_list',
+]
+
+
+def run_scenario(client, build, repeat):
+    samples = []
+    queries = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        method, path, body, headers, expected = build()
+        request_started = time.perf_counter()
+        status, response_headers, _ = client.request(method, path, body, headers)
+        samples.append((time.perf_counter() - request_started) * 1000)
+        if status != expected:
+            errors += 1
+        match = QUERIES.search(header(response_headers, 'Server-Timing') or '')
+        if match:
+            queries.append(int(match.group(1)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': repeat,
+        'errors': errors,
+        'requests_per_second': round(repeat / elapsed, 1),
+        'latency_ms': common.summary(samples),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = common.parser(__doc__)
+    parser.add_argument(
+        '--scenarios', default=','.join(SCENARIOS),
+        type=lambda value: value.split(','), help='Comma separated scenarios')
+    parser.add_argument(
+        '--modes', default='in_process,socket',
+        type=lambda value: value.split(','), help='in_process and / or socket')
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    clients = {'in_process': InProcessClient, 'socket': SocketClient}
+    counter = iter(range(10 ** 9))
+    results = []
+    # every request reports its queries in the Server-Timing header,
+    # the log lines of the sampled requests are not needed
+    logging.getLogger('core.requests').setLevel(logging.WARNING)
+    with common.test_database(), override_settings(REQUEST_METRICS_SAMPLE_RATE=1):
+        User = get_user_model()
+        admin = User.objects.create_user(
+            email='admin@domain.com', first_name='Admin', last_name='Bench',
+            password=common.SEED_PASSWORD, is_staff=True)
+        admin_token = Token.objects.create(user=admin).key
+        app = WSGIHandler()
+
+        seeded = 0
+        for size in sorted(args.sizes):
+            common.seed_users(size - seeded, start=seeded)
+            seeded = size
+            user_token, _ = Token.objects.get_or_create(
+                user=User.objects.get(email='user0@domain.com'))
+            for mode in args.modes:
+                client = clients[mode](app)
+                try:
+                    scenarios = Scenarios(client, user_token.key, admin_token, counter)
+                    for name in args.scenarios:
+                        result = run_scenario(client, getattr(scenarios, name), args.repeat)
+                        results.append(dict(size=size, mode=mode, scenario=name, **result))
+                finally:
+                    client.close()
+    common.report({'commit': current_commit(), 'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Per object read cost, ModelSerializer vs users.api.read_serializers
+
+Reads and serializes the payloads of the hot API reads both ways, the
+queries included: the current user display (one user, the way
+CurrentUserDisplayAPIView reads it) and pages of --sizes profiles (the
+admin profile list). Reports microseconds per object and queries per
+read; both ways must produce the same JSON.
+
+Then pages of profiles read whole and with ?fields=user,company and
+?fields=id,company (no user join): bytes and microseconds per object.
+"""
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.contrib.auth.models import Permission  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from core.models import Profile  # noqa: E402
+from users.api.read_serializers import plan_for, read  # noqa: E402
+from users.api.serializers import ProfileSerializerForAdmin, UserDisplaySerializer  # noqa: E402
+
+
+def compare(name, objects, model_serializer, plan, connection, repeat):
+    render = JSONRenderer().render
+    assert render(model_serializer()) == render(plan()), f'{name}: outputs differ'
+    with common.count_queries(connection) as before:
+        model_serializer()
+    with common.count_queries(connection) as after:
+        plan()
+
+    per_object = {}
+    for way, func in (('model_serializer', model_serializer), ('read_serializer', plan)):
+        samples = [ms * 1000 / objects for ms in common.timed(func, repeat)]
+        per_object[way] = common.summary(samples)
+    return {
+        'payload': name,
+        'objects': objects,
+        'us_per_object': per_object,
+        'speedup': round(
+            per_object['model_serializer']['mean'] / per_object['read_serializer']['mean'], 1),
+        'queries': {'model_serializer': len(before), 'read_serializer': len(after)},
+    }
+
+
+def sparse(size, profiles, repeat):
+    render = JSONRenderer().render
+    result = {'payload': 'profile_list_sparse', 'objects': size}
+    for fields in (None, 'user,company', 'id,company'):
+        plan = plan_for(ProfileSerializerForAdmin, fields and frozenset(fields.split(',')))
+        samples = [ms * 1000 / size for ms in common.timed(lambda: plan.read(profiles.all()), repeat)]
+        result[fields or 'all'] = {
+            'bytes': len(render(plan.read(profiles.all()))),
+            'us_per_object': common.summary(samples),
+        }
+    return result
+
+
+def main():
+    parser = common.parser(__doc__)
+    parser.set_defaults(sizes=[50, 500], repeat=50)
+    args = parser.parse_args()
+    User = get_user_model()
+    results = []
+    with common.test_database() as connection:
+        common.seed_users(max(args.sizes))
+        user = User.objects.order_by('id').first()
+        user.user_permissions.add(*Permission.objects.order_by('id')[:5])
+
+        def user_display():
+            return UserDisplaySerializer(User.objects.get(pk=user.pk)).data
+
+        def user_display_plan():
+            return read(UserDisplaySerializer, User.objects.filter(pk=user.pk))[0]
+
+        results.append(compare(
+            'user_display', 1, user_display, user_display_plan, connection, args.repeat * 10))
+
+        for size in sorted(args.sizes):
+            profiles = Profile.objects.select_related('user').order_by('id')[:size]
+            results.append(compare(
+                'profile_list', size,
+                lambda: ProfileSerializerForAdmin(profiles.all(), many=True).data,
+                lambda: read(ProfileSerializerForAdmin, profiles.all()),
+                connection, args.repeat))
+            results.append(sparse(size, profiles, args.repeat))
+    common.report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""User search: icontains over three columns vs core.search
+
+'scan' is what the admin did before (email, first_name and last_name
+icontains, a full scan), 'indexed' is core.search.search_users: trigram
+index on PostgreSQL, prefix range scan on SQLite.
+"""
+from functools import reduce
+from operator import or_
+
+from benchmarks import common
+
+common.setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from core.search import search_users  # noqa: E402
+
+User = get_user_model()
+
+
+def scan(term):
+    return list(User.objects.filter(reduce(or_, [
+        Q(**{f'{field}__icontains': term})
+        for field in ('email', 'first_name', 'last_name')
+    ]))[:100])
+
+
+def indexed(term):
+    return list(search_users(User.objects.all(), term)[:100])
+
+
+def main():
+    args = common.parser(__doc__).parse_args()
+    results = []
+    with common.test_database() as connection:
+        seeded = 0
+        for size in sorted(args.sizes):
+            common.seed_users(size - seeded, start=seeded)
+            seeded = size
+            term = f'user{size // 2}@'
+            assert scan(term) == indexed(term)
+            results.append({
+                'size': size,
+                'backend': connection.vendor,
+                'scan_ms': common.summary(common.timed(lambda: scan(term), args.repeat)),
+                'indexed_ms': common.summary(common.timed(lambda: indexed(term), args.repeat)),
+            })
+    common.report(results)
+
+
+if __name__ == '__main__':
+    main()
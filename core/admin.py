@@ -1,9 +1,12 @@
+from django.apps import apps
 from django.contrib import admin
 from django.contrib.auth.models import Group
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from core.models import Profile, User
+from core.models import OutboundEmail, Profile, User
 from .forms import UserAdminCreationForm, UserAdminChangeForm
+from .paginators import LargeTablePaginator
+from .search import search_users
 
 
 class UserAdminEdited(BaseUserAdmin):
@@ -13,8 +16,17 @@ class UserAdminEdited(BaseUserAdmin):
 
     ordering = ['id']
     list_display = ['email', 'first_name', 'last_name', 'is_admin', 'is_staff']
-    list_filter = ['email', 'first_name', 'last_name', 'is_admin', 'is_staff', 'is_active']
+    # Only low cardinality filters, others would run a DISTINCT over the table
+    list_filter = ['is_admin', 'is_staff', 'is_active']
     search_fields = ['email', 'first_name', 'last_name']
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Index backed search on search_text instead of icontains scans"""
+        if not search_term:
+            return queryset, False
+        return search_users(queryset, search_term), False
     
     # Update User
     fieldsets = (
@@ -56,9 +68,65 @@ class UserAdminEdited(BaseUserAdmin):
 class ProfileAdmin(admin.ModelAdmin):
     ordering = ('id',)
     list_display = ['user', 'full_name', 'title', 'company', 'position']
-    list_filter = ['company']
+    list_select_related = ['user']  # user and full_name columns
+    list_filter = ['is_company_admin']
+    search_fields = ['^company']  # prefix search instead of a company filter
+    raw_id_fields = ['user']  # a select would list every user
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """The autocomplete labels (__str__) read the user"""
+        queryset, use_distinct = super().get_search_results(request, queryset, search_term)
+        return queryset.select_related('user'), use_distinct
+
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Queued mail, failed messages can be inspected here
+        Read only and for superusers: pending bodies hold password reset
+        links, they are not shown
+    """
+    ordering = ('-id',)
+    list_display = ['subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    exclude = ['body', 'alternatives']
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    def has_module_permission(self, request):
+        return request.user.is_active and request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return self.has_module_permission(request)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 admin.site.register(User, UserAdminEdited)
 admin.site.register(Profile, ProfileAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
 admin.site.unregister(Group)
+
+# not installed by aeronautica.settings_production
+if apps.is_installed('allauth.socialaccount'):
+    from allauth.socialaccount.admin import SocialAccountAdmin
+    from allauth.socialaccount.models import SocialAccount
+
+    class SocialAccountAdminEdited(SocialAccountAdmin):
+
+        def get_search_results(self, request, queryset, search_term):
+            """The autocomplete labels (__str__) read the user"""
+            queryset, use_distinct = super().get_search_results(
+                request, queryset, search_term)
+            return queryset.select_related('user'), use_distinct
+
+    admin.site.unregister(SocialAccount)
+    admin.site.register(SocialAccount, SocialAccountAdminEdited)
@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import OrderedDict
+
+from core import metrics
+
+
+class LRUCache:
+    """A bounded, thread safe, per process LRU with optional expiry
+        record_metrics=False leaves the request counters (core.metrics)
+        to the owner, TwoTierCache counts its lookups itself
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, record_metrics=True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.record_metrics = record_metrics
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if self.record_metrics:
+                        metrics.record('cache_hits')
+                    return value
+                del self._data[key]
+            self.misses += 1
+            if self.record_metrics:
+                metrics.record('cache_misses')
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Deletes the entries for which predicate(key, value) is true"""
+        with self._lock:
+            keys = [
+                key for key, (_, value) in self._data.items()
+                if predicate(key, value)
+            ]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class TwoTierCache:
+    """A per process LRUCache in front of an optional shared Django cache
+
+    Values are stored with a version (an ETag for example), a value stored
+    under another version is a miss, so an entry is never served after the
+    data it was built from changed, whatever tier it comes from. None
+    cannot be cached.
+
+    get_or_set protects the loader from stampedes: one thread per key and
+    process runs it while the others wait for its result, and with a
+    shared cache an add() lock lets one process load while the others
+    poll the shared tier for up to lock_timeout seconds.
+    """
+    lock_stripes = 64
+
+    def __init__(self, prefix, maxsize=1024, local_ttl=None, alias=None,
+                 ttl=300, lock_timeout=5):
+        self.prefix = prefix
+        self.local = LRUCache(maxsize, local_ttl, record_metrics=False)
+        self.alias = alias
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._locks = [threading.Lock() for _ in range(self.lock_stripes)]
+        self._stats_lock = threading.Lock()
+        self.counters = {
+            'hits': 0, 'local_hits': 0, 'shared_hits': 0, 'misses': 0,
+            'loads': 0, 'lock_waits': 0,
+        }
+
+    @property
+    def shared(self):
+        from django.core.cache import caches
+        return caches[self.alias] if self.alias else None
+
+    def shared_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def _count(self, *keys):
+        with self._stats_lock:
+            for key in keys:
+                self.counters[key] += 1
+
+    def _lookup(self, key, version, record=True):
+        """Returns (tier, value) or (None, None)
+            With record, one request cache hit or miss is recorded
+            (core.metrics) whatever the tiers looked at; the re-checks of
+            get_or_set do not record.
+        """
+        entry = self.local.get(key)
+        if entry is not None and entry[0] == version:
+            tier, value = 'local_hits', entry[1]
+        else:
+            tier, value = None, None
+            shared = self.shared
+            if shared is not None:
+                entry = shared.get(self.shared_key(key))
+                if entry is not None and entry[0] == version:
+                    self.local.set(key, entry)
+                    tier, value = 'shared_hits', entry[1]
+        if record:
+            metrics.record('cache_misses' if tier is None else 'cache_hits')
+        return tier, value
+
+    def get(self, key, version=None):
+        tier, value = self._lookup(key, version)
+        if tier is None:
+            self._count('misses')
+        else:
+            self._count('hits', tier)
+        return value
+
+    def set(self, key, value, version=None):
+        entry = (version, value)
+        self.local.set(key, entry)
+        shared = self.shared
+        if shared is not None:
+            shared.set(self.shared_key(key), entry, self.ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self.shared_key(key))
+
+    def get_or_set(self, key, loader, version=None):
+        value = self.get(key, version)
+        if value is not None:
+            return value
+        with self._locks[hash(key) % self.lock_stripes]:
+            # loaded by the thread we waited for
+            tier, value = self._lookup(key, version, record=False)
+            if tier is not None:
+                self._count('lock_waits')
+                return value
+            return self._load(key, loader, version)
+
+    def _load(self, key, loader, version):
+        shared = self.shared
+        lock_key = self.shared_key(key) + ':lock'
+        locked = shared is not None and shared.add(lock_key, 1, self.lock_timeout)
+        if shared is not None and not locked:
+            # another process is loading the key
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.02)
+                tier, value = self._lookup(key, version, record=False)
+                if tier is not None:
+                    self._count('lock_waits')
+                    return value
+        try:
+            value = loader()
+            self._count('loads')
+            self.set(key, value, version)
+        finally:
+            if locked:
+                shared.delete(lock_key)
+        return value
+
+    def clear(self):
+        """Clears the local tier only"""
+        self.local.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        stats['local'] = self.local.stats()
+        stats['shared_alias'] = self.alias
+        return stats
@@ -0,0 +1,110 @@
+"""Persistent database connections
+
+Connections are kept open between requests for DB_CONN_MAX_AGE seconds
+(settings CONN_MAX_AGE), Django closes them when they get older than
+that or when an error left them unusable. Every worker thread holds at
+most one connection per alias, so the process pool is as large as the
+number of threads serving requests.
+
+A connection that stayed idle for DB_CONN_HEALTH_CHECK_INTERVAL seconds
+may have been dropped by the server or a proxy in the meantime, it is
+pinged when a request checks it out and replaced if the ping fails.
+Busy connections are not pinged, the check costs one round trip only
+after idle periods.
+"""
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core import metrics
+
+_lock = threading.Lock()
+_stats = {
+    'opened': 0,
+    'reused': 0,
+    'health_checks': 0,
+    'health_check_failures': 0,
+}
+# connection wrappers of every thread that opened a connection
+_wrappers = weakref.WeakSet()
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper timing the queries of instrumented requests"""
+    if not metrics.collecting():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, (time.perf_counter() - started) * 1000)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    _count('opened')
+    with _lock:
+        _wrappers.add(connection)
+    # the wrapper list outlives reconnections
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    """Runs after django.db.close_old_connections, which is connected first"""
+    interval = settings.DB_CONN_HEALTH_CHECK_INTERVAL
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is None or conn.in_atomic_block:
+            continue
+        _count('reused')
+        if not settings.DB_CONN_HEALTH_CHECKS:
+            continue
+        if now - getattr(conn, 'released_at', now) < interval:
+            continue
+        _count('health_checks')
+        if not conn.is_usable():
+            _count('health_check_failures')
+            # the next query opens a new connection
+            conn.close()
+
+
+@receiver(request_finished)
+def mark_released(sender, **kwargs):
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is not None:
+            conn.released_at = now
+
+
+def open_connections():
+    """Connections open in this process, one per thread and alias"""
+    with _lock:
+        wrappers = list(_wrappers)
+    return sum(1 for conn in wrappers if conn.connection is not None)
+
+
+def connection_stats():
+    with _lock:
+        stats = dict(_stats)
+    stats['conn_max_age'] = settings.DATABASES['default'].get('CONN_MAX_AGE')
+    stats['health_check_interval'] = (
+        settings.DB_CONN_HEALTH_CHECK_INTERVAL
+        if settings.DB_CONN_HEALTH_CHECKS else None)
+    stats['open'] = open_connections()
+    return stats
+
+
+metrics.register('db_connections', connection_stats)
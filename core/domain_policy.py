@@ -0,0 +1,121 @@
+"""Blocked email domains
+
+Domains come from settings.EMAIL_DOMAIN_BLACKLIST and, optionally, from
+the file named by EMAIL_DOMAIN_BLACKLIST_FILE (one domain per line, '#'
+starts a comment). They are kept in a set, and an address is checked
+label by label from the right ('a.mail.ru' -> 'a.mail.ru', 'mail.ru',
+'ru'). The cost depends on the number of labels of the address, not on
+the size of the list, and subdomains of a blocked domain are blocked too.
+
+The file is re-read when its modification time changes, checked at most
+every EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL seconds. A missing or
+unreadable file is logged and only the settings list is used until the
+file appears.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from core import metrics
+
+logger = logging.getLogger('core.domain_policy')
+
+
+def normalize(domain):
+    return domain.strip().lower().strip('.')
+
+
+def read_domains(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            domain = normalize(line.split('#', 1)[0])
+            if domain:
+                yield domain
+
+
+class DomainPolicy:
+
+    def __init__(self, domains, path=None, mtime=None):
+        self.blocked = frozenset(normalize(domain) for domain in domains)
+        self.path = path
+        self.mtime = mtime
+        self.checked_at = time.monotonic()
+
+    @classmethod
+    def from_settings(cls):
+        domains = list(settings.EMAIL_DOMAIN_BLACKLIST)
+        path = settings.EMAIL_DOMAIN_BLACKLIST_FILE
+        mtime = None
+        if path:
+            try:
+                mtime = os.stat(path).st_mtime
+                domains.extend(read_domains(path))
+            except (OSError, UnicodeError):
+                logger.exception('Email domain blacklist %s not read', path)
+                domains = list(settings.EMAIL_DOMAIN_BLACKLIST)
+                mtime = None
+        return cls(domains, path, mtime)
+
+    def is_stale(self):
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if now - self.checked_at < settings.EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL:
+            return False
+        self.checked_at = now
+        try:
+            return os.stat(self.path).st_mtime != self.mtime
+        except OSError:
+            return False  # keep the loaded list until the file is back
+
+    def blocked_domain(self, domain):
+        """Returns the blocked entry matching domain or one of its parents"""
+        labels = normalize(domain).split('.')
+        for i in range(len(labels)):
+            candidate = '.'.join(labels[i:])
+            if candidate in self.blocked:
+                return candidate
+        return None
+
+
+_policy = None
+_lock = threading.Lock()
+_stats = {'reloads': 0}
+
+
+def get_policy():
+    global _policy
+    policy = _policy
+    if policy is None or policy.is_stale():
+        with _lock:
+            if _policy is policy:  # not reloaded by another thread meanwhile
+                _policy = DomainPolicy.from_settings()
+                _stats['reloads'] += 1
+    return _policy
+
+
+def blocked_domain(email_value):
+    """Returns the blocked domain of an email address, or None"""
+    return get_policy().blocked_domain(email_value.rsplit('@', 1)[-1])
+
+
+def policy_stats():
+    return {
+        'domains': len(_policy.blocked) if _policy else 0,
+        'reloads': _stats['reloads'],
+    }
+
+
+metrics.register('email_domain_policy', policy_stats)
+
+
+@receiver(setting_changed)
+def reset_policy(setting, **kwargs):
+    global _policy
+    if setting.startswith('EMAIL_DOMAIN_'):
+        _policy = None
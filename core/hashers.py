@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+
+from core import metrics
+
+
+def hash_password(password):
+    """Hashes a raw password with the configured hasher
+        Kept free of model imports so process pool workers can run it
+        without setting up the app registry.
+    """
+    return make_password(password)
+
+
+class HashingPoolSaturated(Exception):
+    """The hashing queue is full or the pool did not answer in time
+        core.middleware.HashingPoolSaturatedMiddleware turns it into a 503
+    """
+
+
+class HashingPool:
+    """A bounded process pool for password hashing
+
+    At most PASSWORD_HASHING_QUEUE_DEPTH hashes may be pending per
+    request worker process, further ones are rejected immediately.
+    A queue depth of 0 does not bound the queue.
+    """
+
+    def __init__(self, size, queue_depth, timeout):
+        self.size = size
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.executor = ProcessPoolExecutor(max_workers=size)
+        self.slots = threading.BoundedSemaphore(queue_depth) if queue_depth else None
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latencies = deque(maxlen=1000)
+        self.waits = deque(maxlen=1000)
+
+    def run(self, func, *args):
+        if self.slots is not None and not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise HashingPoolSaturated('Password hashing queue is full')
+
+        started = time.monotonic()
+        with self.lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            future = self.executor.submit(_timed, func, *args)
+            try:
+                result, duration = future.result(timeout=self.timeout)
+            except TimeoutError:
+                future.cancel()
+                with self.lock:
+                    self.timed_out += 1
+                raise HashingPoolSaturated('Password hashing timed out')
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            if self.slots is not None:
+                self.slots.release()
+
+        latency = time.monotonic() - started
+        with self.lock:
+            self.completed += 1
+            self.latencies.append(latency * 1000)
+            self.waits.append(max(0, latency - duration) * 1000)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {
+                'pool_size': self.size,
+                'queue_depth': self.queue_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'latency_ms': metrics.percentiles(list(self.latencies)),
+                'queue_wait_ms': metrics.percentiles(list(self.waits)),
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the pool of this process, created on first use
+        A pool inherited through fork (e.g. gunicorn --preload) is replaced
+    """
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = HashingPool(
+                    size=settings.PASSWORD_HASHING_POOL_SIZE or os.cpu_count(),
+                    queue_depth=settings.PASSWORD_HASHING_QUEUE_DEPTH,
+                    timeout=settings.PASSWORD_HASHING_TIMEOUT,
+                )
+    return _pool
+
+
+def reset_pool():
+    """Shuts down the pool, the next hash creates a new one from settings"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.shutdown()
+        _pool = None
+
+
+def pool_stats():
+    if _pool is None or _pool.pid != os.getpid():
+        return {}
+    return _pool.stats()
+
+
+metrics.register('password_hashing', pool_stats)
+
+
+def _timed(func, *args):
+    """Runs in the pool worker, returns the result and the cpu time spent"""
+    started = time.monotonic()
+    result = func(*args)
+    return result, time.monotonic() - started
+
+
+def _pbkdf2_encode(password, salt, iterations):
+    return PBKDF2PasswordHasher().encode(password, salt, iterations)
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 hasher which runs the key derivation in core.hashers.HashingPool
+
+    Hashes are identical to PBKDF2PasswordHasher so it replaces it in
+    PASSWORD_HASHERS without rehashing. check_password and make_password
+    both go through encode, so login, registration and password change
+    are all offloaded from the request worker.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        iterations = iterations or self.iterations
+        if multiprocessing.parent_process() is not None:
+            # already in a pool worker (e.g. import_users), hash inline
+            return _pbkdf2_encode(password, salt, iterations)
+        assert password is not None
+        assert salt and '$' not in salt
+        return get_pool().run(_pbkdf2_encode, password, salt, iterations)
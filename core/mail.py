@@ -0,0 +1,155 @@
+"""Outbound email queue
+
+QueuedEmailBackend (EMAIL_BACKEND) only inserts the messages into
+core.models.OutboundEmail, the request does not wait for the SMTP host.
+send_queued (the send_queued_email command) sends them in batches over
+one connection of EMAIL_QUEUE_BACKEND, the real backend.
+
+A batch is claimed by pushing next_attempt_at EMAIL_QUEUE_CLAIM_TIMEOUT
+seconds forward (rows locked with SKIP LOCKED where supported), so
+several workers can drain the queue and messages of a crashed worker
+are picked up again. A failed message is retried after
+EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1) seconds and marked failed
+after EMAIL_QUEUE_MAX_ATTEMPTS attempts.
+
+Bodies carry secrets (password reset links), they are blanked once a
+message is sent or failed; the rows only keep the envelope.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection as db_connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+from core.models import OutboundEmail
+
+_lock = threading.Lock()
+_stats = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+
+
+def _count(key, value=1):
+    with _lock:
+        _stats[key] += value
+
+
+def queue_stats():
+    with _lock:
+        return dict(_stats)
+
+
+metrics.register('email_queue', queue_stats)
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Stores the messages, send_queued sends them"""
+
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            if message.attachments:
+                if not self.fail_silently:
+                    raise ValueError('Attachments cannot be queued.')
+                continue
+            rows.append(OutboundEmail(
+                subject=message.subject,
+                body=message.body,
+                from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+                to=list(message.to),
+                cc=list(message.cc),
+                bcc=list(message.bcc),
+                reply_to=list(message.reply_to),
+                headers=dict(message.extra_headers),
+                alternatives=[
+                    list(alternative)
+                    for alternative in getattr(message, 'alternatives', [])
+                ],
+            ))
+        OutboundEmail.objects.bulk_create(rows)
+        _count('queued', len(rows))
+        return len(rows)
+
+
+def claim_batch(batch_size):
+    """Returns up to batch_size due messages, hidden from other workers
+        until they are sent or the claim times out
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = OutboundEmail.objects.filter(
+            status=OutboundEmail.PENDING, next_attempt_at__lte=now,
+        ).order_by('next_attempt_at', 'id')
+        if db_connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        batch = list(queryset[:batch_size])
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_QUEUE_CLAIM_TIMEOUT))
+    return batch
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def reopen(connection):
+    """Replaces a connection which may be broken, messages sent on a
+        closed connection open and close one each
+    """
+    connection.close()
+    try:
+        connection.open()
+    except Exception:
+        pass
+
+
+def send_batch(batch, connection):
+    """Sends the messages one by one over connection, returns the number sent"""
+    sent = []
+    for email in batch:
+        email.attempts += 1
+        try:
+            connection.send_messages([email.to_message(connection)])
+        except Exception as e:
+            reopen(connection)
+            email.last_error = f'{type(e).__name__}: {e}'
+            if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+                email.status = OutboundEmail.FAILED
+                email.body, email.alternatives = '', []
+                _count('failed')
+            else:
+                email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                _count('retried')
+            email.save(update_fields=[
+                'attempts', 'last_error', 'status', 'next_attempt_at', 'body', 'alternatives'])
+        else:
+            sent.append(email)
+
+    if sent:
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in sent]).update(
+            status=OutboundEmail.SENT, sent_at=timezone.now(), last_error='',
+            attempts=F('attempts') + 1, body='', alternatives=[])
+        _count('sent', len(sent))
+    return len(sent)
+
+
+def send_queued(batch_size=None, connection=None):
+    """Drains the due messages, returns the number sent"""
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    connection = connection or get_connection(settings.EMAIL_QUEUE_BACKEND)
+    total = 0
+    connection.open()
+    try:
+        while True:
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+            total += send_batch(batch, connection)
+    finally:
+        connection.close()
+    return total
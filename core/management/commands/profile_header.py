@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.profiler import signed_header
+
+
+class Command(BaseCommand):
+    help = (
+        'Prints an X-Profile header value, requests carrying it are profiled '
+        'by core.middleware.ProfilerMiddleware for PROFILER_SIGNATURE_MAX_AGE '
+        'seconds.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'X-Profile: {signed_header()}')
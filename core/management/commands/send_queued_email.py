@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.mail import send_queued
+
+
+class Command(BaseCommand):
+    help = (
+        'Sends the messages queued by core.mail.QueuedEmailBackend over one '
+        'connection of EMAIL_QUEUE_BACKEND. With --loop the queue is polled '
+        'until the process is stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Messages claimed per round trip, EMAIL_QUEUE_BATCH_SIZE by default')
+        parser.add_argument(
+            '--loop', action='store_true', help='Keep polling the queue')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Seconds between two polls of an empty queue')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size is not None and batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        while True:
+            sent = send_queued(batch_size)
+            if sent or options['verbosity'] > 1:
+                self.stdout.write(f'{sent} messages sent')
+            if not options['loop']:
+                break
+            if not sent:
+                time.sleep(options['interval'])
@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads the apps, URLconf and middleware of a worker in fresh '
+        'interpreters (core.startup) and reports the import time and memory '
+        'of every installed app and library. Compare settings modules with '
+        '--settings, e.g. aeronautica.settings_production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument(
+            '--limit', type=int, default=25, help='Rows of the table, the costliest first')
+
+    def handle(self, *args, **options):
+        timing, import_times = self.run_child('-X', 'importtime', 'time')
+        memory, _ = self.run_child('memory')
+
+        app_names = sorted(
+            (config.name for config in apps.get_app_configs()), key=len, reverse=True)
+        rows = {}
+        for module, microseconds in import_times.items():
+            row = rows.setdefault(owner(module, app_names), [0.0, 0, 0])
+            row[0] += microseconds / 1000
+            row[2] += 1
+        for module, size in memory.items():
+            rows.setdefault(owner(module, app_names), [0.0, 0, 0])[1] += size
+
+        report = {
+            'settings': os.environ.get('DJANGO_SETTINGS_MODULE'),
+            'seconds': round(timing['seconds'], 3),
+            'rss_kb': timing['rss_kb'],
+            'apps': [
+                {'name': name, 'import_ms': round(import_ms, 1),
+                 'memory_kb': round(size / 1024, 1), 'modules': modules}
+                for name, (import_ms, size, modules) in sorted(
+                    rows.items(), key=lambda item: item[1][0], reverse=True)
+            ],
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f'{report["settings"]}: started in {report["seconds"]} s, '
+            f'{report["rss_kb"] / 1024:.1f} MB resident\n')
+        self.stdout.write(f'{"app / package":<32}{"import ms":>12}{"memory KB":>12}{"modules":>10}')
+        for row in report['apps'][:options['limit']]:
+            self.stdout.write(
+                f'{row["name"]:<32}{row["import_ms"]:>12}{row["memory_kb"]:>12}{row["modules"]:>10}')
+
+    def run_child(self, *args):
+        """Runs core.startup, returns its JSON output and -X importtime times"""
+        *options, mode = args
+        result = subprocess.run(
+            [sys.executable, *options, '-m', 'core.startup', mode],
+            cwd=settings.BASE_DIR, env=os.environ, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f'core.startup {mode} failed:\n{result.stderr[-2000:]}')
+        return json.loads(result.stdout.splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    """Self microseconds of every module of the -X importtime tree"""
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header
+        times[fields[2].strip()] = int(fields[0])
+    return times
+
+
+def owner(module, app_names):
+    """Installed app of a module, else its top level package"""
+    for app in app_names:
+        if module == app or module.startswith(app + '.'):
+            return app
+    package = module.partition('.')[0]
+    if package in getattr(sys, 'stdlib_module_names', ()):
+        return '(standard library)'
+    return package
@@ -0,0 +1,79 @@
+"""Process local metrics of the performance related subsystems
+
+Subsystems register a function returning a dict of their counters,
+core.views.metrics_view renders all of them for staff users.
+start_request / record collect the counters of a single request.
+"""
+import heapq
+from contextvars import ContextVar
+
+_collectors = {}
+
+
+def register(name, collector):
+    """Registers a callable returning a json serializable dict"""
+    _collectors[name] = collector
+
+
+def collect():
+    return {name: collector() for name, collector in _collectors.items()}
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Returns {'p50': .., 'p95': ..} of a list of numbers"""
+    if not samples:
+        return {f'p{point}': None for point in points}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        f'p{point}': ordered[min(last, round(last * point / 100))]
+        for point in points
+    }
+
+
+# Counters of the request being served, see core.middleware.RequestMetricsMiddleware
+_request_stats = ContextVar('request_stats', default=None)
+
+
+def start_request(keep_sql=0):
+    """Starts collecting the counters of the current request (or task)
+        The keep_sql slowest queries are kept in stats['sql'], a min-heap
+        of (duration_ms, sql), see slowest_sql
+    """
+    stats = {
+        'queries': 0, 'db_ms': 0.0, 'cache_hits': 0, 'cache_misses': 0,
+        'sql': [] if keep_sql else None, 'keep_sql': keep_sql,
+    }
+    return stats, _request_stats.set(stats)
+
+
+def stop_request(token):
+    _request_stats.reset(token)
+
+
+def record(key, value=1):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats[key] += value
+
+
+def record_query(sql, duration_ms):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats['queries'] += 1
+        stats['db_ms'] += duration_ms
+        kept = stats['sql']
+        if kept is not None:
+            if len(kept) < stats['keep_sql']:
+                heapq.heappush(kept, (duration_ms, sql))
+            elif duration_ms > kept[0][0]:
+                heapq.heapreplace(kept, (duration_ms, sql))
+
+
+def slowest_sql(stats):
+    """Returns the kept (duration_ms, sql) of a request, slowest first"""
+    return sorted(stats['sql'] or (), key=lambda query: query[0], reverse=True)
+
+
+def collecting():
+    return _request_stats.get() is not None
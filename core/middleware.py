@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from core import metrics, profiler
+from core.hashers import HashingPoolSaturated
+from core.query_budgets import budget_for
+
+logger = logging.getLogger('core.requests')
+
+
+class HashingPoolSaturatedMiddleware(MiddlewareMixin):
+    """Answers with 503 when the password hashing pool rejects a request
+        Clients are asked to retry instead of piling up on the workers
+        MiddlewareMixin keeps the chain async under ASGI
+    """
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingPoolSaturated):
+            response = HttpResponse(
+                'Service is busy, please try again.', status=503)
+            response['Retry-After'] = '1'
+            return response
+        return None
+
+
+class RequestMetricsMiddleware:
+    """Query count, database time, cache lookups and view time of requests
+
+    A REQUEST_METRICS_SAMPLE_RATE share of the requests gets a
+    Server-Timing header and an INFO line on the core.requests logger.
+    Requests slower than REQUEST_METRICS_SLOW_MS are logged as WARNING
+    with their slowest queries, whether they are sampled or not, and so
+    are the instrumented requests over their core.query_budgets budget.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # lets the handler await us, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.start(request)
+        if state is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.stop_request(state[2])
+        return self.finish(request, response, *state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        if state is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.stop_request(state[2])
+        return self.finish(request, response, *state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view_started = time.perf_counter()
+
+    def start(self, request):
+        slow_ms = settings.REQUEST_METRICS_SLOW_MS
+        sampled = random.random() < settings.REQUEST_METRICS_SAMPLE_RATE
+        if not sampled and not slow_ms:
+            return None
+        stats, token = metrics.start_request(
+            keep_sql=settings.REQUEST_METRICS_SLOW_SQL if slow_ms else 0)
+        return time.perf_counter(), stats, token, sampled
+
+    def finish(self, request, response, started, stats, token, sampled):
+        now = time.perf_counter()
+        total_ms = (now - started) * 1000
+        view_started = getattr(request, '_metrics_view_started', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'total_ms': round(total_ms, 2),
+            'view_ms': round((now - view_started) * 1000, 2) if view_started else None,
+            'db_ms': round(stats['db_ms'], 2),
+            'queries': stats['queries'],
+            'cache_hits': stats['cache_hits'],
+            'cache_misses': stats['cache_misses'],
+        }
+        record['query_budget'] = budget_for(record['view'], request.method)
+        if sampled:
+            response['Server-Timing'] = server_timing(record)
+            logger.info(json.dumps(record), extra={'request_metrics': record})
+        slow_ms = settings.REQUEST_METRICS_SLOW_MS
+        if slow_ms and total_ms >= slow_ms:
+            record['slowest_sql'] = [
+                {'ms': round(duration, 2), 'sql': sql}
+                for duration, sql in metrics.slowest_sql(stats)
+            ]
+            logger.warning(
+                'Slow request %s', json.dumps(record), extra={'request_metrics': record})
+        budget = record['query_budget']
+        if budget is not None and record['queries'] > budget:
+            logger.warning(
+                'Request over its query budget %s', json.dumps(record),
+                extra={'request_metrics': record})
+        return response
+
+
+def server_timing(record):
+    parts = [
+        f'total;dur={record["total_ms"]}',
+        f'db;dur={record["db_ms"]};desc="{record["queries"]} queries"',
+        f'cache;desc="{record["cache_hits"]} hits {record["cache_misses"]} misses"',
+    ]
+    if record['view_ms'] is not None:
+        parts.insert(1, f'view;dur={record["view_ms"]}')
+    return ', '.join(parts)
+
+
+class ProfilerMiddleware:
+    """Collapsed stack profile of chosen requests (core.profiler)
+
+    Requests with a valid X-Profile header (manage.py profile_header) and
+    a PROFILER_SAMPLE_RATE share of the others are profiled, the response
+    names the profile in X-Profile-Id. Other requests only pay a header
+    lookup. Content streamed after the view returns is not profiled.
+
+    Under ASGI the sampler follows the view: process_view points it at
+    the thread sync views run in, or the event loop for coroutine views,
+    until in_thread_pool moves the request to a pool thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # lets the handler await us, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.wanted(request):
+            return self.get_response(request)
+        sampler = self.start(request, threading.get_ident())
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        return self.finish(request, response, stacks)
+
+    async def __acall__(self, request):
+        if not self.wanted(request):
+            return await self.get_response(request)
+        request._profiler_loop_thread = threading.get_ident()
+        sampler = self.start(request, None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        # the profile is written off the event loop
+        return await sync_to_async(self.finish, thread_sensitive=False)(
+            request, response, stacks)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(request, '_profiler_sampler', None) is None:
+            return
+        if asyncio.iscoroutinefunction(view_func):
+            request._profiler_sampler.thread_id = request._profiler_loop_thread
+        else:
+            profiler.sample_this_thread(request)
+
+    def start(self, request, thread_id):
+        sampler = request._profiler_sampler = profiler.Sampler(
+            thread_id, settings.PROFILER_INTERVAL_MS / 1000)
+        sampler.start()
+        return sampler
+
+    def finish(self, request, response, stacks):
+        try:
+            response['X-Profile-Id'] = profiler.save(stacks, request)
+        except OSError:
+            logger.exception('Profile of %s not saved', request.path)
+        return response
+
+    def wanted(self, request):
+        header = request.META.get('HTTP_X_PROFILE')
+        if header is not None:
+            return profiler.valid_header(header)
+        rate = settings.PROFILER_SAMPLE_RATE
+        return bool(rate) and random.random() < rate
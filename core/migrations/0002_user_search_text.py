@@ -0,0 +1,49 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+def fill_search_text(apps, schema_editor):
+    from core.search import search_text_for
+
+    User = apps.get_model('core', 'User')
+    users = []
+    for user in User.objects.only('email', 'first_name', 'last_name').iterator(chunk_size=2000):
+        user.search_text = search_text_for(user.email, user.first_name, user.last_name)
+        users.append(user)
+        if len(users) == 2000:
+            User.objects.bulk_update(users, ['search_text'])
+            users = []
+    User.objects.bulk_update(users, ['search_text'])
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS core_user_search_text_trgm '
+        'ON core_user USING gin (search_text gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS core_user_search_text_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_text',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=767),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def blank_bodies(apps, schema_editor):
+    """Sent and failed messages no longer keep their bodies (reset links)"""
+    OutboundEmail = apps.get_model('core', 'OutboundEmail')
+    OutboundEmail.objects.exclude(status='pending').update(body='', alternatives=[])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_outboundemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_bodies, migrations.RunPython.noop),
+    ]
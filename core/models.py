@@ -3,7 +3,10 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
+from core.domain_policy import blocked_domain
+from core.search import SEARCH_TEXT_SOURCES
 # Create your models here.
 
 # https://www.youtube.com/watch?v=HshbjK1vDtY&ab_channel=CodingEntrepreneurs
@@ -11,10 +14,8 @@ from django.conf import settings
 
 def email_domain_validator(email_value):
     """Validates if email not ending with hotmail.com etc."""
-    blacklisted_emails = settings.EMAIL_DOMAIN_BLACKLIST
-
     email_domain = email_value.split('@')[-1]
-    if email_domain in blacklisted_emails:
+    if blocked_domain(email_value):
         raise ValidationError(
         _(f'{email_domain} This domain not supported.'),
         )
@@ -26,8 +27,12 @@ class UserManager(BaseUserManager):
 
     def create_user(
         self, email, first_name, last_name, password=None, 
-        is_active=True, is_staff=False, is_demo_user=False, is_admin=False, **extrafields):
-        """Creates and saves a new user"""
+        is_active=True, is_staff=False, is_demo_user=False, is_admin=False,
+        profile=None, **extrafields):
+        """Creates and saves a new user
+            profile: optional dict of Profile fields, the profile created
+            by signals is inserted with them (no second save needed)
+        """
         if not email:
             raise ValueError('Email is required to create a user.')
         else:
@@ -50,6 +55,7 @@ class UserManager(BaseUserManager):
         user.is_staff = is_staff
         user.is_demo_user = is_demo_user
         user.set_password(password)
+        user._profile_fields = profile or {}
         user.save(using=self._db)
         return user
 
@@ -98,6 +104,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_demo_user = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Lower case "email first_name last_name", see core.search
+    search_text = models.CharField(max_length=767, blank=True, editable=False, db_index=True)
 
     objects = UserManager()
 
@@ -107,6 +115,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        """Writes search_text (set by core.signals.set_search_text) along
+            with an update_fields save of the columns it is built from
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(SEARCH_TEXT_SOURCES):
+            kwargs['update_fields'] = set(update_fields) | {'search_text'}
+        super().save(*args, **kwargs)
+
     def get_full_name(self):
         return f'{self.first_name} {self.last_name.upper()}'
 
@@ -131,4 +148,49 @@ class Profile(models.Model):
         return f'{self.user.first_name} {self.user.last_name.upper()}'
 
     def __str__(self):
-        return f'{self.user.email}'
\ No newline at end of file
+        return f'{self.user.email}'
+
+
+class OutboundEmail(models.Model):
+    """Message queued by core.mail.QueuedEmailBackend"""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, _('Pending')),
+        (SENT, _('Sent')),
+        (FAILED, _('Failed')),
+    ]
+
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list)
+    bcc = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list)
+    headers = models.JSONField(default=dict)
+    # [[content, mimetype], ...] e.g. the html version
+    alternatives = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # also pushed forward while a worker holds the message
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.to)}'
+
+    def to_message(self, connection=None):
+        return EmailMultiAlternatives(
+            subject=self.subject, body=self.body, from_email=self.from_email,
+            to=self.to, cc=self.cc, bcc=self.bcc, reply_to=self.reply_to,
+            headers=self.headers,
+            alternatives=[tuple(alternative) for alternative in self.alternatives],
+            connection=connection,
+        )
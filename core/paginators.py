@@ -0,0 +1,45 @@
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class LargeTablePaginator(Paginator):
+    """Admin changelist paginator which avoids exact COUNT(*) on big tables
+
+    Unfiltered lists on PostgreSQL use the planner estimate
+    (pg_class.reltuples). Other counts are cached for ADMIN_COUNT_CACHE_TTL
+    seconds. Both only kick in from ADMIN_COUNT_THRESHOLD rows, smaller
+    tables are counted exactly so page links stay accurate.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        threshold = settings.ADMIN_COUNT_THRESHOLD
+        connection = connections[queryset.db]
+
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= threshold:
+                return int(row[0])
+
+        try:
+            sql = str(queryset.query)
+        except EmptyResultSet:
+            return 0
+        key = 'admin-count:' + hashlib.md5(sql.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            if count >= threshold:
+                cache.set(key, count, settings.ADMIN_COUNT_CACHE_TTL)
+        return count
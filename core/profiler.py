@@ -0,0 +1,145 @@
+"""Statistical profiler of single requests
+
+A Sampler thread reads the stack of the thread running the view from
+sys._current_frames() every PROFILER_INTERVAL_MS and counts the
+collapsed stacks, "outer;inner;leaf count" lines as read by
+flamegraph.pl and speedscope. The request thread only starts and stops
+the sampler, no profile hook runs on its calls. Under ASGI the view
+thread is known once the view runs, see sample_this_thread.
+
+Profiles are files of PROFILER_DIR, the newest PROFILER_KEEP are kept.
+"""
+import functools
+import os
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiler'
+SUFFIX = '.collapsed'
+# the names we write, anything else (../ etc.) is not served
+NAME = re.compile(r'^\w[\w.-]*\.collapsed$')
+
+
+class Sampler(threading.Thread):
+    """Counts the stacks of one thread until stopped
+        thread_id can be changed while it runs, None samples nothing
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profiler-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+            del frame
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        return self.stacks
+
+
+def sample_this_thread(request):
+    """Points the sampler of a profiled request at the calling thread
+        Called by ProfilerMiddleware.process_view and by views handing
+        the request to another thread (users.api.async_views)
+    """
+    sampler = getattr(request, '_profiler_sampler', None)
+    if sampler is not None:
+        sampler.thread_id = threading.get_ident()
+
+
+def collapse(frame):
+    """Root first, ; separated functions of a stack"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+@functools.lru_cache(maxsize=4096)
+def short_path(filename):
+    """File name relative to its sys.path entry"""
+    for prefix in sorted(filter(None, sys.path), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def signed_header():
+    """Value of the X-Profile header asking for a profile of the request"""
+    return signing.TimestampSigner(salt=SALT).sign(uuid.uuid4().hex)
+
+
+def valid_header(value):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=settings.PROFILER_SIGNATURE_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def save(stacks, request):
+    """Writes the profile of a request, returns its name"""
+    directory = Path(settings.PROFILER_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    view = getattr(request.resolver_match, 'view_name', None) or 'unresolved'
+    name = '{}-{}-{}-{}{}'.format(
+        datetime.utcnow().strftime('%Y%m%dT%H%M%S%f'), request.method,
+        re.sub(r'[^\w.-]', '.', view), uuid.uuid4().hex[:8], SUFFIX)
+    partial = directory / f'.{name}.tmp'
+    partial.write_text(''.join(
+        f'{stack} {count}\n' for stack, count in stacks.most_common()))
+    os.replace(partial, directory / name)
+    prune(directory)
+    return name
+
+
+def prune(directory):
+    # names start with the time, the oldest sort first
+    names = sorted(path.name for path in directory.glob(f'*{SUFFIX}'))
+    for name in names[:-settings.PROFILER_KEEP]:
+        try:
+            (directory / name).unlink()
+        except FileNotFoundError:
+            pass  # pruned by another worker
+
+
+def list_profiles():
+    """Newest first"""
+    directory = Path(settings.PROFILER_DIR)
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob(f'*{SUFFIX}'), reverse=True):
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        profiles.append({'name': path.name, 'size': size})
+    return profiles
+
+
+def profile_path(name):
+    """Path of a saved profile, None for unknown names"""
+    if not NAME.match(name):
+        return None
+    path = Path(settings.PROFILER_DIR) / name
+    return path if path.is_file() else None
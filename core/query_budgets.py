@@ -0,0 +1,125 @@
+"""Maximum number of queries of every route
+
+BUDGETS maps URL names to {HTTP method: max queries}. The numbers are
+the queries of a cold process (token, payload, site and content type
+caches empty) with the costliest authentication of the route, usually
+the session. They do not depend on the number of rows. Transactions
+are counted as the test run sees them, a SAVEPOINT and a RELEASE, one
+more than the BEGIN of a production request.
+
+core/tests/test_query_budgets.py requests every route at two table sizes
+and fails when a route goes over its budget or its query count grows
+with the tables. A new route needs a budget. RequestMetricsMiddleware
+logs the instrumented requests which go over their budget.
+"""
+
+BUDGETS = {
+    # Web pages
+    'index': {'GET': 2},
+    'metrics': {'GET': 2},
+    'password_reset': {'GET': 0, 'POST': 3},
+    'password_reset_complete': {'GET': 2},
+    'password_reset_confirm': {'GET': 5},
+    'password_reset_done': {'GET': 0},
+    'profiler': {'GET': 2},
+    'profiler-download': {'GET': 2},
+    'web-login': {'GET': 0, 'POST': 9},
+    'web-logout': {'GET': 5},
+    'web-password-change': {'GET': 2},
+    'web-register': {'GET': 0, 'POST': 5},
+    'web-user-profile': {'GET': 3},
+    # REST API
+    'rest_framework:login': {'GET': 1},
+    'rest_framework:logout': {'GET': 5},
+    'users:api-root': {'GET': 2},
+    'users:api-user-register': {'POST': 5},
+    'users:async-current-user': {'GET': 5},
+    'users:async-current-user-profile': {'GET': 4},
+    'users:async-profile-detail': {'GET': 3},
+    'users:current-user': {'GET': 5},
+    'users:current-user-profile': {'GET': 4, 'PATCH': 8},
+    'users:profile-batch': {'GET': 3},
+    'users:profile-bulk': {'PATCH': 7},
+    'users:profile-detail': {'GET': 3},
+    'users:profile-export': {'GET': 3},
+    'users:profile-list': {'GET': 3},
+    'users:profile-search': {'GET': 3},
+    'users:rest_login': {'POST': 13},
+    'users:rest_logout': {'POST': 6},
+    'users:rest_password_change': {'POST': 10},
+    'users:rest_password_reset': {'POST': 3},
+    # user load and update, plus the claims check of users.signals with
+    # API_SIGNED_TOKENS on
+    'users:rest_password_reset_confirm': {'POST': 3},
+    'users:rest_user_details': {'GET': 6},
+    'users:token-refresh': {'POST': 1},
+    # Admin
+    'admin:account_emailaddress_add': {'GET': 5},
+    'admin:account_emailaddress_autocomplete': {'GET': 4},
+    'admin:account_emailaddress_change': {'GET': 7},
+    'admin:account_emailaddress_changelist': {'GET': 5},
+    'admin:account_emailaddress_delete': {'GET': 6},
+    'admin:account_emailaddress_history': {'GET': 5},
+    'admin:app_list': {'GET': 2},
+    'admin:auth_user_password_change': {'GET': 3},
+    'admin:authtoken_tokenproxy_add': {'GET': 6},
+    'admin:authtoken_tokenproxy_autocomplete': {'GET': 2},
+    'admin:authtoken_tokenproxy_change': {'GET': 4},
+    'admin:authtoken_tokenproxy_changelist': {'GET': 5},
+    'admin:authtoken_tokenproxy_delete': {'GET': 4},
+    'admin:authtoken_tokenproxy_history': {'GET': 2},
+    'admin:core_outboundemail_add': {'GET': 5},
+    'admin:core_outboundemail_autocomplete': {'GET': 2},
+    'admin:core_outboundemail_change': {'GET': 6},
+    'admin:core_outboundemail_changelist': {'GET': 4},
+    'admin:core_outboundemail_delete': {'GET': 6},
+    'admin:core_outboundemail_history': {'GET': 5},
+    'admin:core_profile_add': {'GET': 5},
+    'admin:core_profile_autocomplete': {'GET': 4},
+    'admin:core_profile_change': {'GET': 8},
+    'admin:core_profile_changelist': {'GET': 4},
+    'admin:core_profile_delete': {'GET': 6},
+    'admin:core_profile_history': {'GET': 6},
+    'admin:core_user_add': {'GET': 7},
+    'admin:core_user_autocomplete': {'GET': 4},
+    'admin:core_user_change': {'GET': 6},
+    'admin:core_user_changelist': {'GET': 4},
+    'admin:core_user_delete': {'GET': 12},
+    'admin:core_user_history': {'GET': 5},
+    'admin:index': {'GET': 3},
+    'admin:jsi18n': {'GET': 2},
+    'admin:login': {'GET': 1},
+    'admin:logout': {'GET': 5},
+    'admin:password_change': {'GET': 2},
+    'admin:password_change_done': {'GET': 2},
+    'admin:sites_site_add': {'GET': 5},
+    'admin:sites_site_autocomplete': {'GET': 4},
+    'admin:sites_site_change': {'GET': 6},
+    'admin:sites_site_changelist': {'GET': 5},
+    'admin:sites_site_delete': {'GET': 6},
+    'admin:sites_site_history': {'GET': 5},
+    'admin:socialaccount_socialaccount_add': {'GET': 5},
+    'admin:socialaccount_socialaccount_autocomplete': {'GET': 4},
+    'admin:socialaccount_socialaccount_change': {'GET': 8},
+    'admin:socialaccount_socialaccount_changelist': {'GET': 6},
+    'admin:socialaccount_socialaccount_delete': {'GET': 7},
+    'admin:socialaccount_socialaccount_history': {'GET': 6},
+    'admin:socialaccount_socialapp_add': {'GET': 6},
+    'admin:socialaccount_socialapp_autocomplete': {'GET': 2},
+    'admin:socialaccount_socialapp_change': {'GET': 8},
+    'admin:socialaccount_socialapp_changelist': {'GET': 5},
+    'admin:socialaccount_socialapp_delete': {'GET': 7},
+    'admin:socialaccount_socialapp_history': {'GET': 5},
+    'admin:socialaccount_socialtoken_add': {'GET': 5},
+    'admin:socialaccount_socialtoken_autocomplete': {'GET': 2},
+    'admin:socialaccount_socialtoken_change': {'GET': 9},
+    'admin:socialaccount_socialtoken_changelist': {'GET': 7},
+    'admin:socialaccount_socialtoken_delete': {'GET': 5},
+    'admin:socialaccount_socialtoken_history': {'GET': 5},
+    'admin:view_on_site': {'GET': 4},
+}
+
+
+def budget_for(view_name, method):
+    """Returns the budget of a route, None when it has none"""
+    return BUDGETS.get(view_name, {}).get(method)
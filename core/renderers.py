@@ -0,0 +1,56 @@
+"""orjson based JSON renderer and parser for the API
+
+Both produce and accept what DRF's JSONRenderer / JSONParser do, except
+NaN and infinities which are rendered as null instead of failing. Types
+orjson does not encode the DRF way (datetimes, Decimal, lazy strings...)
+go through rest_framework.utils.encoders.JSONEncoder. The stdlib json
+classes are used when orjson is not installed, for indented or ASCII
+output (the browsable API) and for values orjson rejects (integers over
+64 bits).
+"""
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_default = JSONEncoder().default
+
+
+def _encode(data):
+    return orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer encoding with orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type or '', renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = _encode(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # as JSONRenderer, for the JSON embedded in <script> tags
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
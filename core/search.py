@@ -0,0 +1,40 @@
+"""User search on the normalized User.search_text column
+
+search_text is "email first_name last_name" in lower case, kept up to
+date by core.signals.set_search_text. On PostgreSQL the column has a
+pg_trgm GIN index, so substring search is index backed. Other backends
+(SQLite in development) match every word as the prefix of a word of the
+column: the email through a range scan on the column's B-tree index,
+the names through LIKE '% word%', which scans.
+"""
+from django.db import connections
+from django.db.models import Q
+
+SEARCH_TEXT_MAX_LENGTH = 767
+# User columns search_text is built from
+SEARCH_TEXT_SOURCES = ('email', 'first_name', 'last_name')
+
+
+def search_text_for(email, first_name, last_name):
+    """Returns the normalized search text of a user"""
+    text = ' '.join(filter(None, (email, first_name, last_name)))
+    return text.lower()[:SEARCH_TEXT_MAX_LENGTH]
+
+
+def search_users(queryset, search_term, field='search_text'):
+    """Filters queryset by every word of search_term
+        field is the path to User.search_text, e.g. 'user__search_text'
+        for a Profile queryset.
+    """
+    trigram = connections[queryset.db].vendor == 'postgresql'
+    for word in search_term.lower().split():
+        if trigram:
+            # LIKE '%word%' uses the gin_trgm_ops index
+            queryset = queryset.filter(**{f'{field}__contains': word})
+        else:
+            # range instead of LIKE 'word%', which SQLite can't serve from the index
+            queryset = queryset.filter(Q(**{
+                f'{field}__gte': word,
+                f'{field}__lt': word + '\uffff',
+            }) | Q(**{f'{field}__contains': ' ' + word}))
+    return queryset
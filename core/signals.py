@@ -1,13 +1,24 @@
 from django.contrib.auth import get_user_model
 from core.models import Profile
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
+from core.search import search_text_for
 from django.dispatch import receiver
 
 User = get_user_model()
 
 
+@receiver(pre_save, sender=User)
+def set_search_text(sender, instance, **kwargs):
+    """Keeps the normalized search column in sync"""
+    instance.search_text = search_text_for(
+        instance.email, instance.first_name, instance.last_name)
+
+
 @receiver(post_save, sender=User)
 def create_profil(sender, instance, created, **kwargs):
    
     if created:
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        # UserManager.create_user may attach the profile fields to the user
+        # so the profile is inserted populated, in one query
+        profile_fields = getattr(instance, '_profile_fields', None) or {}
+        Profile.objects.create(user=instance, **profile_fields)
\ No newline at end of file
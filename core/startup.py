@@ -0,0 +1,67 @@
+"""Worker startup cost, run in a fresh interpreter by manage.py startup_report
+
+    python -X importtime -m core.startup time
+    python -m core.startup memory
+
+Both modes load what a worker loads before its first request (apps,
+URLconf, middleware) with DJANGO_SETTINGS_MODULE and print JSON on
+stdout. "time" prints the total seconds and resident memory, the
+-X importtime tree goes to stderr. "memory" prints the bytes allocated
+by the code of every module, as traced by tracemalloc.
+
+Only the standard library is imported before measuring.
+"""
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from importlib import import_module
+
+
+def load_worker():
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    import_module(settings.ROOT_URLCONF)
+    get_wsgi_application()
+
+
+def resident_kb():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        # peak instead of current, KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure_time():
+    started = time.perf_counter()
+    load_worker()
+    return {'seconds': time.perf_counter() - started, 'rss_kb': resident_kb()}
+
+
+def measure_memory():
+    tracemalloc.start()
+    load_worker()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    modules = {
+        getattr(module, '__file__', None): name
+        for name, module in list(sys.modules.items())
+    }
+    allocated = {}
+    for stat in snapshot.statistics('filename'):
+        name = modules.get(stat.traceback[0].filename)
+        if name is not None:
+            allocated[name] = allocated.get(name, 0) + stat.size
+    return allocated
+
+
+if __name__ == '__main__':
+    measure = {'time': measure_time, 'memory': measure_memory}[sys.argv[1]]
+    print(json.dumps(measure()))
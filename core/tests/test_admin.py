@@ -1,4 +1,6 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.core.cache import cache
+from django.db import connection
 from django.contrib.auth import get_user_model
 from core.models import Profile
 from django.urls import reverse
@@ -170,3 +172,81 @@ class AdminSiteBasicUserProfileTests(TestCase):
         self.assertEqual(resp.status_code, 302)
         self.assertNotEqual(resp.status_code, 200)
 
+
+
+
+class AdminQueryCountTests(TestCase):
+    """Test admin pages run the same number of queries for any table size"""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email = 'admin@testdomain.com',
+            first_name= 'Alpertest',
+            last_name = 'Akbastest',
+            password = 'Testing321..',
+        )
+        self.client.force_login(self.admin_user)
+        self.user = self.create_users(2)[0]
+        self.profil = Profile.objects.get(user=self.user)
+
+    def create_users(self, count):
+        start = get_user_model().objects.count()
+        return [
+            get_user_model().objects.create_user(
+                email = f'test{i}@domain.com',
+                first_name= 'UserFirstName',
+                last_name = 'Testsurname',
+                profile = {'company': f'Company {i}'},
+            )
+            for i in range(start, start + count)
+        ]
+
+    def count_queries(self, url):
+        queries = []
+        def wrapper(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+        with connection.execute_wrapper(wrapper):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(queries)
+
+    def assert_flat_queries(self, url, budget):
+        self.count_queries(url)  # warm up content type and site caches
+        small = self.count_queries(url)
+        self.create_users(15)
+        large = self.count_queries(url)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, budget)
+
+    def test_user_changelist_queries(self):
+        self.assert_flat_queries(reverse('admin:core_user_changelist'), 6)
+
+    def test_user_changelist_search_queries(self):
+        self.assert_flat_queries(
+            reverse('admin:core_user_changelist') + '?q=test', 6)
+
+    def test_user_change_page_queries(self):
+        self.assert_flat_queries(
+            reverse('admin:core_user_change', args=[self.user.id]), 6)
+
+    def test_profile_changelist_queries(self):
+        self.assert_flat_queries(reverse('admin:core_profile_changelist'), 6)
+
+    def test_profile_change_page_queries(self):
+        self.assert_flat_queries(
+            reverse('admin:core_profile_change', args=[self.profil.id]), 7)
+
+    def test_profile_add_page_queries(self):
+        self.assert_flat_queries(reverse('admin:core_profile_add'), 6)
+
+    @override_settings(ADMIN_COUNT_THRESHOLD=5)
+    def test_large_table_count_is_cached(self):
+        """Test the changelist count of a large table is cached"""
+        cache.clear()
+        self.create_users(10)
+        url = reverse('admin:core_user_changelist')
+        first = self.count_queries(url)
+        second = self.count_queries(url)
+        self.assertEqual(second, first - 1)
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core import metrics
+from core.cache import LRUCache, TwoTierCache
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-shared',
+    },
+}
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class TwoTierCacheTests(SimpleTestCase):
+    """Test the local + shared cache"""
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_version_mismatch_is_a_miss(self):
+        cache = TwoTierCache('test')
+        cache.set('key', 'value', version='v1')
+        self.assertEqual(cache.get('key', version='v1'), 'value')
+        self.assertIsNone(cache.get('key', version='v2'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_shared_tier_fills_local_tier(self):
+        """Test a process finds the value set by another one"""
+        writer = TwoTierCache('test', alias='shared')
+        reader = TwoTierCache('test', alias='shared')
+        writer.set('key', 'value', version=1)
+        self.assertEqual(reader.get('key', version=1), 'value')
+        self.assertEqual(reader.get('key', version=1), 'value')
+        stats = reader.stats()
+        self.assertEqual((stats['shared_hits'], stats['local_hits']), (1, 1))
+
+    def test_request_counters_once_per_lookup(self):
+        """Test a two tier lookup is one request cache hit or miss"""
+        cache = TwoTierCache('test', alias='shared')
+        cache.set('key', 'value', version=1)
+        stats, token = metrics.start_request()
+        try:
+            cache.get('key', version=1)
+            # stale local entry, then the shared tier
+            cache.get('key', version=2)
+            cache.get_or_set('other', lambda: 'value', version=1)
+        finally:
+            metrics.stop_request(token)
+        self.assertEqual((stats['cache_hits'], stats['cache_misses']), (1, 2))
+
+    def test_delete_both_tiers(self):
+        cache = TwoTierCache('test', alias='shared')
+        cache.set('key', 'value')
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+        self.assertIsNone(caches['shared'].get('test:key'))
+
+    def test_get_or_set_loads_once_per_process(self):
+        """Test concurrent misses of one key run the loader once"""
+        cache = TwoTierCache('test')
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                cache.get_or_set('key', loader, version=1)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+
+    def test_get_or_set_waits_for_other_process(self):
+        """Test the shared lock holder's value is used"""
+        cache = TwoTierCache('test', alias='shared', lock_timeout=2)
+        other = TwoTierCache('test', alias='shared')
+        caches['shared'].add('test:key:lock', 1)
+        threading.Timer(0.1, lambda: other.set('key', 'other', version=1)).start()
+        value = cache.get_or_set('key', lambda: 'mine', version=1)
+        self.assertEqual(value, 'other')
+        self.assertEqual(cache.stats()['loads'], 0)
+
+    def test_get_or_set_lock_timeout(self):
+        """Test the loader runs when the lock holder never answers"""
+        cache = TwoTierCache('test', alias='shared', lock_timeout=0.1)
+        caches['shared'].add('test:key:lock', 1)
+        self.assertEqual(cache.get_or_set('key', lambda: 'mine', version=1), 'mine')
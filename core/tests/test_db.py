@@ -0,0 +1,71 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core import db, metrics
+
+
+class FakeConnection:
+    """Stands for a connection wrapper holding an open connection"""
+
+    def __init__(self, usable=True, idle=0, in_atomic_block=False):
+        self.connection = object()
+        self.in_atomic_block = in_atomic_block
+        self.released_at = time.monotonic() - idle
+        self.usable = usable
+        self.pings = 0
+
+    def is_usable(self):
+        self.pings += 1
+        return self.usable
+
+    def close(self):
+        self.connection = None
+
+
+@override_settings(DB_CONN_HEALTH_CHECKS=True, DB_CONN_HEALTH_CHECK_INTERVAL=30)
+class ConnectionHealthCheckTests(SimpleTestCase):
+    """Test persistent connections are checked when a request starts"""
+
+    def check(self, conn):
+        with mock.patch.object(db.connections, 'all', return_value=[conn]):
+            db.check_connections(sender=None)
+
+    def test_idle_dead_connection_is_replaced(self):
+        """Test a connection failing the ping is closed"""
+        before = db.connection_stats()['health_check_failures']
+        conn = FakeConnection(usable=False, idle=60)
+        self.check(conn)
+        self.assertEqual(conn.pings, 1)
+        self.assertIsNone(conn.connection)
+        self.assertEqual(db.connection_stats()['health_check_failures'], before + 1)
+
+    def test_idle_live_connection_is_kept(self):
+        conn = FakeConnection(idle=60)
+        self.check(conn)
+        self.assertEqual(conn.pings, 1)
+        self.assertIsNotNone(conn.connection)
+
+    def test_busy_connection_is_not_pinged(self):
+        """Test connections released recently skip the round trip"""
+        conn = FakeConnection(usable=False, idle=1)
+        self.check(conn)
+        self.assertEqual(conn.pings, 0)
+        self.assertIsNotNone(conn.connection)
+
+    def test_connection_in_transaction_is_not_touched(self):
+        conn = FakeConnection(usable=False, idle=60, in_atomic_block=True)
+        self.check(conn)
+        self.assertEqual(conn.pings, 0)
+
+    @override_settings(DB_CONN_HEALTH_CHECKS=False)
+    def test_health_checks_disabled(self):
+        conn = FakeConnection(usable=False, idle=60)
+        self.check(conn)
+        self.assertEqual(conn.pings, 0)
+
+    def test_metrics_registered(self):
+        stats = metrics.collect()['db_connections']
+        for key in ('opened', 'reused', 'health_checks', 'open', 'conn_max_age'):
+            self.assertIn(key, stats)
@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.core.exceptions import ValidationError
+
+from core import domain_policy
+from core.models import email_domain_validator
+from users.forms import check_email_providers
+
+
+class DomainPolicyTests(TestCase):
+    """Test the blocked email domain policy"""
+
+    def test_blocked_domains(self):
+        """Test listed domains and their subdomains are blocked"""
+        self.assertEqual(domain_policy.blocked_domain('test@hotmail.com'), 'hotmail.com')
+        self.assertEqual(domain_policy.blocked_domain('test@eu.Mail.RU'), 'mail.ru')
+        self.assertIsNone(domain_policy.blocked_domain('test@gmail.ru'))
+        self.assertIsNone(domain_policy.blocked_domain('test@domain.com'))
+
+    def test_call_sites(self):
+        """Test model validator and form validator share the policy"""
+        with self.assertRaises(ValidationError):
+            email_domain_validator('test@eu.mail.ru')
+        with self.assertRaises(ValidationError):
+            check_email_providers('test@eu.mail.ru')
+        self.assertEqual(email_domain_validator('test@domain.com'), 'test@domain.com')
+
+    @override_settings(EMAIL_DOMAIN_BLACKLIST=[f'disposable{i}.com' for i in range(100000)])
+    def test_large_list(self):
+        self.assertEqual(
+            domain_policy.blocked_domain('test@x.disposable99999.com'),
+            'disposable99999.com')
+        self.assertEqual(len(domain_policy.get_policy().blocked), 100000)
+
+    def test_file_hot_reload(self):
+        """Test the domain file is reloaded when it changes"""
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write('# disposable providers\ntrashmail.com\n')
+
+        with self.settings(EMAIL_DOMAIN_BLACKLIST_FILE=path,
+                           EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL=0):
+            self.assertEqual(domain_policy.blocked_domain('a@trashmail.com'), 'trashmail.com')
+            self.assertEqual(domain_policy.blocked_domain('a@hotmail.com'), 'hotmail.com')
+            self.assertIsNone(domain_policy.blocked_domain('a@tempmail.com'))
+
+            with open(path, 'a') as f:
+                f.write('tempmail.com  # added later\n')
+            stat = os.stat(path)
+            os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+            self.assertEqual(domain_policy.blocked_domain('a@tempmail.com'), 'tempmail.com')
+
+    def test_missing_file(self):
+        """Test a missing domain file falls back to the settings list"""
+        path = os.path.join(tempfile.mkdtemp(), 'blacklist.txt')
+        self.addCleanup(os.rmdir, os.path.dirname(path))
+        with self.settings(EMAIL_DOMAIN_BLACKLIST_FILE=path,
+                           EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL=0):
+            with self.assertLogs('core.domain_policy', 'ERROR'):
+                self.assertEqual(domain_policy.blocked_domain('a@hotmail.com'), 'hotmail.com')
+            self.assertEqual(email_domain_validator('a@domain.com'), 'a@domain.com')
+
+            with open(path, 'w') as f:
+                f.write('trashmail.com\n')
+            self.addCleanup(os.remove, path)
+            self.assertEqual(domain_policy.blocked_domain('a@trashmail.com'), 'trashmail.com')
@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password, check_password
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import hashers
+
+User = get_user_model()
+
+POOLED_HASHERS = ['core.hashers.PooledPBKDF2PasswordHasher']
+
+
+@override_settings(
+    PASSWORD_HASHERS=POOLED_HASHERS,
+    PASSWORD_HASHING_POOL_SIZE=1,
+    PASSWORD_HASHING_QUEUE_DEPTH=4,
+)
+class PooledHasherTests(TestCase):
+    """Test hashing in the process pool"""
+
+    def setUp(self):
+        hashers.reset_pool()
+        self.addCleanup(hashers.reset_pool)
+
+    def test_hashes_are_compatible(self):
+        """Test pooled hashes verify with the default hasher and vice versa"""
+        encoded = make_password('Testing321..')
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+        self.assertTrue(PBKDF2PasswordHasher().verify('Testing321..', encoded))
+
+        default = PBKDF2PasswordHasher().encode('Testing321..', 'somesalt')
+        self.assertTrue(check_password('Testing321..', default))
+        self.assertFalse(check_password('Wrong321..', default))
+
+    def test_pool_stats(self):
+        """Test latency and queue metrics are collected"""
+        make_password('Testing321..')
+        stats = hashers.pool_stats()
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['rejected'], 0)
+        self.assertIsNotNone(stats['latency_ms']['p50'])
+
+    def test_login_through_pool(self):
+        """Test web login works with the pooled hasher"""
+        User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..')
+        resp = Client().post(reverse('web-login'), {
+            'email': 'testunit@domain.com', 'password': 'Testing321..'})
+        self.assertRedirects(resp, reverse('web-user-profile'))
+
+
+@override_settings(
+    PASSWORD_HASHERS=POOLED_HASHERS,
+    PASSWORD_HASHING_POOL_SIZE=1,
+)
+class SaturatedPoolTests(TestCase):
+    """Test requests are rejected with 503 when the queue is full"""
+
+    def setUp(self):
+        with self.settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher']):
+            User.objects.create_user(
+                email='testunit@domain.com', first_name='UserFirstName',
+                last_name='Testsurname', password='Testing321..')
+        hashers.reset_pool()
+        self.addCleanup(hashers.reset_pool)
+
+    @contextmanager
+    def saturated(self):
+        """The only slot of the queue is taken"""
+        with self.settings(PASSWORD_HASHING_QUEUE_DEPTH=1):
+            slots = hashers.get_pool().slots
+            slots.acquire()
+            try:
+                yield
+            finally:
+                slots.release()
+
+    def test_web_login_rejected(self):
+        """Test web login answers 503 when no hashing slot is free"""
+        with self.saturated():
+            resp = Client().post(reverse('web-login'), {
+                'email': 'testunit@domain.com', 'password': 'Testing321..'})
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp['Retry-After'], '1')
+        self.assertEqual(hashers.pool_stats()['rejected'], 1)
+
+    def test_api_login_rejected(self):
+        """Test rest-auth login answers 503 when no hashing slot is free"""
+        with self.saturated():
+            resp = APIClient().post(reverse('users:rest_login'), {
+                'email': 'testunit@domain.com', 'password': 'Testing321..'})
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_unbounded_queue(self):
+        """Test a queue depth of 0 does not reject hashes"""
+        with self.settings(PASSWORD_HASHING_QUEUE_DEPTH=0):
+            resp = Client().post(reverse('web-login'), {
+                'email': 'testunit@domain.com', 'password': 'Testing321..'})
+        self.assertRedirects(resp, reverse('web-user-profile'))
+        self.assertEqual(hashers.pool_stats()['rejected'], 0)
+
+
+class MetricsViewTests(TestCase):
+    """Test the staff only metrics page"""
+
+    def test_metrics_for_staff_only(self):
+        user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..')
+        client = Client()
+        client.force_login(user)
+        self.assertEqual(client.get(reverse('metrics')).status_code, 302)
+        user.is_staff = True
+        user.save()
+        resp = client.get(reverse('metrics'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('password_hashing', resp.json())
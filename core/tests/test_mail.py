@@ -0,0 +1,158 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import call_command
+from django.contrib.auth.models import Permission
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.mail import send_queued
+from core.models import OutboundEmail, User
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class CountingBackend(LocmemBackend):
+    """locmem backend counting the connections it opens"""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_QUEUE_BACKEND=LOCMEM,
+    EMAIL_QUEUE_MAX_ATTEMPTS=3,
+    EMAIL_QUEUE_RETRY_DELAY=60,
+)
+class QueuedEmailTests(TestCase):
+    """Test the database backed outbound email queue"""
+
+    def queue(self, count=1):
+        for i in range(count):
+            mail.send_mail(f'Subject {i}', 'Body', None, [f'user{i}@domain.com'])
+
+    def test_send_mail_is_queued(self):
+        """Test sending only stores the message"""
+        self.queue()
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.to, ['user0@domain.com'])
+
+    def test_send_queued(self):
+        message = EmailMultiAlternatives(
+            'Subject', 'Body', 'from@domain.com', ['to@domain.com'],
+            cc=['cc@domain.com'], headers={'X-Test': '1'})
+        message.attach_alternative('<p>Body</p>', 'text/html')
+        message.send()
+
+        self.assertEqual(send_queued(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        sent = mail.outbox[0]
+        self.assertEqual(sent.subject, 'Subject')
+        self.assertEqual(sent.cc, ['cc@domain.com'])
+        self.assertEqual(sent.extra_headers, {'X-Test': '1'})
+        self.assertEqual(sent.alternatives, [('<p>Body</p>', 'text/html')])
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.SENT)
+        self.assertEqual(email.attempts, 1)
+        self.assertIsNotNone(email.sent_at)
+        # the body may hold a password reset link
+        self.assertEqual((email.body, email.alternatives), ('', []))
+        self.assertEqual(send_queued(), 0)
+
+    @override_settings(EMAIL_QUEUE_BACKEND='core.tests.test_mail.CountingBackend')
+    def test_batches_reuse_one_connection(self):
+        self.queue(5)
+        CountingBackend.opened = 0
+        self.assertEqual(send_queued(batch_size=2), 5)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_retry_with_backoff(self):
+        """Test failed messages are retried later, then given up"""
+        self.queue(2)
+        with mock.patch.object(LocmemBackend, 'send_messages', side_effect=OSError('down')):
+            self.assertEqual(send_queued(), 0)
+        email = OutboundEmail.objects.first()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertIn('down', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        # not due yet
+        self.assertEqual(send_queued(), 0)
+
+        for attempt in (2, 3):
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            with mock.patch.object(LocmemBackend, 'send_messages', side_effect=OSError('down')):
+                send_queued()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertEqual(email.attempts, 3)
+        self.assertEqual(email.body, '')
+
+    def test_claimed_messages_are_skipped(self):
+        """Test messages held by another worker are not sent twice"""
+        self.queue()
+        OutboundEmail.objects.update(next_attempt_at=timezone.now() + timedelta(minutes=10))
+        self.assertEqual(send_queued(), 0)
+
+    def test_command(self):
+        self.queue(3)
+        out = StringIO()
+        call_command('send_queued_email', stdout=out)
+        self.assertIn('3 messages sent', out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_password_reset_does_not_send_in_request(self):
+        User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..')
+        resp = self.client.post(reverse('password_reset'), {'email': 'testunit@domain.com'})
+        self.assertRedirects(resp, reverse('password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        send_queued(connection=get_connection(LOCMEM))
+        self.assertEqual(mail.outbox[0].to, ['testunit@domain.com'])
+
+
+class OutboundEmailAdminTests(TestCase):
+    """Test queued mail is only shown to superusers, without the bodies"""
+
+    def setUp(self):
+        self.email = OutboundEmail.objects.create(
+            subject='Password reset', body='https://reset/link', to=['user@domain.com'])
+        self.url = reverse('admin:core_outboundemail_change', args=[self.email.pk])
+        self.client = Client()
+
+    def test_staff_without_access(self):
+        staff = User.objects.create_user(
+            email='staff@domain.com', first_name='Staff', last_name='User',
+            password='Testing321..', is_staff=True)
+        staff.user_permissions.add(Permission.objects.get(codename='view_outboundemail'))
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        resp = self.client.get(reverse('admin:core_outboundemail_changelist'))
+        self.assertEqual(resp.status_code, 403)
+
+    def test_superuser_read_only(self):
+        self.client.force_login(User.objects.create_superuser(
+            email='admin@domain.com', first_name='Admin', last_name='User',
+            password='Testing321..'))
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'user@domain.com')
+        self.assertNotContains(resp, 'https://reset/link')
+        self.assertFalse(resp.context['has_change_permission'])
+        resp = self.client.post(self.url, {'subject': 'Changed'})
+        self.assertEqual(resp.status_code, 403)
+        resp = self.client.get(reverse('admin:core_outboundemail_add'))
+        self.assertEqual(resp.status_code, 403)
@@ -0,0 +1,179 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import path, reverse
+
+from core import profiler
+from users.api.async_views import in_thread_pool
+
+User = get_user_model()
+
+URL_INDEX = reverse('index')
+URL_PROFILER = reverse('profiler')
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+async def sleeping_view(request):
+    await asyncio.sleep(0.3)
+    return HttpResponse('slept')
+
+
+def busy_view(request):
+    stop = threading.Event()
+    threading.Timer(0.1, stop.set).start()
+    busy(stop)
+    return HttpResponse('done')
+
+
+# ROOT_URLCONF of the ASGI tests
+urlpatterns = [
+    path('sleeping/', sleeping_view),
+    path('busy/', in_thread_pool(busy_view)),
+]
+
+
+class SamplerTests(TestCase):
+
+    def test_samples_the_thread_stack(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy, args=(stop,))
+        worker.start()
+        sampler = profiler.Sampler(worker.ident, 0.001)
+        sampler.start()
+        time.sleep(0.05)
+        stacks = sampler.stop()
+        stop.set()
+        worker.join()
+
+        self.assertGreater(sum(stacks.values()), 0)
+        stack = stacks.most_common(1)[0][0]
+        self.assertTrue(stack.startswith('_bootstrap ('), stack)
+        self.assertIn(';busy (core/tests/test_profiler.py:', stack)
+
+
+class ProfilerMiddlewareTests(TestCase):
+    """Test the opt-in request profiles"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = Path(directory)
+        settings = override_settings(
+            PROFILER_DIR=directory, PROFILER_SAMPLE_RATE=0, PROFILER_INTERVAL_MS=0.1)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.staff = User.objects.create_user(
+            email='staff@domain.com', first_name='Staff', last_name='User',
+            password='Testing321..', is_staff=True)
+
+    def test_off_by_default(self):
+        """Test requests without the header are not profiled"""
+        with mock.patch.object(profiler, 'Sampler') as sampler:
+            resp = self.client.get(URL_INDEX)
+        sampler.assert_not_called()
+        self.assertNotIn('X-Profile-Id', resp)
+        self.assertEqual(profiler.list_profiles(), [])
+
+    def test_signed_header(self):
+        resp = self.client.get(URL_INDEX, HTTP_X_PROFILE=profiler.signed_header())
+        name = resp['X-Profile-Id']
+        self.assertIn('-GET-index-', name)
+        self.assertEqual([p['name'] for p in profiler.list_profiles()], [name])
+        for line in (self.directory / name).read_text().splitlines():
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+
+    def test_invalid_header(self):
+        for header in ('forged', profiler.signed_header() + 'x'):
+            resp = self.client.get(URL_INDEX, HTTP_X_PROFILE=header)
+            self.assertNotIn('X-Profile-Id', resp)
+
+    @override_settings(PROFILER_SIGNATURE_MAX_AGE=60)
+    def test_expired_header(self):
+        header = profiler.signed_header()
+        with mock.patch('time.time', return_value=time.time() + 120):
+            resp = self.client.get(URL_INDEX, HTTP_X_PROFILE=header)
+        self.assertNotIn('X-Profile-Id', resp)
+
+    @override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_KEEP=2)
+    def test_sampled_and_pruned(self):
+        """Test sampled requests are profiled, the newest are kept"""
+        names = [self.client.get(URL_INDEX)['X-Profile-Id'] for _ in range(3)]
+        self.assertEqual(
+            [p['name'] for p in profiler.list_profiles()], names[:0:-1])
+
+    def test_download_staff_only(self):
+        name = self.client.get(
+            URL_INDEX, HTTP_X_PROFILE=profiler.signed_header())['X-Profile-Id']
+        url = reverse('profiler-download', args=[name])
+        self.assertEqual(self.client.get(URL_PROFILER).status_code, 302)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        resp = self.client.get(URL_PROFILER)
+        self.assertEqual(resp.json()['profiles'][0]['name'], name)
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('attachment', resp['Content-Disposition'])
+        self.assertEqual(
+            b''.join(resp.streaming_content), (self.directory / name).read_bytes())
+
+    def test_download_unknown_names(self):
+        self.client.force_login(self.staff)
+        (self.directory / '.hidden.collapsed').write_text('')
+        for name in ('missing.collapsed', '.hidden.collapsed', '..', 'settings.py'):
+            resp = self.client.get(reverse('profiler-download', args=[name]))
+            self.assertEqual(resp.status_code, 404, name)
+
+    def test_profile_header_command(self):
+        out = StringIO()
+        call_command('profile_header', stdout=out)
+        name, value = out.getvalue().strip().split(': ')
+        self.assertEqual(name, 'X-Profile')
+        self.assertTrue(profiler.valid_header(value))
+
+
+@override_settings(ROOT_URLCONF=__name__, PROFILER_SAMPLE_RATE=1, PROFILER_INTERVAL_MS=1)
+class ProfilerMiddlewareASGITests(TransactionTestCase):
+    """Test profiled requests under ASGI"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = Path(directory)
+        settings = override_settings(PROFILER_DIR=directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_concurrent_requests(self):
+        """Test profiled coroutine views still run concurrently"""
+        async def requests():
+            return await asyncio.gather(*(AsyncClient().get('/sleeping/') for _ in range(6)))
+
+        started = time.perf_counter()
+        responses = asyncio.run(requests())
+        # one after the other would take 1.8s
+        self.assertLess(time.perf_counter() - started, 1.2)
+        names = {resp['X-Profile-Id'] for resp in responses}
+        self.assertEqual(len(names), 6)
+
+    def test_samples_the_view_thread(self):
+        """Test the pool thread running the view is sampled, not the event loop"""
+        resp = asyncio.run(AsyncClient().get('/busy/'))
+        stacks = (self.directory / resp['X-Profile-Id']).read_text()
+        self.assertIn(';busy_view (core/tests/test_profiler.py:', stacks)
+        self.assertNotIn('run_until_complete', stacks)
@@ -0,0 +1,388 @@
+import itertools
+import json
+import shutil
+import tempfile
+from collections import Counter
+from urllib.parse import urlencode
+
+from allauth.account.models import EmailAddress
+from allauth.socialaccount.models import SocialAccount, SocialApp, SocialToken
+from django.contrib import admin
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.authtoken.models import Token
+
+from core import profiler
+from core.models import OutboundEmail, Profile
+from core.query_budgets import BUDGETS, budget_for
+from users.api.authentication import token_cache
+from users.api.payloads import payload_cache
+from users.api.tokens import issue_token_pair
+
+User = get_user_model()
+
+PASSWORD = 'Testing321..'
+
+# Routes the sweep does not request, with the reason
+NOT_SWEPT = {
+    # pool threads do not see the test transaction, they run the views of
+    # current-user, current-user-profile and profile-detail
+    'users:async-current-user': 'async',
+    'users:async-current-user-profile': 'async',
+    'users:async-profile-detail': 'async',
+}
+
+# Routes only answering with the signed tokens on, which need a shared
+# revocation cache
+SIGNED_TOKEN_ROUTES = {'users:token-refresh'}
+SIGNED_TOKEN_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+# HELPER FUNCTIONS
+def url_names(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            inner = namespace
+            if pattern.namespace:
+                inner = f'{namespace}:{pattern.namespace}' if namespace else pattern.namespace
+            yield from url_names(pattern.url_patterns, inner)
+        elif pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+class QueryCounter:
+    """Counts the queries of a block, execute_wrapper is used since the
+        test client resets connection.queries when a request starts
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+# production queues the emails of the password reset routes
+@override_settings(EMAIL_BACKEND='core.mail.QueuedEmailBackend')
+class QueryBudgetTests(TestCase):
+    """Every route stays within its query budget, whatever the table sizes"""
+    SMALL = 2
+    LARGE = 25
+
+    def setUp(self):
+        self.counter = itertools.count()
+        self.admin = User.objects.create_superuser(
+            email='admin@domain.com', first_name='Admin', last_name='Budget',
+            password=PASSWORD)
+        self.admin_token = Token.objects.create(user=self.admin)
+        self.user = User.objects.create_user(
+            email='user@domain.com', first_name='User', last_name='Budget',
+            password=PASSWORD)
+        self.login_user = User.objects.create_user(
+            email='login@domain.com', first_name='Login', last_name='Budget',
+            password=PASSWORD)
+        self.password_user = User.objects.create_user(
+            email='password@domain.com', first_name='Password', last_name='Budget',
+            password=PASSWORD)
+        self.social_app = SocialApp.objects.create(
+            provider='github', name='GitHub', client_id='id', secret='secret')
+        self.social_app.sites.add(Site.objects.get_current())
+        profiles = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profiles)
+        settings = override_settings(PROFILER_DIR=profiles)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.profile_name = profiler.save(
+            Counter({'main;view': 1}), RequestFactory().get('/'))
+        self.seed(self.SMALL)
+
+    def seed(self, count):
+        """Adds count users with a profile, token, email address, social
+            account and token, and a queued email
+        """
+        for _ in range(count):
+            i = next(self.counter)
+            user = User.objects.create_user(
+                email=f'seed{i}@domain.com', first_name=f'First{i}',
+                last_name=f'Last{i}', profile={'company': f'Company{i}'})
+            Token.objects.create(user=user)
+            EmailAddress.objects.create(user=user, email=user.email, verified=True, primary=True)
+            account = SocialAccount.objects.create(user=user, provider='github', uid=str(i))
+            SocialToken.objects.create(app=self.social_app, account=account, token=f'token{i}')
+            OutboundEmail.objects.create(subject=f'Subject {i}', body='Body', to=[user.email])
+
+    # REQUESTS
+    # Each builder maps route names to (method, path, data, auth) or a list
+    # of them, auth is None or a key of client_for. A route requested with
+    # several auths has to fit its budget with each
+
+    def admin_object_ids(self):
+        profile_id = Profile.objects.get(user=self.user).pk
+        return {
+            'core_user': self.user.pk,
+            'core_profile': profile_id,
+            'core_outboundemail': OutboundEmail.objects.first().pk,
+            'authtoken_tokenproxy': self.admin_token.pk,
+            'account_emailaddress': EmailAddress.objects.first().pk,
+            'sites_site': Site.objects.get_current().pk,
+            'socialaccount_socialapp': self.social_app.pk,
+            'socialaccount_socialaccount': SocialAccount.objects.first().pk,
+            'socialaccount_socialtoken': SocialToken.objects.first().pk,
+        }
+
+    def admin_requests(self):
+        requests = {
+            'admin:index': ('GET', reverse('admin:index'), None, 'session'),
+            'admin:login': ('GET', reverse('admin:login'), None, None),
+            'admin:logout': ('GET', reverse('admin:logout'), None, 'session'),
+            'admin:password_change': ('GET', reverse('admin:password_change'), None, 'session'),
+            'admin:password_change_done': (
+                'GET', reverse('admin:password_change_done'), None, 'session'),
+            'admin:jsi18n': ('GET', reverse('admin:jsi18n'), None, 'session'),
+            'admin:view_on_site': ('GET', reverse('admin:view_on_site', args=[
+                ContentType.objects.get_for_model(Profile).pk, self.user.pk]), None, 'session'),
+            'admin:app_list': ('GET', reverse('admin:app_list', args=['core']), None, 'session'),
+            'admin:auth_user_password_change': (
+                'GET', reverse('admin:auth_user_password_change', args=[self.user.pk]),
+                None, 'session'),
+        }
+        object_ids = self.admin_object_ids()
+        for model in admin.site._registry:
+            prefix = f'{model._meta.app_label}_{model._meta.model_name}'
+            for page in ('changelist', 'add', 'autocomplete'):
+                name = f'admin:{prefix}_{page}'
+                requests[name] = ('GET', reverse(name), None, 'session')
+            for page in ('change', 'history', 'delete'):
+                name = f'admin:{prefix}_{page}'
+                requests[name] = (
+                    'GET', reverse(name, args=[object_ids[prefix]]), None, 'session')
+        return requests
+
+    def web_requests(self):
+        i = next(self.counter)
+        uidb64 = urlsafe_base64_encode(force_bytes(self.user.pk))
+        # the last login of the user changes with the login routes
+        token = default_token_generator.make_token(User.objects.get(pk=self.user.pk))
+        return {
+            'index': ('GET', reverse('index'), None, 'session'),
+            'metrics': ('GET', reverse('metrics'), None, 'session'),
+            'profiler': ('GET', reverse('profiler'), None, 'session'),
+            'profiler-download': ('GET', reverse(
+                'profiler-download', args=[self.profile_name]), None, 'session'),
+            'web-register': [
+                ('GET', reverse('web-register'), None, None),
+                ('POST', reverse('web-register'), {
+                    'first_name': 'First', 'last_name': 'Last',
+                    'password1': PASSWORD, 'password2': PASSWORD,
+                    'email': f'web{i}@domain.com', 'verify_email': f'web{i}@domain.com',
+                    'title': 'mr.', 'company': 'Company', 'position': 'Engineer',
+                    'country': 'Kyrat', 'city': 'SomeCity'}, None),
+            ],
+            'web-login': [
+                ('GET', reverse('web-login'), None, None),
+                ('POST', reverse('web-login'),
+                 {'email': self.user.email, 'password': PASSWORD}, None),
+            ],
+            'web-logout': ('GET', reverse('web-logout'), None, 'session'),
+            'web-password-change': ('GET', reverse('web-password-change'), None, 'session'),
+            'web-user-profile': ('GET', reverse('web-user-profile'), None, 'session'),
+            'password_reset': [
+                ('GET', reverse('password_reset'), None, None),
+                ('POST', reverse('password_reset'), {'email': self.user.email}, None),
+            ],
+            'password_reset_done': ('GET', reverse('password_reset_done'), None, None),
+            'password_reset_confirm': ('GET', reverse(
+                'password_reset_confirm', args=[uidb64, token]), None, None),
+            'password_reset_complete': [
+                ('GET', reverse('password_reset_complete'), None, None),
+                ('GET', reverse('password_reset_complete'), None, 'session'),
+            ],
+            'rest_framework:login': ('GET', reverse('rest_framework:login'), None, None),
+            'rest_framework:logout': ('GET', reverse('rest_framework:logout'), None, 'session'),
+        }
+
+    def api_requests(self):
+        i = next(self.counter)
+        profile_id = Profile.objects.get(user=self.user).pk
+        batch_url = reverse('users:profile-batch') + f'?ids={profile_id},{profile_id + 1000}'
+        # rest_logout deletes the token of the user
+        Token.objects.get_or_create(user=self.user)
+        # the first login creates the token
+        Token.objects.filter(user=self.login_user).delete()
+        # the reset token changes with the password
+        password_user = User.objects.get(pk=self.password_user.pk)
+        return {
+            'users:api-root': [
+                ('GET', reverse('users:api-root'), None, 'token'),
+                ('GET', reverse('users:api-root'), None, 'session'),
+            ],
+            'users:api-user-register': ('POST', reverse('users:api-user-register'), {
+                'email': f'api{i}@domain.com', 'verify_email': f'api{i}@domain.com',
+                'first_name': 'First', 'last_name': 'Last',
+                'password': PASSWORD, 'verify_password': PASSWORD,
+                'title': 'mr.', 'company': 'Company', 'position': 'Engineer',
+                'country': 'Kyrat', 'city': 'SomeCity'}, None),
+            'users:current-user-profile': [
+                ('GET', reverse('users:current-user-profile'), None, 'user_token'),
+                ('GET', reverse('users:current-user-profile'), None, 'user_session'),
+                ('PATCH', reverse('users:current-user-profile'),
+                 {'company': f'Company{i}'}, 'user_token'),
+                ('PATCH', reverse('users:current-user-profile'),
+                 {'company': f'Company{i}'}, 'user_session'),
+            ],
+            'users:current-user': [
+                ('GET', reverse('users:current-user'), None, 'user_token'),
+                ('GET', reverse('users:current-user'), None, 'user_session'),
+            ],
+            'users:rest_user_details': [
+                ('GET', reverse('users:rest_user_details'), None, 'user_token'),
+                ('GET', reverse('users:rest_user_details'), None, 'user_session'),
+            ],
+            'users:profile-list': [
+                ('GET', reverse('users:profile-list'), None, 'token'),
+                ('GET', reverse('users:profile-list'), None, 'session'),
+            ],
+            'users:profile-search': [
+                ('GET', reverse('users:profile-search') + '?q=first', None, 'token'),
+                ('GET', reverse('users:profile-search') + '?q=first', None, 'session'),
+            ],
+            'users:profile-batch': [
+                ('GET', batch_url, None, 'token'),
+                ('GET', batch_url, None, 'session'),
+            ],
+            'users:profile-bulk': [
+                ('PATCH', reverse('users:profile-bulk'),
+                 [{'id': profile_id, 'city': f'City{i}'}], 'token'),
+                ('PATCH', reverse('users:profile-bulk'),
+                 [{'id': profile_id, 'city': f'City{i}'}], 'session'),
+            ],
+            'users:profile-export': [
+                ('GET', reverse('users:profile-export'), None, 'token'),
+                ('GET', reverse('users:profile-export'), None, 'session'),
+            ],
+            'users:profile-detail': [
+                ('GET', reverse('users:profile-detail', args=[profile_id]), None, 'token'),
+                ('GET', reverse('users:profile-detail', args=[profile_id]), None, 'session'),
+            ],
+            'users:rest_login': ('POST', reverse('users:rest_login'),
+                                 {'email': self.login_user.email, 'password': PASSWORD}, None),
+            'users:rest_logout': [
+                ('POST', reverse('users:rest_logout'), None, 'user_token'),
+                ('POST', reverse('users:rest_logout'), None, 'user_session'),
+            ],
+            'users:token-refresh': ('POST', reverse('users:token-refresh'),
+                                    {'refresh': issue_token_pair(self.user)['refresh']}, None),
+            'users:rest_password_reset': ('POST', reverse('users:rest_password_reset'),
+                                          {'email': self.user.email}, None),
+            'users:rest_password_reset_confirm': (
+                'POST', reverse('users:rest_password_reset_confirm'), {
+                    'uid': urlsafe_base64_encode(force_bytes(password_user.pk)),
+                    'token': default_token_generator.make_token(password_user),
+                    'new_password1': PASSWORD, 'new_password2': PASSWORD,
+                }, None),
+            'users:rest_password_change': (
+                'POST', reverse('users:rest_password_change'),
+                {'new_password1': PASSWORD, 'new_password2': PASSWORD}, 'password_token'),
+        }
+
+    def all_requests(self):
+        requests = {}
+        for builder in (self.admin_requests, self.web_requests, self.api_requests):
+            for name, spec in builder().items():
+                for method, path, data, auth in spec if isinstance(spec, list) else [spec]:
+                    requests[(name, method, auth)] = (path, data)
+        return requests
+
+    def client_for(self, auth):
+        client = Client()
+        if auth == 'session':
+            client.force_login(self.admin)
+        elif auth == 'token':
+            client.defaults['HTTP_AUTHORIZATION'] = f'Token {self.admin_token.key}'
+        elif auth == 'user_session':
+            client.force_login(self.user)
+        elif auth == 'user_token':
+            token, _ = Token.objects.get_or_create(user=self.user)
+            client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        elif auth == 'password_token':
+            token, _ = Token.objects.get_or_create(user=self.password_user)
+            client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        return client
+
+    def clear_caches(self):
+        """Process caches a new worker starts without"""
+        cache.clear()
+        token_cache.clear()
+        payload_cache.clear()
+        ContentType.objects.clear_cache()
+        Site.objects.clear_cache()
+
+    def count_queries(self, key):
+        """Queries of the route in a cold process, then in a warm one"""
+        counts = []
+        for i in range(2):
+            # fresh data (emails, tokens...) for every request
+            name, method, auth = key
+            path, data = self.all_requests()[key]
+            client = self.client_for(auth)
+            if i == 0:
+                # building the requests fills the site and content type caches
+                self.clear_caches()
+            counter = QueryCounter()
+            signed = override_settings(API_SIGNED_TOKENS=True, CACHES=SIGNED_TOKEN_CACHES) \
+                if name in SIGNED_TOKEN_ROUTES else override_settings(API_SIGNED_TOKENS=False)
+            with signed, connection.execute_wrapper(counter):
+                response = client.generic(
+                    method, path, data=self.encode(name, data),
+                    content_type=self.content_type(name))
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 500, key)
+            counts.append(counter.count)
+        return counts
+
+    def encode(self, name, data):
+        if data is None:
+            return ''
+        if self.content_type(name) == 'application/json':
+            return json.dumps(data)
+        return urlencode(data)
+
+    def content_type(self, name):
+        return 'application/json' if name.startswith('users:') \
+            else 'application/x-www-form-urlencoded'
+
+    def measure(self):
+        return {key: self.count_queries(key) for key in self.all_requests()}
+
+    def test_every_route_has_a_budget(self):
+        """Test new routes declare their budget"""
+        routes = set(url_names(get_resolver().url_patterns))
+        missing = sorted(routes - set(BUDGETS))
+        self.assertEqual(missing, [])
+        swept = {name for name, _, _ in self.all_requests()}
+        self.assertEqual(sorted(routes - swept - set(NOT_SWEPT)), [])
+
+    def test_queries_within_budget_and_constant(self):
+        """Test the queries do not grow with the table sizes"""
+        small = self.measure()
+        self.seed(self.LARGE - self.SMALL)
+        large = self.measure()
+
+        for key, counts in large.items():
+            with self.subTest(route=key):
+                self.assertEqual(counts, small[key], 'queries grow with the tables')
+                budget = budget_for(*key[:2])
+                self.assertIsNotNone(budget, 'no budget')
+                self.assertLessEqual(max(counts), budget, 'over budget')
@@ -0,0 +1,101 @@
+import datetime
+import decimal
+import io
+import uuid
+from collections import OrderedDict
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from core import renderers
+from core.renderers import FastJSONParser, FastJSONRenderer
+
+User = get_user_model()
+
+PAYLOAD = ReturnDict({
+    'id': 1,
+    'email': 'testunit@domain.com',
+    'name': 'Ünïcode ✈',
+    'separator': 'line\u2028paragraph\u2029',
+    'created': datetime.datetime(2021, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+    'naive': datetime.datetime(2021, 1, 2, 3, 4, 5),
+    'day': datetime.date(2021, 1, 2),
+    'time': datetime.time(3, 4, 5, 123456),
+    'duration': datetime.timedelta(minutes=2),
+    'amount': decimal.Decimal('1.50'),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy': gettext_lazy('Service is busy'),
+    'groups': [1, 2],
+    'nested': OrderedDict([('b', None), ('a', [True, False, 1.5])]),
+}, serializer=None)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_same_output_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+
+    def test_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_indent_and_large_integers_fall_back(self):
+        for data, media_type in (
+                (PAYLOAD, 'application/json; indent=4'),
+                ({'big': 2 ** 70}, 'application/json')):
+            self.assertEqual(
+                FastJSONRenderer().render(data, media_type),
+                JSONRenderer().render(data, media_type))
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse(self, body, parser=FastJSONParser, encoding='utf-8'):
+        return parser().parse(io.BytesIO(body), parser_context={'encoding': encoding})
+
+    def test_same_result_as_json_parser(self):
+        body = '{"name": "Ünïcode ✈", "n": [1, 2.5, null, true]}'.encode()
+        self.assertEqual(self.parse(body), self.parse(body, JSONParser))
+
+    def test_invalid(self):
+        for body in (b'', b'{"a":', b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                self.parse(body)
+
+    def test_other_charsets_fall_back(self):
+        body = '{"name": "Ünïcode"}'.encode('latin-1')
+        self.assertEqual(self.parse(body, encoding='latin-1'), {'name': 'Ünïcode'})
+
+
+class JSONOnlyAPITests(TestCase):
+    """Test the API speaks JSON only outside DEBUG"""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..')
+        self.client.force_authenticate(user)
+
+    def test_json(self):
+        resp = self.client.patch(
+            reverse('users:current-user-profile'), {'company': 'Ünïcode'}, format='json')
+        self.assertEqual(resp['Content-Type'], 'application/json')
+        self.assertEqual(resp.json()['company'], 'Ünïcode')
+
+    def test_browsable_api_not_served(self):
+        resp = self.client.get(reverse('users:current-user'), HTTP_ACCEPT='text/html')
+        self.assertEqual(resp.status_code, 406)
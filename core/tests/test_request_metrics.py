@@ -0,0 +1,104 @@
+import json
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics, query_budgets
+
+User = get_user_model()
+
+URL_CURRENT_USR = reverse('users:current-user-profile')
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    """Test the per request instrumentation"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..')
+        # without the profile cached on the instance
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        """Test Server-Timing header and log line of a sampled request"""
+        with self.assertLogs('core.requests', 'INFO') as logs:
+            resp = self.client.get(URL_CURRENT_USR)
+        timing = resp['Server-Timing']
+        for name in ('total;dur=', 'view;dur=', 'db;dur=', 'cache;desc='):
+            self.assertIn(name, timing)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'users:current-user-profile')
+        self.assertEqual(record['status'], 200)
+        # etag and profile queries, plus the payload cache lookup
+        self.assertEqual(record['queries'], 2)
+        self.assertIn(f'desc="{record["queries"]} queries"', timing)
+        self.assertGreaterEqual(record['cache_misses'], 1)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        resp = self.client.get(URL_CURRENT_USR)
+        self.assertNotIn('Server-Timing', resp)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0, REQUEST_METRICS_SLOW_MS=50)
+    def test_slow_request_logs_sql(self):
+        """Test slow requests are logged with their slowest queries"""
+        def slow_query(execute, sql, params, many, context):
+            if 'core_profile' in sql:
+                time.sleep(0.06)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(slow_query):
+            with self.assertLogs('core.requests', 'WARNING') as logs:
+                resp = self.client.get(URL_CURRENT_USR)
+        self.assertNotIn('Server-Timing', resp)
+        record = logs.records[0].request_metrics
+        self.assertEqual(len(record['slowest_sql']), 2)
+        self.assertIn('core_profile', record['slowest_sql'][0]['sql'])
+        self.assertLessEqual(
+            record['slowest_sql'][1]['ms'], record['slowest_sql'][0]['ms'])
+        self.assertGreaterEqual(record['slowest_sql'][0]['ms'], 60)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0, REQUEST_METRICS_SLOW_MS=0)
+    def test_disabled(self):
+        """Test nothing is collected when sampling and slow log are off"""
+        with mock.patch.object(metrics, 'start_request') as start_request:
+            self.client.get(URL_CURRENT_USR)
+        start_request.assert_not_called()
+        self.assertFalse(metrics.collecting())
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_over_query_budget(self):
+        """Test requests over their query budget are logged as WARNING"""
+        budgets = {'users:current-user-profile': {'GET': 1}}
+        with mock.patch.dict(query_budgets.BUDGETS, budgets, clear=True):
+            with self.assertLogs('core.requests', 'WARNING') as logs:
+                self.client.get(URL_CURRENT_USR)
+        record = logs.records[0].request_metrics
+        self.assertIn('query budget', logs.records[0].getMessage())
+        self.assertEqual(record['query_budget'], 1)
+        self.assertEqual(record['queries'], 2)
+
+
+class RequestStatsTests(SimpleTestCase):
+
+    def test_keeps_slowest_queries(self):
+        """Test only keep_sql queries are kept, slowest first"""
+        stats, token = metrics.start_request(keep_sql=2)
+        try:
+            for duration in (3, 1, 7, 2, 5):
+                metrics.record_query(f'SELECT {duration}', duration)
+        finally:
+            metrics.stop_request(token)
+        self.assertEqual(len(stats['sql']), 2)
+        self.assertEqual(metrics.slowest_sql(stats), [(7, 'SELECT 7'), (5, 'SELECT 5')])
+        self.assertEqual((stats['queries'], stats['db_ms']), (5, 18))
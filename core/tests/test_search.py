@@ -0,0 +1,67 @@
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from core.search import search_text_for, search_users
+
+User = get_user_model()
+
+
+class UserSearchTests(TestCase):
+    """Test the normalized search column and search_users"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='Alper.Akbas@Domain.com', first_name='Alper',
+            last_name='Akbas', password='Testing321..')
+        User.objects.create_user(
+            email='someone@domain.com', first_name='Some',
+            last_name='One', password='Testing321..')
+
+    def test_search_text_is_maintained(self):
+        """Test search_text follows the user on save"""
+        self.assertEqual(self.user.search_text, 'alper.akbas@domain.com alper akbas')
+        self.user.first_name = 'Changed'
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.search_text, 'alper.akbas@domain.com changed akbas')
+
+    def test_search_text_with_update_fields(self):
+        """Test a partial save of a name writes search_text too"""
+        self.user.last_name = 'Renamed'
+        self.user.save(update_fields=['last_name'])
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).search_text,
+            'alper.akbas@domain.com alper renamed')
+        self.assertEqual(list(search_users(User.objects.all(), 'renamed')), [self.user])
+
+    def test_search_text_for(self):
+        self.assertEqual(search_text_for('A@B.com', 'First', None), 'a@b.com first')
+
+    def test_prefix_search(self):
+        """Test email prefixes match case insensitively on SQLite"""
+        found = search_users(User.objects.all(), 'ALPER')
+        self.assertEqual(list(found), [self.user])
+        found = search_users(User.objects.all(), 'alper.akbas@domain.com alper')
+        self.assertEqual(list(found), [self.user])
+        self.assertFalse(search_users(User.objects.all(), 'nobody').exists())
+
+    def test_name_search(self):
+        """Test every word matches the beginning of any word of the column"""
+        for term in ('akbas', 'Alper Akbas', 'alp akb', 'akbas alper.akbas@'):
+            found = search_users(User.objects.all(), term)
+            self.assertEqual(list(found), [self.user], term)
+        for term in ('lper', 'alper one', 'bas'):
+            self.assertFalse(search_users(User.objects.all(), term).exists(), term)
+
+    def test_admin_search(self):
+        """Test the user changelist uses search_users"""
+        admin_user = User.objects.create_superuser(
+            email='admin@testdomain.com', first_name='Admin',
+            last_name='Akbastest', password='Testing321..')
+        client = Client()
+        client.force_login(admin_user)
+        resp = client.get(reverse('admin:core_user_changelist'), {'q': 'alper'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'Alper.Akbas@domain.com')
+        self.assertNotContains(resp, 'someone@domain.com')
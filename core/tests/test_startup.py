@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.management.commands.startup_report import owner, parse_importtime
+
+PRODUCTION_CHECK = '''
+import json
+import django
+django.setup()
+from django.conf import settings
+from django.urls import reverse
+from aeronautica import urls
+print(json.dumps({
+    'apps': settings.INSTALLED_APPS,
+    'renderers': settings.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'],
+    'debug': settings.DEBUG,
+    'login': reverse('users:rest_login'),
+}))
+'''
+
+
+def run_production(**env):
+    env = dict(
+        {key: value for key, value in os.environ.items() if key != 'DEVELOPMENT_MODE'},
+        DJANGO_SETTINGS_MODULE='aeronautica.settings_production',
+        DATABASE_URL='sqlite:///production-check.sqlite3',
+        **env)
+    return subprocess.run(
+        [sys.executable, '-c', PRODUCTION_CHECK], cwd=settings.BASE_DIR,
+        env=env, capture_output=True, text=True)
+
+
+class ProductionSettingsTests(SimpleTestCase):
+
+    def test_serving_apps_only(self):
+        result = run_production(DJANGO_SECRET_KEY='production-secret', DEBUG='True', API_BROWSABLE='True')
+        self.assertEqual(result.returncode, 0, result.stderr)
+        loaded = json.loads(result.stdout)
+        for app in ('django_extensions', 'allauth.socialaccount', 'rest_auth.registration'):
+            self.assertNotIn(app, loaded['apps'])
+        for app in ('crispy_forms', 'allauth.account', 'rest_auth', 'core', 'users'):
+            self.assertIn(app, loaded['apps'])
+        self.assertEqual(loaded['renderers'], ['core.renderers.FastJSONRenderer'])
+        self.assertFalse(loaded['debug'])
+        self.assertEqual(loaded['login'], '/api/user/rest-auth/login/')
+
+    def test_secret_key_required(self):
+        result = run_production(DJANGO_SECRET_KEY='')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('DJANGO_SECRET_KEY environment variable not defined', result.stderr)
+
+
+class StartupReportTests(SimpleTestCase):
+
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     django.utils.version\n'
+            'import time:        80 |        200 |   django\n'
+            'unrelated line\n'
+        )
+        self.assertEqual(
+            parse_importtime(output), {'django.utils.version': 120, 'django': 80})
+
+    def test_owner(self):
+        app_names = ['django.contrib.admin', 'django.contrib', 'core']
+        self.assertEqual(owner('django.contrib.admin.sites', app_names), 'django.contrib.admin')
+        self.assertEqual(owner('core', app_names), 'core')
+        self.assertEqual(owner('corelib.x', app_names), 'corelib')
+        self.assertEqual(owner('django.db.models', app_names), 'django')
+
+    def test_report(self):
+        out = StringIO()
+        call_command('startup_report', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertGreater(report['seconds'], 0)
+        self.assertGreater(report['rss_kb'], 0)
+        names = {row['name']: row for row in report['apps']}
+        self.assertGreater(names['core']['modules'], 0)
+        self.assertGreater(names['django']['import_ms'], 0)
+        self.assertGreater(names['django']['memory_kb'], 0)
@@ -1,4 +1,8 @@
 from django.shortcuts import render, HttpResponse, redirect
+from django.http import FileResponse, Http404, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+
+from core import metrics, profiler
 
 # Create your views here.
 def home_view(request):
@@ -7,4 +11,27 @@ def home_view(request):
             f"""<h1>Home Page</h1><br><p>You are loggedin as {request.user.email}</p>"""
             )
     else:
-        return redirect('web-register')
\ No newline at end of file
+        return redirect('web-register')
+
+
+@staff_member_required
+def metrics_view(request):
+    """Process local counters of hashing, caches etc. for staff users"""
+    return JsonResponse(metrics.collect())
+
+
+@staff_member_required
+def profiler_view(request):
+    """Saved request profiles, newest first"""
+    return JsonResponse({'profiles': profiler.list_profiles()})
+
+
+@staff_member_required
+def profiler_download_view(request, name):
+    """Collapsed stacks of a profile, input of flamegraph.pl or speedscope"""
+    path = profiler.profile_path(name)
+    if path is None:
+        raise Http404('No such profile')
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True, filename=name,
+        content_type='text/plain; charset=utf-8')
@@ -0,0 +1,60 @@
+"""Async variants of the hot read endpoints, for ASGI servers
+
+Django 3.1 has no async ORM, so each view is a coroutine which hands the
+whole request (authentication, queries, serialization and rendering) to
+one sync_to_async call on the thread pool. The event loop is never
+blocked and, unlike sync views under ASGI which all share one thread
+(thread_sensitive=True), requests of different clients run in parallel.
+
+The work is done by the sync DRF views, responses are the same: same
+authentication classes, permissions, payload cache and ETag handling.
+Only GET / HEAD are served.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from core import db, profiler
+from users.api import views
+
+SAFE_METHODS = ['get', 'head', 'options']
+
+
+def in_thread_pool(view):
+    """Wraps a sync view into a coroutine running it on the thread pool
+
+    Pool threads hold their own database connections, they are recycled
+    and health checked around each call the way request_started /
+    request_finished do it for the request thread. A profiled request
+    (core.profiler) is sampled in the pool thread.
+    """
+    def run(request, *args, **kwargs):
+        profiler.sample_this_thread(request)
+        close_old_connections()
+        db.check_connections(sender=None)
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+            db.mark_released(sender=None)
+
+    run_async = sync_to_async(run, thread_sensitive=False)
+
+    async def async_view(request, *args, **kwargs):
+        return await run_async(request, *args, **kwargs)
+
+    # DRF views do their own csrf check for session authentication
+    async_view.csrf_exempt = True
+    return async_view
+
+
+current_user = in_thread_pool(
+    views.CurrentUserDisplayAPIView.as_view(http_method_names=SAFE_METHODS))
+
+current_user_profile = in_thread_pool(
+    views.ProfileRetrieveUpdateAPIView.as_view(http_method_names=SAFE_METHODS))
+
+profile_detail = in_thread_pool(
+    views.ProfileModelViewSet.as_view({'get': 'retrieve'}))
@@ -0,0 +1,195 @@
+import threading
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication, TokenAuthentication, get_authorization_header)
+from rest_framework.permissions import SAFE_METHODS
+
+from core import metrics
+from core.cache import LRUCache
+from users.api import tokens
+
+User = get_user_model()
+
+# Concrete user columns kept in the cache, the user is rebuilt with from_db.
+# The password hash is left out, it is loaded on access (deferred field).
+USER_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields if field.attname != 'password')
+
+token_cache = LRUCache(
+    maxsize=settings.TOKEN_AUTH_CACHE_SIZE,
+    ttl=settings.TOKEN_AUTH_CACHE_LOCAL_TTL,
+)
+shared_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def shared_cache():
+    alias = settings.TOKEN_AUTH_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    return f'auth:token:{key}'
+
+
+def generation_key(key):
+    return f'auth:token:{key}:generation'
+
+
+def bump_generations(cache, keys):
+    """Entries cached with an older generation are not used anymore
+        Kept longer than any entry built with the previous generation
+    """
+    cache.set_many(
+        {generation_key(key): uuid.uuid4().hex for key in keys},
+        settings.TOKEN_AUTH_CACHE_TTL + settings.TOKEN_AUTH_CACHE_LOCAL_TTL)
+
+
+def invalidate_token(key):
+    token_cache.delete(key)
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(shared_key(key))
+        bump_generations(cache, [key])
+
+
+def invalidate_user(user_id):
+    """Drops the cached tokens of a user (deactivation, password change...)"""
+    token_cache.delete_where(lambda key, entry: entry['user_id'] == user_id)
+    cache = shared_cache()
+    if cache is not None:
+        from rest_framework.authtoken.models import Token
+        keys = list(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+        cache.delete_many([shared_key(key) for key in keys])
+        bump_generations(cache, keys)
+
+
+def token_cache_stats():
+    with _stats_lock:
+        shared = dict(shared_stats)
+    return {'local': token_cache.stats(), 'shared': shared}
+
+
+metrics.register('token_auth_cache', token_cache_stats)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication which caches the Token + User lookup
+
+    Entries live in a shared cache (TOKEN_AUTH_CACHE_ALIAS, for
+    TOKEN_AUTH_CACHE_TTL seconds) with a per process LRU in front of it
+    (TOKEN_AUTH_CACHE_SIZE entries, TOKEN_AUTH_CACHE_LOCAL_TTL seconds).
+    users.signals drops them when the token is deleted or the user is
+    saved, and bumps the generation of the token in the shared cache:
+    entries of every tier are only used with the current generation, so
+    the other processes stop using theirs at once. A local hit costs the
+    generation lookup, a miss one get_many. Without a shared cache other
+    processes cannot be told, nothing is cached unless
+    TOKEN_AUTH_CACHE_LOCAL_ONLY accepts TOKEN_AUTH_CACHE_LOCAL_TTL
+    seconds of staleness in the other processes.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = shared_cache()
+        if cache is None and settings.TOKEN_AUTH_CACHE_LOCAL_ONLY:
+            entry = token_cache.get(key)
+            if entry is None:
+                entry = self.load_entry(key, None, None)
+                token_cache.set(key, entry)
+        elif cache is None:
+            entry = self.load_entry(key, None, None)
+        else:
+            entry = token_cache.get(key)
+            if entry is not None and entry['generation'] != cache.get(generation_key(key)):
+                entry = None
+            if entry is None:
+                entry = self.get_shared_entry(cache, key)
+                token_cache.set(key, entry)
+
+        user = User.from_db(router.db_for_read(User), USER_FIELDS, entry['user'])
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        token = self.get_model()(key=key, user=user, created=entry['created'])
+        return (user, token)
+
+    def get_shared_entry(self, cache, key):
+        found = cache.get_many([shared_key(key), generation_key(key)])
+        generation = found.get(generation_key(key))
+        entry = found.get(shared_key(key))
+        if entry is not None and entry['generation'] != generation:
+            entry = None  # written before the last invalidation
+        with _stats_lock:
+            shared_stats['hits' if entry is not None else 'misses'] += 1
+        return entry or self.load_entry(key, cache, generation)
+
+    def load_entry(self, key, cache, generation):
+        """Reads the token and its user, generation was read before"""
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        entry = {
+            'user_id': token.user_id,
+            'created': token.created,
+            'generation': generation,
+            'user': tuple(getattr(token.user, field) for field in USER_FIELDS),
+        }
+        if cache is not None:
+            cache.set(shared_key(key), entry, settings.TOKEN_AUTH_CACHE_TTL)
+        return entry
+
+
+def refuse_save(*args, **kwargs):
+    raise TypeError('A user built from token claims cannot be saved, load it from the database.')
+
+
+class SignedAccessTokenAuthentication(BaseAuthentication):
+    """Authenticates 'Authorization: Bearer <access token>' headers
+
+    Active only when API_SIGNED_TOKENS is on. For safe methods the user
+    is built from the token claims, no database query is made; it lacks
+    the other columns and refuses save(). Writing requests get the real
+    row, loaded by primary key.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        if not settings.API_SIGNED_TOKENS:
+            return None
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        try:
+            claims = tokens.decode(auth[1].decode(), 'access')
+        except (tokens.InvalidToken, UnicodeError):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not claims['is_active']:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        if request.method not in SAFE_METHODS:
+            user = User.objects.filter(pk=claims['sub'], is_active=True).first()
+            if user is None:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            return (user, claims)
+
+        user = User(pk=claims['sub'], **{
+            field: claims[field] for field in tokens.USER_CLAIMS})
+        user._state.adding = False
+        user._state.db = 'default'
+        user.save = refuse_save
+        return (user, claims)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,42 @@
+"""ETag / Last-Modified validators of the current user and profile endpoints
+
+Validators are computed from User.updated_at, User.last_login and
+Profile.udpated_at with a single query, without serializing anything.
+last_login is read on its own since update_last_login saves only that
+column. updated_at and udpated_at are auto_now, so code updating rows
+with .update() or bulk_update() must set them; users.signals bumps
+updated_at when the groups or permissions of a user change.
+"""
+from django.contrib.auth import get_user_model
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+User = get_user_model()
+
+
+def user_profile_validators(user_id):
+    """Returns (etag, last_modified timestamp) of a user and its profile"""
+    row = User.objects.filter(pk=user_id).values_list(
+        'updated_at', 'profile__udpated_at', 'last_login').first()
+    if row is None:
+        return None, None
+    versions = [str(int(ts.timestamp() * 1000000)) if ts else '0' for ts in row]
+    etag = '"%s-%s"' % (user_id, '-'.join(versions))
+    last_modified = int(max(ts for ts in row if ts).timestamp())
+    return etag, last_modified
+
+
+def precondition_response(request, etag, last_modified):
+    """Returns a 304 (If-None-Match / If-Modified-Since) or a 412
+        (If-Match / If-Unmodified-Since) response, or None to go on
+    """
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,74 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Profile
+
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('user_id', 'user_id'),
+    ('email', 'user__email'),
+    ('first_name', 'user__first_name'),
+    ('last_name', 'user__last_name'),
+    ('title', 'title'),
+    ('company', 'company'),
+    ('position', 'position'),
+    ('is_company_admin', 'is_company_admin'),
+    ('location', 'location'),
+    ('country', 'country'),
+    ('city', 'city'),
+    ('udpated_at', 'udpated_at'),
+)
+HEADER = [name for name, _ in EXPORT_COLUMNS]
+
+
+class Echo:
+    """File-like object whose write returns the value, for csv.writer"""
+    def write(self, value):
+        return value
+
+
+def export_rows(chunk_size):
+    """Streams profile rows joined to their user
+        values_list + iterator: no model instances, no result cache, and a
+        server side cursor on PostgreSQL, so memory does not grow with the table
+    """
+    return Profile.objects.order_by('id').values_list(
+        *[source for _, source in EXPORT_COLUMNS]
+    ).iterator(chunk_size=chunk_size)
+
+
+def batched(lines, size=500):
+    """Joins lines into blocks, one block per chunk written to the socket"""
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) == size:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    return batched(
+        encoder.encode(dict(zip(HEADER, row))) + '\n' for row in rows)
+
+
+# Cells starting with these run as formulas in spreadsheets
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    """Quotes user text which a spreadsheet would evaluate"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    yield from batched(writer.writerow([csv_cell(value) for value in row]) for row in rows)
@@ -0,0 +1,15 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ProfileCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key
+        Every page is an indexed range scan, deep pages cost the same as
+        the first one and there is no COUNT(*).
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = settings.PROFILE_PAGE_SIZE
+        self.max_page_size = settings.PROFILE_MAX_PAGE_SIZE
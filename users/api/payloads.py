@@ -0,0 +1,54 @@
+"""Cached payloads of the current user and own profile endpoints
+
+Payloads are kept in a TwoTierCache under the user id, versioned with
+the ETag of users.api.conditional. The ETag query runs on every request
+anyway, a cached payload is served only if it was built from the same
+user and profile rows, and a hit saves the profile (and, for signed
+tokens, the user) query and the serialization.
+
+users.signals drops the payloads of a user when the user or the profile
+is saved or deleted, entries of rows changed with .update() are not
+served since their ETag changed.
+"""
+from django.conf import settings
+
+from core import metrics
+from core.cache import TwoTierCache
+
+payload_cache = TwoTierCache(
+    'payload',
+    maxsize=settings.PAYLOAD_CACHE_SIZE,
+    local_ttl=settings.PAYLOAD_CACHE_LOCAL_TTL,
+    alias=settings.PAYLOAD_CACHE_ALIAS,
+    ttl=settings.PAYLOAD_CACHE_TTL,
+    lock_timeout=settings.PAYLOAD_CACHE_LOCK_TIMEOUT,
+)
+
+KINDS = ('user', 'profile')
+
+
+def cache_key(kind, user_id):
+    return f'{kind}:{user_id}'
+
+
+def get_payload(kind, user_id, etag, build, plan=None):
+    """Returns the cached payload or the one build() returns
+        Payloads of sparse plans (?fields= / ?expand=, see
+        users.api.read_serializers) are not cached, they are trimmed from
+        the cached full payload when there is one.
+    """
+    if etag is None:
+        return build()
+    key = cache_key(kind, user_id)
+    if plan is not None and plan.sparse:
+        payload = None if plan.expands else payload_cache.get(key, version=etag)
+        return build() if payload is None else plan.trim(payload)
+    return payload_cache.get_or_set(key, lambda: dict(build()), version=etag)
+
+
+def invalidate_payloads(user_id):
+    for kind in KINDS:
+        payload_cache.delete(cache_key(kind, user_id))
+
+
+metrics.register('payload_cache', payload_cache.stats)
@@ -0,0 +1,230 @@
+"""Read only payloads of the hot API reads, built from .values() rows
+
+ModelSerializers introspect the model every time they are instantiated,
+then go through model instances and one query per many to many field.
+A FieldPlan is compiled once from such a serializer class: the column
+of each field and the field's own to_representation, so payloads keep
+its keys, order and formats. Rows are read with .values() (one to one
+relations joined) and the ids of every many to many field with a single
+UNION query.
+
+Supported fields: model fields, nested serializers of one to one
+relations, StringRelatedField of the models of STR_COLUMNS and
+PrimaryKeyRelatedField(many=True).
+
+Plans can be sparse, for the ?fields= and ?expand= of the API reads:
+e.g. ?fields=email,profile.company selects two columns and joins the
+profile, but reads no many to many ids. ?expand=user renders the user of
+a profile as an object (EXPANSIONS) rather than its email.
+"""
+from functools import lru_cache
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import CharField, F, IntegerField, Value
+from rest_framework import relations, serializers
+from rest_framework.exceptions import ValidationError
+
+from users.api.serializers import UserSummarySerializer
+
+# column holding str(instance), per model
+STR_COLUMNS = {get_user_model(): 'email'}
+
+# serializer of ?expand=, per model
+EXPANSIONS = {get_user_model(): UserSummarySerializer}
+
+VALUE, NESTED, MANY = range(3)
+
+
+def shorten(model, path):
+    """Drops the round trips through reverse one to one relations
+        'profile__user__email' from User is 'email'
+    """
+    parts = path.split('__')
+    kept = []
+    index = 0
+    while index < len(parts):
+        field = model._meta.get_field(parts[index])
+        back = parts[index + 1] if index + 1 < len(parts) else None
+        if field.one_to_one and field.auto_created and back == field.field.name:
+            index += 2
+            continue
+        kept.append(parts[index])
+        if field.is_relation:
+            model = field.related_model
+        index += 1
+    return '__'.join(kept)
+
+
+class FieldPlan:
+    """Columns and representations of the fields of a ModelSerializer
+
+    fields: dotted names of the fields to render ('email', 'profile' or
+    'profile.company'), None for all of them. expand: dotted names of
+    StringRelatedFields to render with the EXPANSIONS serializer of
+    their model instead. Only the columns, joins and many to many ids
+    of the rendered fields are read.
+    """
+
+    def __init__(self, serializer_class, fields=None, expand=frozenset(),
+                 root=None, prefix=''):
+        self.model = serializer_class.Meta.model
+        root = root or self.model
+        self.pk = shorten(root, prefix + self.model._meta.pk.attname)
+        self.columns = [self.pk]
+        self.many = []
+        self.steps = []
+        self.sparse = fields is not None or bool(expand)
+        self.expands = bool(expand)
+        unknown_fields = set(fields or ())
+        unknown_expand = set(expand)
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            own = {key for key in unknown_fields | unknown_expand if select(name, {key}) is not False}
+            selected = select(name, fields)
+            if selected is False:
+                unknown_expand -= own  # not rendered, nothing to expand
+                continue
+            unknown_fields -= own
+            path = prefix + field.source.replace('.', '__')
+            if isinstance(field, relations.StringRelatedField) and name in expand:
+                related = self.model._meta.get_field(field.source).related_model
+                if related in EXPANSIONS:
+                    unknown_expand.discard(name)
+                    field = EXPANSIONS[related](read_only=True)
+            if isinstance(field, serializers.ModelSerializer):
+                if not self.model._meta.get_field(field.source or name).one_to_one:
+                    raise ImproperlyConfigured(f'{name}: one to one relations only')
+                nested_expand = frozenset(select(name, expand) or ())
+                unknown_expand -= {f'{name}.{key}' for key in nested_expand}
+                plan = FieldPlan(type(field), selected, nested_expand, root, path + '__')
+                self.columns += plan.columns
+                self.expands = self.expands or plan.expands
+                self.steps.append((name, NESTED, plan, None))
+                continue
+            if selected is not None:
+                unknown_fields.update(f'{name}.{key}' for key in selected)
+            if isinstance(field, relations.ManyRelatedField):
+                if prefix or not isinstance(field.child_relation, relations.PrimaryKeyRelatedField):
+                    raise ImproperlyConfigured(f'{name}: top level primary keys only')
+                self.many.append(field.source)
+                self.steps.append((name, MANY, field.source, None))
+            elif isinstance(field, relations.StringRelatedField):
+                related = self.model._meta.get_field(field.source).related_model
+                if related not in STR_COLUMNS:
+                    raise ImproperlyConfigured(f'{name}: no STR_COLUMNS entry for {related}')
+                column = shorten(root, f'{path}__{STR_COLUMNS[related]}')
+                self.columns.append(column)
+                self.steps.append((name, VALUE, column, str))
+            elif isinstance(field, (relations.RelatedField, serializers.BaseSerializer)) \
+                    or field.source == '*':
+                raise ImproperlyConfigured(f'{name}: unsupported {type(field).__name__}')
+            else:
+                column = shorten(root, path)
+                self.columns.append(column)
+                self.steps.append((name, VALUE, column, field.to_representation))
+        if unknown_fields:
+            raise ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown_fields))}.'})
+        if unknown_expand:
+            raise ValidationError({'expand': f'Cannot expand: {", ".join(sorted(unknown_expand))}.'})
+        self.columns = list(dict.fromkeys(self.columns))
+
+    def render(self, row, related):
+        data = {}
+        for name, kind, source, extra in self.steps:
+            if kind == VALUE:
+                value = row[source]
+                data[name] = None if value is None else extra(value)
+            elif kind == NESTED:
+                # None for a missing relation, as DRF does
+                data[name] = None if row[source.pk] is None else source.render(row, related)
+            else:
+                data[name] = related[source].get(row[self.pk], [])
+        return data
+
+    def trim(self, data):
+        """This plan's part of the full payload data, plans without expand only"""
+        trimmed = {}
+        for name, kind, source, _ in self.steps:
+            value = data[name]
+            trimmed[name] = source.trim(value) if kind == NESTED and value is not None else value
+        return trimmed
+
+    def serialize(self, rows):
+        """Payloads of .values(*self.columns) rows"""
+        rows = list(rows)
+        related = {}
+        if self.many and rows:
+            related = related_ids(self.model, self.many, [row[self.pk] for row in rows])
+        return [self.render(row, related) for row in rows]
+
+    def read(self, queryset):
+        return self.serialize(queryset.values(*self.columns))
+
+    def read_by_pk(self, queryset):
+        """{pk: payload}, the payloads may not hold the pk"""
+        rows = list(queryset.values(*self.columns))
+        return dict(zip([row[self.pk] for row in rows], self.serialize(rows)))
+
+
+def select(name, fields):
+    """What fields selects of the field name
+        None: all of it, a set: these of its own fields, False: nothing
+    """
+    if fields is None or name in fields:
+        return None
+    nested = {key.partition('.')[2] for key in fields if key.startswith(name + '.')}
+    return nested or False
+
+
+# bounded, fields and expand come from the query string
+@lru_cache(maxsize=256)
+def plan_for(serializer_class, fields=None, expand=frozenset()):
+    return FieldPlan(serializer_class, fields, expand)
+
+
+def request_plan(serializer_class, request):
+    """Plan of the ?fields= and ?expand= comma separated dotted names"""
+    def names(param):
+        value = request.query_params.get(param, '')
+        return frozenset(name.strip() for name in value.split(',') if name.strip())
+    return plan_for(serializer_class, names('fields') or None, names('expand'))
+
+
+def read(serializer_class, queryset):
+    """serializer_class(queryset, many=True).data, from .values() rows"""
+    return plan_for(serializer_class).read(queryset)
+
+
+def related_ids(model, names, pks):
+    """{name: {pk: [ids]}} of the many to many fields names, in one query
+        Ids come in the Meta.ordering of the related model (by id when it
+        has none), as the related managers return them.
+    """
+    queries = []
+    for index, name in enumerate(names):
+        field = model._meta.get_field(name)
+        target = field.m2m_reverse_field_name()
+        ordering = field.related_model._meta.ordering
+        if not all(isinstance(key, str) and key[0] not in '-?' for key in ordering):
+            raise ImproperlyConfigured(f'{name}: ascending field ordering only')
+        queries.append((
+            field.remote_field.through.objects.filter(
+                **{f'{field.m2m_field_name()}__in': pks}),
+            [f'{field.m2m_field_name()}_id', f'{target}_id', Value(index, IntegerField())],
+            # expressions, selected after the fields in every branch
+            [F(f'{target}__{key}') for key in ordering],
+        ))
+    width = max(len(keys) for _, _, keys in queries)
+    pad = Value(None, CharField())
+    querysets = [
+        queryset.order_by().values_list(*columns, *keys, *[pad] * (width - len(keys)))
+        for queryset, columns, keys in queries
+    ]
+    rows = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+
+    related = {name: {} for name in names}
+    for pk, related_id, index, *keys in sorted(rows, key=lambda row: (row[2], row[3:], row[1])):
+        related[names[index]].setdefault(pk, []).append(related_id)
+    return related
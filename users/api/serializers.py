@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.conf import settings
 from core.models import Profile
+from core.domain_policy import blocked_domain
+from users.services import register_user
 from rest_auth.serializers import LoginSerializer as RestAuthLoginSerializer
 
 
@@ -31,8 +32,8 @@ class ProfileSerializerForAdmin(serializers.ModelSerializer):
 
 
 class RegisterNewUserSerializer(serializers.ModelSerializer):
-    """Serializer for registering a new user and updated the profile
-        Also updates user.profile which is created with signals
+    """Serializer for registering a new user and its profile
+        User and profile are created by users.services.register_user
     """
     id = serializers.IntegerField(read_only=True)
 
@@ -65,23 +66,18 @@ class RegisterNewUserSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        """Create a new user object with encrypted password and return it"""
-        user = get_user_model().objects.create_user(
+        """Create a new user object with encrypted password and its profile"""
+        return register_user(
             email=validated_data.get('email'),
             first_name=validated_data.get('first_name'),
-            last_name=validated_data.get('last_name')
+            last_name=validated_data.get('last_name'),
+            password=validated_data.get('password'),
+            title=validated_data.get('title'),
+            company=validated_data.get('company'),
+            position=validated_data.get('position'),
+            country=validated_data.get('country'),
+            city=validated_data.get('city'),
         )
-        user.set_password(validated_data.get('password'))
-        user.save()
-        profile = Profile.objects.get(user=user)
-        profile.title = validated_data.get('title')
-        profile.company = validated_data.get('company')
-        profile.position = validated_data.get('position')
-        profile.country = validated_data.get('country')
-        profile.city = validated_data.get('city')
-        profile.save()
-        profile = ProfileSerializer(read_only=True)
-        return user
 
 
     def validate(self, data):
@@ -94,12 +90,20 @@ class RegisterNewUserSerializer(serializers.ModelSerializer):
 
     def validate_email(self, email_value):
         email_domain = email_value.split('@')[-1]
-        if  email_domain in settings.EMAIL_DOMAIN_BLACKLIST:
+        if blocked_domain(email_value):
             raise serializers.ValidationError(f'This domain ({email_domain}) is not supported. Please provide a corporate email address.')
         return email_value
 
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """The user of a profile, for ?expand=user"""
+
+    class Meta:
+        model = get_user_model()
+        fields = ('id', 'email', 'first_name', 'last_name')
+
+
 class UserDisplaySerializer(serializers.ModelSerializer):
 
     profile = ProfileSerializer(many=False, read_only=True)
@@ -107,4 +111,4 @@ class UserDisplaySerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         # fields = ('email', 'first_name', 'last_name')
-        exclude = ('password', )
\ No newline at end of file
+        exclude = ('password', 'search_text')
\ No newline at end of file
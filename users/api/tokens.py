@@ -0,0 +1,110 @@
+"""Short lived signed access tokens and refresh tokens (opt-in)
+
+Access tokens carry the user columns needed by authentication and
+permissions, so verifying them needs no database query. Logout and
+refresh rotation put the token id (jti) on a revocation list kept in
+the SIGNED_TOKEN_REVOCATION_CACHE cache until the token expires. The
+cache has to be shared by the workers, a revocation seen by one worker
+only would leave the token valid in the others.
+"""
+import time
+import uuid
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+ALGORITHM = 'HS256'
+
+# User columns embedded in access tokens
+USER_CLAIMS = (
+    'email', 'first_name', 'last_name', 'is_active', 'is_staff',
+    'is_superuser', 'is_admin', 'is_demo_user',
+)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def secret():
+    return settings.SIGNED_TOKEN_SECRET or settings.SECRET_KEY
+
+
+def revocation_cache():
+    """The shared revocation cache, None while signed tokens are off and
+        it is not configured
+    """
+    alias = settings.SIGNED_TOKEN_REVOCATION_CACHE
+    if alias in settings.CACHES:
+        return caches[alias]
+    if settings.API_SIGNED_TOKENS:
+        raise ImproperlyConfigured(
+            f'API_SIGNED_TOKENS needs the {alias!r} cache shared by the workers.')
+    return None
+
+
+def encode(claims, lifetime):
+    # sub-second iat, revoke_user compares it against the revocation time
+    now = time.time()
+    payload = dict(claims, jti=uuid.uuid4().hex, iat=now, exp=int(now) + lifetime)
+    return jwt.encode(payload, secret(), algorithm=ALGORITHM)
+
+
+def issue_token_pair(user):
+    """Returns a new access and refresh token for the user"""
+    access = encode(
+        dict({field: getattr(user, field) for field in USER_CLAIMS},
+             token_type='access', sub=user.pk),
+        settings.SIGNED_TOKEN_ACCESS_LIFETIME,
+    )
+    refresh = encode(
+        {'token_type': 'refresh', 'sub': user.pk},
+        settings.SIGNED_TOKEN_REFRESH_LIFETIME,
+    )
+    return {
+        'access': access,
+        'refresh': refresh,
+        'token_type': 'Bearer',
+        'expires_in': settings.SIGNED_TOKEN_ACCESS_LIFETIME,
+    }
+
+
+def decode(token, token_type):
+    """Returns the claims of a valid, not revoked token"""
+    try:
+        claims = jwt.decode(token, secret(), algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError as e:
+        raise InvalidToken(str(e))
+    if claims.get('token_type') != token_type:
+        raise InvalidToken('Wrong token type.')
+
+    revoked = revocation_cache().get_many([
+        f'auth:revoked:{claims["jti"]}',
+        f'auth:revoked-user:{claims["sub"]}',
+    ])
+    if f'auth:revoked:{claims["jti"]}' in revoked:
+        raise InvalidToken('Token is revoked.')
+    if revoked.get(f'auth:revoked-user:{claims["sub"]}', 0) >= claims['iat']:
+        raise InvalidToken('Token is revoked.')
+    return claims
+
+
+def revoke(claims):
+    """Puts a token on the revocation list until it expires"""
+    timeout = claims['exp'] - int(time.time())
+    cache = revocation_cache()
+    if timeout > 0 and cache is not None:
+        cache.set(f'auth:revoked:{claims["jti"]}', True, timeout)
+
+
+def revoke_user(user_id):
+    """Revokes every token of a user issued until now
+        (deactivation, password change, new claims)
+    """
+    cache = revocation_cache()
+    if cache is not None:
+        cache.set(
+            f'auth:revoked-user:{user_id}', time.time(),
+            settings.SIGNED_TOKEN_REFRESH_LIFETIME)
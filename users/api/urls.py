@@ -1,7 +1,7 @@
 
 from rest_framework import urlpatterns
 from django.urls import path, include
-from users.api import views 
+from users.api import views, async_views
 from rest_framework.routers import DefaultRouter
 
 app_name = 'users'
@@ -22,6 +22,25 @@ urlpatterns = [
     path('rest-auth/user/', 
             views.CurrentUserDisplayAPIView.as_view(), 
             name='current-user'), # Overwrite rest_auth user view
+    path('rest-auth/login/',
+            views.LoginAPIView.as_view(),
+            name='rest_login'), # Overwrite rest_auth login for signed tokens
+    path('rest-auth/logout/',
+            views.LogoutAPIView.as_view(),
+            name='rest_logout'),
+    path('rest-auth/token/refresh/',
+            views.TokenRefreshAPIView.as_view(),
+            name='token-refresh'),
     path('rest-auth/', include('rest_auth.urls')),
+    # async variants of the hot read endpoints, for ASGI servers
+    path('async/rest-auth/user/',
+            async_views.current_user,
+            name='async-current-user'),
+    path('async/profile/',
+            async_views.current_user_profile,
+            name='async-current-user-profile'),
+    path('async/profiles/<int:pk>/',
+            async_views.profile_detail,
+            name='async-profile-detail'),
 
 ] 
\ No newline at end of file
@@ -7,8 +7,21 @@ from users.api.serializers import (RegisterNewUserSerializer,
 
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from core.models import Profile
+from core.search import search_users
 from rest_framework.viewsets import GenericViewSet
-from rest_framework import mixins
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_auth.views import LoginView as RestAuthLoginView, LogoutView as RestAuthLogoutView
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from users.api import export, payloads, read_serializers, tokens
+from users.api.authentication import SignedAccessTokenAuthentication
+from users.api.conditional import (
+    user_profile_validators, precondition_response, set_validators)
+from users.api.pagination import ProfileCursorPagination
 
 
 
@@ -18,13 +31,59 @@ class RegisterNewUserAPIView(generics.CreateAPIView):
 
 
 class ProfileRetrieveUpdateAPIView(generics.RetrieveUpdateAPIView):
-    """View user profile - only request user can see and update its own profile"""
+    """View user profile - only request user can see and update its own profile
+        GET takes ?fields= / ?expand= (see users.api.read_serializers)
+        Answers If-None-Match / If-Modified-Since with 304 and honors
+        If-Match on PUT / PATCH (412 when the profile changed meanwhile)
+        GET responses are cached (see users.api.payloads)
+    """
     
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
 
+    locked_profile = None
+
     def get_object(self):
-        return self.request.user.profile
+        return self.locked_profile or self.request.user.profile
+
+    def dispatch_conditional(self, handler, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return self.conditional(handler, request, *args, **kwargs)
+        # If-Match is checked against the locked row, a concurrent write
+        # can't slip in between the check and the update
+        with transaction.atomic():
+            self.locked_profile = Profile.objects.select_for_update().filter(
+                user_id=request.user.pk).first()
+            if self.locked_profile is not None:
+                self.locked_profile.user = request.user
+            return self.conditional(handler, request, *args, **kwargs)
+
+    def conditional(self, handler, request, *args, **kwargs):
+        validators = self.validators = user_profile_validators(request.user.pk)
+        response = precondition_response(request, *validators)
+        if response is not None:
+            return response
+        response = handler(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD'):
+            validators = user_profile_validators(request.user.pk)
+        return set_validators(response, *validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        plan = read_serializers.request_plan(self.get_serializer_class(), request)
+        data = payloads.get_payload(
+            'profile', request.user.pk, self.validators[0],
+            lambda: plan.read(Profile.objects.filter(user_id=request.user.pk))[0],
+            plan)
+        return Response(data)
+
+    def get(self, request, *args, **kwargs):
+        return self.dispatch_conditional(super().get, request, *args, **kwargs)
+
+    def put(self, request, *args, **kwargs):
+        return self.dispatch_conditional(super().put, request, *args, **kwargs)
+
+    def patch(self, request, *args, **kwargs):
+        return self.dispatch_conditional(super().patch, request, *args, **kwargs)
   
 
 class ProfileModelViewSet( 
@@ -33,15 +92,233 @@ class ProfileModelViewSet(
                     mixins.RetrieveModelMixin,
                     GenericViewSet
 ):
-    """Admins can see all the profiles"""
-    queryset = Profile.objects.all()
+    """Admins can see all the profiles
+        Pages and profiles are read with users.api.read_serializers,
+        GETs take ?fields= / ?expand=
+    """
+    queryset = Profile.objects.select_related('user')
     serializer_class = ProfileSerializerForAdmin
     permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = ProfileCursorPagination
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Profiles of the users matching ?q= (see core.search)"""
+        search_term = request.query_params.get('q', '').strip()
+        if not search_term:
+            return Response(
+                {'q': 'A search term is required.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        queryset = search_users(
+            self.get_queryset(), search_term, field='user__search_text')
+        return self.paginated_payloads(queryset)
+
+    def list(self, request, *args, **kwargs):
+        return self.paginated_payloads(self.get_queryset())
+
+    def retrieve(self, request, *args, **kwargs):
+        # read without an instance, the permissions have no object level checks
+        plan = read_serializers.request_plan(self.get_serializer_class(), request)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = generics.get_object_or_404(
+            self.filter_queryset(self.get_queryset()).values(*plan.columns),
+            **{self.lookup_field: kwargs[lookup_url_kwarg]})
+        return Response(plan.serialize([row])[0])
+
+    def paginated_payloads(self, queryset):
+        plan = read_serializers.request_plan(self.get_serializer_class(), self.request)
+        page = self.paginate_queryset(queryset.values(*plan.columns))
+        return self.get_paginated_response(plan.serialize(page))
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """Profiles of ?ids=1,2,3 in one query, keyed by id
+            At most PROFILE_BATCH_MAX_IDS ids, those without a profile are
+            listed in 'missing'
+        """
+        try:
+            ids = list(dict.fromkeys(
+                int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()))
+        except ValueError:
+            ids = []
+        if not ids:
+            return Response(
+                {'ids': 'A comma separated list of profile ids is required.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.PROFILE_BATCH_MAX_IDS:
+            return Response(
+                {'ids': f'At most {settings.PROFILE_BATCH_MAX_IDS} ids per request.'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        plan = read_serializers.request_plan(self.get_serializer_class(), request)
+        profiles = plan.read_by_pk(self.filter_queryset(self.get_queryset()).filter(id__in=ids))
+        return Response({
+            'results': {str(pk): profiles[pk] for pk in ids if pk in profiles},
+            'missing': [pk for pk in ids if pk not in profiles],
+        })
+
+    @action(detail=False, methods=['patch'])
+    def bulk(self, request):
+        """Partial updates of many profiles, one bulk_update in one transaction
+            Body: [{"id": 1, "city": "..."}, ...], at most PROFILE_BULK_MAX_ITEMS.
+            Answers one result per item, in order: the updated profile, or
+            the errors of the item (400) or of an unknown id (404), which do
+            not prevent the other items from being saved.
+        """
+        items = request.data
+        max_items = settings.PROFILE_BULK_MAX_ITEMS
+        if not isinstance(items, list) or not 0 < len(items) <= max_items:
+            return Response(
+                {'profiles': f'A list of 1 to {max_items} profile updates is required.'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        indexes = {}
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if type(pk) is not int or pk in indexes:
+                error = 'A profile id is required.' if type(pk) is not int else 'Duplicate id.'
+                results[index] = {
+                    'id': pk, 'status': status.HTTP_400_BAD_REQUEST, 'errors': {'id': error}}
+            else:
+                indexes[pk] = index
+
+        serializer_class = self.get_serializer_class()
+        updated = []
+        fields = set()
+        with transaction.atomic():
+            profiles = Profile.objects.select_for_update().in_bulk(list(indexes))
+            for pk, index in indexes.items():
+                if pk not in profiles:
+                    results[index] = {
+                        'id': pk, 'status': status.HTTP_404_NOT_FOUND,
+                        'errors': {'id': 'Not found.'}}
+                    continue
+                serializer = serializer_class(profiles[pk], data=items[index], partial=True)
+                if not serializer.is_valid():
+                    results[index] = {
+                        'id': pk, 'status': status.HTTP_400_BAD_REQUEST,
+                        'errors': serializer.errors}
+                    continue
+                for field, value in serializer.validated_data.items():
+                    setattr(profiles[pk], field, value)
+                fields.update(serializer.validated_data)
+                updated.append(profiles[pk])
+            if updated:
+                # bulk_update neither applies auto_now nor sends post_save
+                now = timezone.now()
+                for profile in updated:
+                    profile.udpated_at = now
+                Profile.objects.bulk_update(updated, [*sorted(fields), 'udpated_at'])
+        for profile in updated:
+            payloads.invalidate_payloads(profile.user_id)
+
+        if updated:
+            plan = read_serializers.request_plan(serializer_class, request)
+            data = plan.read_by_pk(self.get_queryset().filter(id__in=[p.pk for p in updated]))
+            for profile in updated:
+                results[indexes[profile.pk]] = {
+                    'id': profile.pk, 'status': status.HTTP_200_OK, 'data': data[profile.pk]}
+        return Response({'results': results})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Streams every profile as ndjson (default) or csv
+            ?export_format=csv ('format' is taken by DRF)
+        """
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return Response(
+                {'export_format': 'Choose ndjson or csv.'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        rows = export.export_rows(settings.PROFILE_EXPORT_CHUNK_SIZE)
+        if export_format == 'csv':
+            response = StreamingHttpResponse(
+                export.csv_lines(rows), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(
+                export.ndjson_lines(rows), content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profiles.{export_format}"'
+        return response
 
 
 class CurrentUserDisplayAPIView(APIView):
-    """Read only access the current user and user profile info"""
+    """Read only access the current user and user profile info
+        Takes ?fields= / ?expand= (see users.api.read_serializers)
+        Answers If-None-Match / If-Modified-Since with 304
+        Responses are cached (see users.api.payloads)
+    """
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        serializer = UserDisplaySerializer(request.user)
-        return Response(serializer.data)
\ No newline at end of file
+        validators = user_profile_validators(request.user.pk)
+        response = precondition_response(request, *validators)
+        if response is not None:
+            return response
+
+        plan = read_serializers.request_plan(UserDisplaySerializer, request)
+
+        def build():
+            return plan.read(get_user_model().objects.filter(pk=request.user.pk))[0]
+
+        data = payloads.get_payload('user', request.user.pk, validators[0], build, plan)
+        return set_validators(Response(data), *validators)
+
+
+class LoginAPIView(RestAuthLoginView):
+    """rest_auth login, returns signed access/refresh tokens
+        instead of the DRF token when API_SIGNED_TOKENS is on
+    """
+    def login(self):
+        if not settings.API_SIGNED_TOKENS:
+            return super().login()
+        self.user = self.serializer.validated_data['user']
+        self.token = tokens.issue_token_pair(self.user)
+        if getattr(settings, 'REST_SESSION_LOGIN', True):
+            self.process_login()
+
+    def get_response(self):
+        if not settings.API_SIGNED_TOKENS:
+            return super().get_response()
+        return Response(self.token, status=status.HTTP_200_OK)
+
+
+class LogoutAPIView(RestAuthLogoutView):
+    """rest_auth logout, also revokes the signed access token
+        and the refresh token posted as 'refresh'
+    """
+    def logout(self, request):
+        if settings.API_SIGNED_TOKENS:
+            if isinstance(request.successful_authenticator, SignedAccessTokenAuthentication):
+                tokens.revoke(request.auth)
+            refresh = request.data.get('refresh')
+            if refresh:
+                try:
+                    tokens.revoke(tokens.decode(refresh, 'refresh'))
+                except tokens.InvalidToken:
+                    pass
+        return super().logout(request)
+
+
+class TokenRefreshAPIView(APIView):
+    """Exchanges a refresh token for a new access/refresh pair
+        The used refresh token is revoked (rotation)
+    """
+    permission_classes = []
+    authentication_classes = []
+
+    def get_authenticate_header(self, request):
+        return SignedAccessTokenAuthentication.keyword
+
+    def post(self, request):
+        if not settings.API_SIGNED_TOKENS:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        try:
+            claims = tokens.decode(request.data.get('refresh', ''), 'refresh')
+        except tokens.InvalidToken:
+            raise AuthenticationFailed('Invalid refresh token.')
+        user = get_user_model().objects.filter(pk=claims['sub'], is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('User inactive or deleted.')
+        tokens.revoke(claims)
+        return Response(tokens.issue_token_pair(user))
\ No newline at end of file
@@ -3,16 +3,15 @@ from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 from core.models import Profile
-from django.conf import settings
+from core.domain_policy import blocked_domain
 
 User = get_user_model()
 
 # HELPER FUNCTIONS
 def check_email_providers(email_address):
-    banned_hosts = settings.EMAIL_DOMAIN_BLACKLIST
-    for address in banned_hosts:
-        if address in email_address:
-            raise forms.ValidationError(f'Currently we cannot accept {address} emails. please try another email')
+    address = blocked_domain(email_address)
+    if address:
+        raise forms.ValidationError(f'Currently we cannot accept {address} emails. please try another email')
 
 #FORMS START HERE
 class UserRegisterForm(UserCreationForm):
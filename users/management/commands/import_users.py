@@ -0,0 +1,176 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from core.hashers import hash_password
+from core.models import Profile, email_domain_validator
+from core.search import search_text_for
+
+User = get_user_model()
+
+PROFILE_FIELDS = ('title', 'company', 'position', 'location', 'country', 'city')
+
+
+def read_rows(path, file_format):
+    """Streams (line number, row dict) from a csv or ndjson file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            # header is line 1
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = e
+                yield line_no, row
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports users and their profiles from a csv or ndjson file. '
+        'Passwords are hashed in a process pool and rows are written '
+        'with bulk_create in chunks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='csv or ndjson file')
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help='File format, guessed from the file extension by default')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Rows written per transaction')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Password hashing processes')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson')
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive')
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+
+        self.workers = options['workers'] or 1
+        self.imported = 0
+        self.failed = 0
+        started = time.monotonic()
+
+        rows = read_rows(path, file_format)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk, pool)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{self.imported} imported, {self.failed} failed '
+                    f'({self.imported / elapsed:.0f} rows/s)')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {self.imported} users imported, {self.failed} rows failed '
+            f'in {elapsed:.1f}s ({self.imported / elapsed if elapsed else 0:.0f} rows/s)'))
+
+    def report(self, line_no, message):
+        self.failed += 1
+        self.stderr.write(f'line {line_no}: {message}')
+
+    def clean_row(self, row):
+        """Validates a row the way UserManager.create_user does"""
+        if not isinstance(row, dict):
+            raise ValidationError(f'Invalid row: {row}')
+        email = (row.get('email') or '').strip()
+        if not email:
+            raise ValidationError('Email is required to create a user.')
+        email_domain_validator(email)
+        if not row.get('first_name'):
+            raise ValidationError('Please provide your firstname.')
+        if not row.get('last_name'):
+            raise ValidationError('Please provide your surname.')
+        return {
+            'email': User.objects.normalize_email(email),
+            'first_name': row['first_name'],
+            'last_name': row['last_name'].upper(),
+            'password': row.get('password') or None,
+            'profile': {field: row.get(field) or None for field in PROFILE_FIELDS},
+        }
+
+    def import_chunk(self, chunk, pool):
+        valid = []
+        seen = set()
+        for line_no, row in chunk:
+            try:
+                cleaned = self.clean_row(row)
+            except ValidationError as e:
+                self.report(line_no, ' '.join(e.messages))
+                continue
+            if cleaned['email'] in seen:
+                self.report(line_no, f'{cleaned["email"]} is duplicated in the file')
+                continue
+            seen.add(cleaned['email'])
+            valid.append((line_no, cleaned))
+
+        existing = set(
+            User.objects.filter(email__in=seen).values_list('email', flat=True))
+        rows = []
+        for line_no, cleaned in valid:
+            if cleaned['email'] in existing:
+                self.report(line_no, f'{cleaned["email"]} is taken')
+            else:
+                rows.append((line_no, cleaned))
+        if not rows:
+            return
+
+        hashes = pool.map(
+            hash_password, [cleaned['password'] for _, cleaned in rows],
+            chunksize=max(1, len(rows) // (4 * self.workers)))
+        users = [
+            User(
+                email=cleaned['email'],
+                first_name=cleaned['first_name'],
+                last_name=cleaned['last_name'],
+                password=password,
+                # bulk_create skips the pre_save signal
+                search_text=search_text_for(
+                    cleaned['email'], cleaned['first_name'], cleaned['last_name']),
+            )
+            for (_, cleaned), password in zip(rows, hashes)
+        ]
+
+        try:
+            with transaction.atomic():
+                # bulk_create does not send post_save, profiles are created here
+                User.objects.bulk_create(users)
+                if users[0].pk is None:
+                    # backends without RETURNING support
+                    ids = dict(User.objects.filter(
+                        email__in=[user.email for user in users]
+                    ).values_list('email', 'pk'))
+                    for user in users:
+                        user.pk = ids[user.email]
+                Profile.objects.bulk_create([
+                    Profile(user_id=user.pk, **cleaned['profile'])
+                    for (_, cleaned), user in zip(rows, users)
+                ])
+        except IntegrityError as e:
+            for line_no, _ in rows:
+                self.report(line_no, f'chunk rolled back: {e}')
+            return
+        self.imported += len(users)
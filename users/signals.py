@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.models import Profile
+from users.api import tokens
+from users.api.authentication import invalidate_token, invalidate_user
+from users.api.payloads import invalidate_payloads
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def drop_cached_token(sender, instance, **kwargs):
+    """rest_auth logout deletes the token"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def drop_cached_user_tokens(sender, instance, created, **kwargs):
+    """Deactivation, password change or any edit of the cached user"""
+    if not created:
+        invalidate_user(instance.pk)
+
+
+
+@receiver(pre_save, sender=User)
+def note_changed_claims(sender, instance, update_fields=None, **kwargs):
+    """Access tokens carry USER_CLAIMS (is_staff...) and safe requests
+        trust them, compares the claims with the stored row
+    """
+    instance._claims_changed = False
+    if not settings.API_SIGNED_TOKENS or instance._state.adding or instance.pk is None:
+        return
+    fields = tokens.USER_CLAIMS if update_fields is None \
+        else [field for field in tokens.USER_CLAIMS if field in update_fields]
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._claims_changed = stored is not None and any(
+        stored[field] != getattr(instance, field) for field in fields)
+
+
+@receiver(post_save, sender=User)
+def revoke_signed_tokens(sender, instance, created, **kwargs):
+    """Signed tokens issued before a deactivation, a password change or
+        a change of their claims are rejected, _password is set by
+        set_password until save returns
+    """
+    if created:
+        return
+    if (not instance.is_active or instance._password is not None
+            or getattr(instance, '_claims_changed', False)):
+        tokens.revoke_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user_payloads(sender, instance, **kwargs):
+    invalidate_payloads(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def drop_cached_profile_payloads(sender, instance, **kwargs):
+    """The current user payload embeds the profile"""
+    invalidate_payloads(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def touch_users_of_changed_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    """The user payload lists the group and permission ids, bump updated_at
+        so the ETag changes; runs in the transaction of add/remove/clear
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == 'pre_clear':
+        # pk_set is None, the users are read before the rows go away
+        user_ids = list(sender.objects.filter(**{
+            sender._meta.get_field(instance._meta.model_name).attname: instance.pk,
+        }).values_list('user_id', flat=True))
+    else:
+        user_ids = list(pk_set)
+    if user_ids:
+        User.objects.filter(pk__in=user_ids).update(updated_at=timezone.now())
+        for user_id in user_ids:
+            invalidate_payloads(user_id)
@@ -0,0 +1,84 @@
+import asyncio
+
+from django.test import TransactionTestCase, AsyncClient
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Profile
+from users.api import async_views
+
+User = get_user_model()
+
+URL_CURRENT_USR = reverse('users:current-user-profile')
+URL_CURRENT_USER_DISPLAY = reverse('users:current-user')
+URL_ASYNC_CURRENT_USR = reverse('users:async-current-user-profile')
+URL_ASYNC_CURRENT_USER_DISPLAY = reverse('users:async-current-user')
+
+
+def async_profile_detail_url(pk):
+    return reverse('users:async-profile-detail', args=[pk])
+
+
+# The views query the database from pool threads, which do not see the
+# transaction of a TestCase
+class AsyncViewsTests(TransactionTestCase):
+    """Test the async read endpoints answer like the sync ones"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..',
+            profile={'company': 'TestCompany'})
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_views_are_coroutines(self):
+        for view in (async_views.current_user, async_views.current_user_profile,
+                     async_views.profile_detail):
+            self.assertTrue(asyncio.iscoroutinefunction(view))
+
+    def test_same_responses_as_sync_views(self):
+        for sync_url, async_url in ((URL_CURRENT_USR, URL_ASYNC_CURRENT_USR),
+                                    (URL_CURRENT_USER_DISPLAY, URL_ASYNC_CURRENT_USER_DISPLAY)):
+            expected = self.client.get(sync_url)
+            resp = self.client.get(async_url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(resp.json(), expected.json())
+            self.assertEqual(resp['ETag'], expected['ETag'])
+
+    def test_async_client(self):
+        """Test the views run natively on an event loop"""
+        client = AsyncClient()
+        client.force_login(self.user)
+        expected = self.client.get(URL_CURRENT_USER_DISPLAY).json()
+        resp = asyncio.run(client.get(URL_ASYNC_CURRENT_USER_DISPLAY))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), expected)
+
+    def test_authentication_required(self):
+        resp = APIClient().get(URL_ASYNC_CURRENT_USER_DISPLAY)
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_read_only(self):
+        resp = self.client.patch(URL_ASYNC_CURRENT_USR, {'company': 'NewCompany'})
+        self.assertEqual(resp.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(Profile.objects.get(user=self.user).company, 'TestCompany')
+
+    def test_profile_detail_for_admins(self):
+        profile = Profile.objects.get(user=self.user)
+        url = async_profile_detail_url(profile.pk)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()['company'], 'TestCompany')
+        self.assertEqual(
+            self.client.get(async_profile_detail_url(profile.pk + 1000)).status_code,
+            status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.models import update_last_login
+from django.db import connection
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Profile
+from users.api import views
+from users.api.payloads import payload_cache
+
+User = get_user_model()
+
+URL_CURRENT_USR = reverse('users:current-user-profile')
+URL_CURRENT_USER_DISPLAY = reverse('users:current-user')
+
+
+class ConditionalRequestTests(TestCase):
+    """Test ETag / Last-Modified handling of the current user endpoints"""
+
+    def setUp(self):
+        payload_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..',
+            profile={'company': 'TestCompany'})
+        self.client.force_authenticate(self.user)
+
+    def test_current_user_not_modified(self):
+        """Test a matching If-None-Match is answered with 304"""
+        resp = self.client.get(URL_CURRENT_USER_DISPLAY)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        etag = resp['ETag']
+        self.assertIn('Last-Modified', resp)
+
+        with self.assertNumQueries(1):
+            resp = self.client.get(URL_CURRENT_USER_DISPLAY, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(resp.content, b'')
+
+    def test_profile_change_changes_etag(self):
+        """Test a profile update invalidates the current user etag"""
+        etag = self.client.get(URL_CURRENT_USER_DISPLAY)['ETag']
+        profile = Profile.objects.get(user=self.user)
+        profile.company = 'NewCompany'
+        profile.save()
+        # force_authenticate keeps the instance, drop its cached profile
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        resp = self.client.get(URL_CURRENT_USER_DISPLAY, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['profile']['company'], 'NewCompany')
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_profile_if_modified_since(self):
+        resp = self.client.get(URL_CURRENT_USR)
+        resp = self.client.get(
+            URL_CURRENT_USR, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_patch_if_match(self):
+        """Test PATCH with a current etag succeeds and returns the new one"""
+        etag = self.client.get(URL_CURRENT_USR)['ETag']
+        resp = self.client.patch(
+            URL_CURRENT_USR, {'company': 'NewCompany'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp['ETag'], etag)
+        self.assertEqual(resp['ETag'], self.client.get(URL_CURRENT_USR)['ETag'])
+
+    def test_patch_stale_if_match(self):
+        """Test PATCH with an outdated etag is rejected with 412"""
+        etag = self.client.get(URL_CURRENT_USR)['ETag']
+        self.client.patch(URL_CURRENT_USR, {'company': 'OtherCompany'})
+        resp = self.client.patch(
+            URL_CURRENT_USR, {'company': 'NewCompany'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Profile.objects.get(user=self.user).company, 'OtherCompany')
+
+    def test_last_login_changes_etag(self):
+        """Test update_last_login, which saves only last_login, changes the etag"""
+        etag = self.client.get(URL_CURRENT_USER_DISPLAY)['ETag']
+        update_last_login(None, User.objects.get(pk=self.user.pk))
+        resp = self.client.get(URL_CURRENT_USER_DISPLAY, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(resp.data['last_login'])
+
+    def test_groups_and_permissions_change_etag(self):
+        """Test m2m changes from either side change the etag and the payload"""
+        group = Group.objects.create(name='Pilots')
+        permission = Permission.objects.first()
+        changes = (
+            (lambda: self.user.groups.add(group), 'groups', [group.pk]),
+            (lambda: group.user_set.remove(self.user), 'groups', []),
+            (lambda: permission.user_set.add(self.user), 'user_permissions', [permission.pk]),
+            (lambda: self.user.user_permissions.clear(), 'user_permissions', []),
+        )
+        for change, field, expected in changes:
+            etag = self.client.get(URL_CURRENT_USER_DISPLAY)['ETag']
+            change()
+            resp = self.client.get(URL_CURRENT_USER_DISPLAY, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK, field)
+            self.assertEqual(resp.data[field], expected)
+
+        etag = self.client.get(URL_CURRENT_USER_DISPLAY)['ETag']
+        group.user_set.add(self.user)
+        group.user_set.clear()
+        resp = self.client.get(URL_CURRENT_USER_DISPLAY, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+
+class ConditionalWriteTests(TransactionTestCase):
+    """Test If-Match is checked in the transaction of the update"""
+
+    def test_if_match_checked_under_lock(self):
+        user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..',
+            profile={'company': 'TestCompany'})
+        client = APIClient()
+        client.force_authenticate(user)
+        in_transaction = []
+
+        def precondition_response(*args):
+            in_transaction.append(connection.in_atomic_block)
+            return views_precondition_response(*args)
+
+        views_precondition_response = views.precondition_response
+        with mock.patch.object(views, 'precondition_response', precondition_response):
+            etag = client.get(URL_CURRENT_USR)['ETag']
+            resp = client.patch(URL_CURRENT_USR, {'company': 'NewCompany'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(in_transaction, [False, True])
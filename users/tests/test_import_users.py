@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from core.models import Profile
+
+User = get_user_model()
+
+CSV_ROWS = """email,first_name,last_name,password,company,position,city
+first@domain.com,First,Surname,Testing321..,TestCompany,Director,SomeCity
+second@domain.com,Second,Surname,Testing321..,TestCompany,Engineer,SomeCity
+blocked@hotmail.com,Blocked,Surname,Testing321..,TestCompany,Engineer,SomeCity
+first@domain.com,Again,Surname,Testing321..,TestCompany,Engineer,SomeCity
+nolastname@domain.com,Missing,,Testing321..,TestCompany,Engineer,SomeCity
+"""
+
+
+class ImportUsersCommandTests(TestCase):
+    """Test manage.py import_users"""
+
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def import_file(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_users', path, workers=2, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        """Test valid rows are imported and invalid ones reported"""
+        out, err = self.import_file(self.write_file('.csv', CSV_ROWS), chunk_size=2)
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Profile.objects.count(), 2)
+        user = User.objects.get(email='first@domain.com')
+        self.assertTrue(user.check_password('Testing321..'))
+        self.assertEqual(user.last_name, 'SURNAME')
+        self.assertEqual(user.profile.company, 'TestCompany')
+        self.assertEqual(user.profile.position, 'Director')
+
+        self.assertIn('line 4: hotmail.com This domain not supported.', err)
+        # the duplicate is in the next chunk, so it is found in the database
+        self.assertIn('line 5: first@domain.com is taken', err)
+        self.assertIn('line 6: Please provide your surname.', err)
+        self.assertIn('2 users imported, 3 rows failed', out)
+        self.assertIn('rows/s', out)
+
+    def test_import_duplicate_in_chunk(self):
+        """Test duplicated emails within a chunk are reported"""
+        out, err = self.import_file(self.write_file('.csv', CSV_ROWS))
+        self.assertEqual(User.objects.count(), 2)
+        self.assertIn('line 5: first@domain.com is duplicated in the file', err)
+
+    def test_import_ndjson_existing_user(self):
+        """Test ndjson import skips emails which are already registered"""
+        User.objects.create_user(
+            email='first@domain.com', first_name='First',
+            last_name='Surname', password='Testing321..')
+        rows = [
+            {'email': 'first@domain.com', 'first_name': 'First', 'last_name': 'Surname'},
+            {'email': 'second@domain.com', 'first_name': 'Second', 'last_name': 'Surname',
+                'company': 'TestCompany'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+        out, err = self.import_file(self.write_file('.ndjson', content))
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Profile.objects.count(), 2)
+        user = User.objects.get(email='second@domain.com')
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(user.profile.company, 'TestCompany')
+        self.assertIn('line 1: first@domain.com is taken', err)
+        self.assertIn('line 3: Invalid row', err)
@@ -0,0 +1,73 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Profile
+from users.api.payloads import payload_cache
+
+User = get_user_model()
+
+URL_CURRENT_USR = reverse('users:current-user-profile')
+URL_CURRENT_USER_DISPLAY = reverse('users:current-user')
+
+
+class PayloadCacheTests(TestCase):
+    """Test the cached current user and profile payloads"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..',
+            profile={'company': 'TestCompany'})
+        self.client.force_authenticate(self.user)
+
+    def test_profile_hit_skips_profile_query(self):
+        """Test a cached profile costs only the etag query"""
+        first = self.client.get(URL_CURRENT_USR)
+        self.user = User.objects.get(pk=self.user.pk)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            resp = self.client.get(URL_CURRENT_USR)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data, first.data)
+
+    def test_current_user_hit(self):
+        first = self.client.get(URL_CURRENT_USER_DISPLAY)
+        self.user = User.objects.get(pk=self.user.pk)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            resp = self.client.get(URL_CURRENT_USER_DISPLAY)
+        self.assertEqual(resp.data, first.data)
+
+    def test_profile_save_invalidates(self):
+        """Test saving the profile drops both payloads"""
+        self.client.get(URL_CURRENT_USR)
+        self.client.get(URL_CURRENT_USER_DISPLAY)
+        profile = Profile.objects.get(user=self.user)
+        profile.company = 'NewCompany'
+        profile.save()
+        self.assertIsNone(payload_cache.local.get(f'profile:{self.user.pk}'))
+        self.assertIsNone(payload_cache.local.get(f'user:{self.user.pk}'))
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        self.assertEqual(
+            self.client.get(URL_CURRENT_USER_DISPLAY).data['profile']['company'],
+            'NewCompany')
+
+    def test_queryset_update_is_not_served_stale(self):
+        """Test rows changed without signals change the version"""
+        self.client.get(URL_CURRENT_USR)
+        Profile.objects.filter(user=self.user).update(
+            company='NewCompany', udpated_at=timezone.now())
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        resp = self.client.get(URL_CURRENT_USR)
+        self.assertEqual(resp.data['company'], 'NewCompany')
+
+    def test_patch_response_and_next_get(self):
+        self.client.get(URL_CURRENT_USR)
+        self.client.patch(URL_CURRENT_USR, {'company': 'NewCompany'})
+        self.assertEqual(self.client.get(URL_CURRENT_USR).data['company'], 'NewCompany')
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Profile
+from users.api.serializers import ProfileSerializerForAdmin
+
+User = get_user_model()
+
+URL_BATCH = reverse('users:profile-batch')
+
+
+class ProfileBatchTests(TestCase):
+    """Test the batch retrieve of profiles by id"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@domain.com', first_name='Admin', last_name='Testsurname',
+            password='Testing321..', is_staff=True)
+        for i in range(3):
+            User.objects.create_user(
+                email=f'user{i}@domain.com', first_name='UserFirstName',
+                last_name='Testsurname', password='Testing321..',
+                profile={'company': f'Company{i}'})
+        self.client.force_authenticate(self.admin)
+        self.ids = list(Profile.objects.order_by('id').values_list('id', flat=True))
+
+    def get(self, ids, **params):
+        return self.client.get(URL_BATCH, {'ids': ids, **params})
+
+    def test_keyed_by_id_in_one_query(self):
+        ids = [self.ids[2], self.ids[0]]
+        with self.assertNumQueries(1):
+            resp = self.get(','.join(map(str, ids)))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(resp.data['results']), [str(pk) for pk in ids])
+        profile = Profile.objects.select_related('user').get(pk=ids[0])
+        self.assertEqual(resp.data['results'][str(ids[0])], ProfileSerializerForAdmin(profile).data)
+        self.assertEqual(resp.data['missing'], [])
+
+    def test_missing_and_duplicate_ids(self):
+        missing = self.ids[-1] + 100
+        resp = self.get(f'{self.ids[1]},{missing},{self.ids[1]}')
+        self.assertEqual(list(resp.data['results']), [str(self.ids[1])])
+        self.assertEqual(resp.data['missing'], [missing])
+
+    def test_sparse_fields(self):
+        resp = self.get(str(self.ids[1]), fields='company')
+        self.assertEqual(resp.json()['results'], {str(self.ids[1]): {'company': 'Company0'}})
+
+    @override_settings(PROFILE_BATCH_MAX_IDS=2)
+    def test_cap(self):
+        resp = self.get(','.join(map(str, self.ids[:3])))
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(resp.data, {'ids': 'At most 2 ids per request.'})
+
+    def test_invalid_ids(self):
+        for ids in ('', ' , ', '1,a'):
+            resp = self.get(ids)
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('ids', resp.data)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(User.objects.get(email='user0@domain.com'))
+        resp = self.get(str(self.ids[0]))
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Profile
+from users.api.payloads import payload_cache
+
+User = get_user_model()
+
+URL_BULK = reverse('users:profile-bulk')
+URL_CURRENT_USR = reverse('users:current-user-profile')
+
+
+class ProfileBulkUpdateTests(TestCase):
+    """Test the bulk PATCH of profiles"""
+
+    def setUp(self):
+        payload_cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@domain.com', first_name='Admin', last_name='Testsurname',
+            password='Testing321..', is_staff=True)
+        self.users = [
+            User.objects.create_user(
+                email=f'user{i}@domain.com', first_name='UserFirstName',
+                last_name='Testsurname', password='Testing321..',
+                profile={'company': 'TestCompany', 'city': 'SomeCity'})
+            for i in range(3)]
+        self.ids = [user.profile.pk for user in self.users]
+        self.client.force_authenticate(self.admin)
+
+    def patch(self, items):
+        return self.client.patch(URL_BULK, items, format='json')
+
+    def test_updates_in_one_statement(self):
+        before = {p.pk: p.udpated_at for p in Profile.objects.filter(pk__in=self.ids)}
+        items = [
+            {'id': self.ids[0], 'position': 'Pilot'},
+            {'id': self.ids[1], 'city': 'OtherCity', 'position': 'Engineer'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.patch(items)
+        statements = [q['sql'].split()[0] for q in queries.captured_queries
+                      if 'SAVEPOINT' not in q['sql']]
+        # the locked rows, one UPDATE, the payloads
+        self.assertEqual(statements, ['SELECT', 'UPDATE', 'SELECT'])
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        results = resp.json()['results']
+        self.assertEqual([r['status'] for r in results], [200, 200])
+        self.assertEqual(results[0]['data']['position'], 'Pilot')
+        self.assertEqual(results[0]['data']['city'], 'SomeCity')
+        self.assertEqual(results[1]['data']['user'], 'user1@domain.com')
+
+        profiles = Profile.objects.in_bulk(self.ids)
+        self.assertEqual(profiles[self.ids[0]].position, 'Pilot')
+        self.assertEqual(profiles[self.ids[0]].city, 'SomeCity')
+        self.assertEqual(profiles[self.ids[1]].city, 'OtherCity')
+        self.assertGreater(profiles[self.ids[1]].udpated_at, before[self.ids[1]])
+        self.assertEqual(profiles[self.ids[2]].udpated_at, before[self.ids[2]])
+
+    def test_per_item_errors(self):
+        missing = max(self.ids) + 100
+        resp = self.patch([
+            {'id': self.ids[0], 'city': 'x' * 500},
+            {'id': missing, 'city': 'OtherCity'},
+            {'city': 'OtherCity'},
+            {'id': self.ids[1], 'city': 'OtherCity'},
+            {'id': self.ids[1], 'city': 'ThirdCity'},
+        ])
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        results = resp.json()['results']
+        self.assertEqual([r['status'] for r in results], [400, 404, 400, 200, 400])
+        self.assertIn('city', results[0]['errors'])
+        self.assertEqual(results[1], {'id': missing, 'status': 404, 'errors': {'id': 'Not found.'}})
+        self.assertEqual(results[4]['errors'], {'id': 'Duplicate id.'})
+        profiles = Profile.objects.in_bulk(self.ids)
+        self.assertEqual(profiles[self.ids[0]].city, 'SomeCity')
+        self.assertEqual(profiles[self.ids[1]].city, 'OtherCity')
+
+    def test_cached_payloads_dropped(self):
+        owner = APIClient()
+        owner.force_authenticate(self.users[0])
+        self.assertEqual(owner.get(URL_CURRENT_USR).json()['position'], None)
+        self.patch([{'id': self.ids[0], 'position': 'Pilot'}])
+        self.assertEqual(owner.get(URL_CURRENT_USR).json()['position'], 'Pilot')
+
+    @override_settings(PROFILE_BULK_MAX_ITEMS=2)
+    def test_invalid_body(self):
+        for body in ([], {'id': self.ids[0]}, [{'id': pk} for pk in self.ids]):
+            resp = self.patch(body)
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(resp.json(), {'profiles': 'A list of 1 to 2 profile updates is required.'})
+
+    def test_admins_only(self):
+        self.client.force_authenticate(self.users[0])
+        resp = self.patch([{'id': self.ids[0], 'position': 'Pilot'}])
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
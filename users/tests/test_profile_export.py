@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Profile
+
+User = get_user_model()
+
+URL_PROFILE_EXPORT = reverse('users:profile-export')
+
+
+class ProfileExportTests(TestCase):
+    """Test the streaming profile export"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@domain.com', first_name='Admin',
+            last_name='Testsurname', password='Testing321..', is_staff=True)
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..',
+            profile={'company': 'TestCompany', 'city': 'Şehir'})
+
+    def test_export_for_admin_only(self):
+        self.client.force_authenticate(self.user)
+        resp = self.client.get(URL_PROFILE_EXPORT)
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_ndjson(self):
+        """Test every profile is streamed as one json line"""
+        self.client.force_authenticate(self.admin)
+        resp = self.client.get(URL_PROFILE_EXPORT)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp.streaming)
+        self.assertTrue(resp['Content-Type'].startswith('application/x-ndjson'))
+
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), Profile.objects.count())
+        row = rows[-1]
+        self.assertEqual(row['email'], 'testunit@domain.com')
+        self.assertEqual(row['last_name'], 'TESTSURNAME')
+        self.assertEqual(row['company'], 'TestCompany')
+        self.assertEqual(row['city'], 'Şehir')
+
+    def test_export_csv(self):
+        self.client.force_authenticate(self.admin)
+        resp = self.client.get(URL_PROFILE_EXPORT, {'export_format': 'csv'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        content = b''.join(resp.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]['email'], 'testunit@domain.com')
+        self.assertEqual(rows[1]['company'], 'TestCompany')
+
+    def test_export_csv_formulas_escaped(self):
+        """Test user text is not run as a formula by spreadsheets"""
+        Profile.objects.filter(user=self.user).update(
+            company='=HYPERLINK("http://evil")', city='+1', position='-2', title='@SUM(A1)')
+        self.client.force_authenticate(self.admin)
+        resp = self.client.get(URL_PROFILE_EXPORT, {'export_format': 'csv'})
+        row = list(csv.DictReader(io.StringIO(b''.join(resp.streaming_content).decode())))[1]
+        self.assertEqual(row['company'], '\'=HYPERLINK("http://evil")')
+        self.assertEqual((row['city'], row['position'], row['title']), ("'+1", "'-2", "'@SUM(A1)"))
+        self.assertEqual(row['email'], 'testunit@domain.com')
+
+        resp = self.client.get(URL_PROFILE_EXPORT)
+        row = json.loads(b''.join(resp.streaming_content).decode().splitlines()[-1])
+        self.assertEqual(row['company'], '=HYPERLINK("http://evil")')
+
+    def test_export_unknown_format(self):
+        self.client.force_authenticate(self.admin)
+        resp = self.client.get(URL_PROFILE_EXPORT, {'export_format': 'xml'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,67 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Profile
+
+User = get_user_model()
+
+URL_USER_PROFILE_LIST = reverse('users:profile-list')
+
+
+def create_profiles(count, start=0):
+    """Creates users and profiles without hashing passwords"""
+    users = User.objects.bulk_create([
+        User(email=f'user{i}@domain.com', first_name='First', last_name='LAST')
+        for i in range(start, start + count)
+    ])
+    if users[0].pk is None:
+        users = User.objects.filter(
+            email__in=[user.email for user in users]).order_by('pk')
+    Profile.objects.bulk_create([
+        Profile(user=user, company='TestCompany') for user in users])
+
+
+@override_settings(PROFILE_PAGE_SIZE=5, PROFILE_MAX_PAGE_SIZE=8)
+class ProfileListPaginationTests(TestCase):
+    """Test cursor pagination of the admin profile list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@domain.com', first_name='Admin',
+            last_name='Testsurname', password='Testing321..', is_staff=True)
+        self.client.force_authenticate(self.admin)
+
+    def test_pages_follow_cursor(self):
+        """Test walking the cursor returns every profile once"""
+        create_profiles(12)
+        seen = []
+        url = URL_USER_PROFILE_LIST
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(resp.data['results']), 5)
+            seen += [profile['id'] for profile in resp.data['results']]
+            url = resp.data['next']
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), Profile.objects.count())
+        self.assertEqual(resp.data['results'][-1]['user'], 'user11@domain.com')
+
+    def test_page_size_cap(self):
+        create_profiles(12)
+        resp = self.client.get(URL_USER_PROFILE_LIST, {'page_size': 100})
+        self.assertEqual(len(resp.data['results']), 8)
+
+    def test_query_count_does_not_grow(self):
+        """Test a page costs the same number of queries for any table size"""
+        create_profiles(3)
+        with self.assertNumQueries(1):
+            self.client.get(URL_USER_PROFILE_LIST)
+        create_profiles(20, start=3)
+        with self.assertNumQueries(1):
+            resp = self.client.get(URL_USER_PROFILE_LIST)
+        self.assertEqual(len(resp.data['results']), 5)
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Profile
+from users.api import read_serializers
+from users.api.payloads import payload_cache
+from users.api.serializers import (
+    ProfileSerializer, ProfileSerializerForAdmin, UserDisplaySerializer)
+
+User = get_user_model()
+
+
+def render(data):
+    """JSON bytes, so keys order counts"""
+    return JSONRenderer().render(data)
+
+
+class ReadSerializerTests(TestCase):
+    """Test the .values() payloads are the ModelSerializer ones"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..',
+            profile={'company': 'TestCompany', 'city': 'Ünïcode'})
+        self.other = User.objects.create_user(
+            email='other@domain.com', first_name='Other',
+            last_name='Testsurname', password='Testing321..')
+        self.user.groups.add(Group.objects.create(name='b'), Group.objects.create(name='a'))
+        # Permission orders by app label, model, codename, not by id
+        self.user.user_permissions.add(
+            *Permission.objects.order_by('-id')[:3], *Permission.objects.order_by('id')[:3])
+
+    def test_user_display(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(2):
+            data = read_serializers.read(
+                UserDisplaySerializer, User.objects.filter(pk=self.user.pk))
+        self.assertEqual(render(data), render([UserDisplaySerializer(user).data]))
+        self.assertEqual(len(data[0]['user_permissions']), 6)
+
+    def test_many_users(self):
+        users = User.objects.order_by('id')
+        with self.assertNumQueries(2):
+            data = read_serializers.read(UserDisplaySerializer, users)
+        self.assertEqual(render(data), render(UserDisplaySerializer(users, many=True).data))
+        self.assertEqual(data[1]['groups'], [])
+
+    def test_missing_profile(self):
+        Profile.objects.filter(user=self.other).delete()
+        user = User.objects.get(pk=self.other.pk)
+        data = read_serializers.read(UserDisplaySerializer, User.objects.filter(pk=user.pk))
+        self.assertIsNone(data[0]['profile'])
+        self.assertEqual(render(data), render([UserDisplaySerializer(user).data]))
+
+    def test_profiles(self):
+        profiles = Profile.objects.select_related('user').order_by('id')
+        for serializer_class in (ProfileSerializer, ProfileSerializerForAdmin):
+            with self.assertNumQueries(1):
+                data = read_serializers.read(serializer_class, profiles)
+            self.assertEqual(render(data), render(serializer_class(profiles, many=True).data))
+
+    def test_nested_relation_not_joined_back(self):
+        plan = read_serializers.plan_for(UserDisplaySerializer)
+        self.assertIn('email', plan.columns)
+        self.assertNotIn('profile__user__email', plan.columns)
+
+    def test_unsupported_field(self):
+        class Serializer(serializers.ModelSerializer):
+            full_name = serializers.SerializerMethodField()
+
+            class Meta:
+                model = User
+                fields = ('id', 'full_name')
+
+        with self.assertRaises(ImproperlyConfigured):
+            read_serializers.FieldPlan(Serializer)
+
+
+class ReadEndpointTests(TestCase):
+    """Test the endpoints answer what the ModelSerializers produced"""
+
+    def setUp(self):
+        payload_cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@domain.com', first_name='Admin', last_name='Testsurname',
+            password='Testing321..', is_staff=True, profile={'company': 'TestCompany'})
+        self.admin.user_permissions.add(*Permission.objects.order_by('-id')[:2])
+        self.client.force_authenticate(self.admin)
+
+    def test_current_user(self):
+        resp = self.client.get(reverse('users:current-user'))
+        user = User.objects.get(pk=self.admin.pk)
+        self.assertEqual(resp.content, render(UserDisplaySerializer(user).data))
+
+    def test_current_user_profile(self):
+        resp = self.client.get(reverse('users:current-user-profile'))
+        self.assertEqual(resp.content, render(ProfileSerializer(self.admin.profile).data))
+
+    def test_profile_list_and_search(self):
+        profiles = Profile.objects.select_related('user').order_by('id')
+        expected = render(ProfileSerializerForAdmin(profiles, many=True).data)
+        for url in (reverse('users:profile-list'),
+                    reverse('users:profile-search') + '?q=admin'):
+            resp = self.client.get(url)
+            self.assertEqual(render(resp.data['results']), expected)
@@ -0,0 +1,132 @@
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Profile
+from users.services import register_user
+
+User = get_user_model()
+
+URL_API_REGISTER = reverse('users:api-user-register')
+URL_WEB_REGISTER = reverse('web-register')
+
+PROFILE_INFO = {
+    'title': 'mr.',
+    'company': 'TestCompany',
+    'position': 'Director',
+    'country': 'Kyrat',
+    'city': 'SomeCity',
+}
+
+# HELPER FUNCTIONS
+class CaptureWrites:
+    """Collects INSERT / UPDATE / DELETE statements
+        execute_wrapper is used since the test client resets
+        connection.queries when a request starts
+    """
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.split(' ', 1)[0] in ('INSERT', 'UPDATE', 'DELETE'):
+            self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self.statements
+
+    def __exit__(self, *exc_info):
+        return self._wrapper.__exit__(*exc_info)
+
+
+class RegisterServiceTests(TestCase):
+    """Test users.services.register_user"""
+
+    def setUp(self):
+        self.params = dict(
+            email='testunit@domain.com',
+            first_name='UserFirstName',
+            last_name='Testsurname',
+            password='Testing321..',
+            **PROFILE_INFO
+        )
+
+    def test_register_creates_user_and_profile(self):
+        """Test user and populated profile are created"""
+        user = register_user(**self.params)
+        self.assertTrue(user.check_password(self.params['password']))
+        profile = Profile.objects.get(user=user)
+        for field, value in PROFILE_INFO.items():
+            self.assertEqual(getattr(profile, field), value)
+
+    def test_register_costs_two_inserts(self):
+        """Test registration writes only one user and one profile row"""
+        with CaptureWrites() as writes:
+            register_user(**self.params)
+        self.assertEqual(len(writes), 2)
+        self.assertTrue(all(sql.startswith('INSERT') for sql in writes))
+
+    def test_register_hashes_password_once(self):
+        """Test PBKDF2 runs only once per registration"""
+        with mock.patch.object(
+                PBKDF2PasswordHasher, 'encode', autospec=True,
+                side_effect=PBKDF2PasswordHasher.encode) as encode:
+            register_user(**self.params)
+        self.assertEqual(encode.call_count, 1)
+
+    def test_register_is_atomic(self):
+        """Test no user is left behind if the profile insert fails"""
+        with mock.patch.object(
+                Profile.objects, 'create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                register_user(**self.params)
+        self.assertFalse(User.objects.filter(email=self.params['email']).exists())
+
+
+class RegisterEndpointsQueryTests(TestCase):
+    """Guards the number of writes of web and api registration"""
+
+    def test_api_register_writes(self):
+        """Test api registration writes one user and one profile"""
+        client = APIClient()
+        with CaptureWrites() as writes:
+            resp = client.post(URL_API_REGISTER, {
+                'email': 'testunit@domain.com',
+                'verify_email': 'testunit@domain.com',
+                'first_name': 'UserFirstName',
+                'last_name': 'Testsurname',
+                'password': 'Testing321..',
+                'verify_password': 'Testing321..',
+                **PROFILE_INFO
+            })
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(writes), 2)
+
+    def test_web_register_writes_and_login(self):
+        """Test web registration writes two rows and the user can login"""
+        client = Client()
+        with CaptureWrites() as writes:
+            resp = client.post(URL_WEB_REGISTER, {
+                'first_name': 'UserFirstName',
+                'last_name': 'Testsurname',
+                'password1': 'Testing321..',
+                'password2': 'Testing321..',
+                'email': 'testunit@domain.com',
+                'verify_email': 'testunit@domain.com',
+                **PROFILE_INFO
+            })
+        self.assertRedirects(resp, reverse('web-login'))
+        # messages are stored in the cookie, only user and profile are written
+        self.assertEqual(len(writes), 2)
+        profile = Profile.objects.get(user__email='testunit@domain.com')
+        self.assertEqual(profile.company, PROFILE_INFO['company'])
+        self.assertTrue(client.login(email='testunit@domain.com', password='Testing321..'))
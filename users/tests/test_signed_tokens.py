@@ -0,0 +1,173 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.api import tokens
+from users.api.authentication import SignedAccessTokenAuthentication
+
+User = get_user_model()
+
+URL_REST_AUTH_LOGIN = reverse('users:rest_login')
+URL_REST_AUTH_LOGOUT = reverse('users:rest_logout')
+URL_TOKEN_REFRESH = reverse('users:token-refresh')
+URL_CURRENT_USER_DISPLAY = reverse('users:current-user')
+URL_USER_PROFILE_LIST = reverse('users:profile-list')
+URL_REST_AUTH_PASSWORD_CHANGE = reverse('users:rest_password_change')
+
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-shared',
+    },
+}
+
+
+@override_settings(API_SIGNED_TOKENS=True, REST_SESSION_LOGIN=False, CACHES=SHARED_CACHES)
+class SignedTokenTests(TestCase):
+    """Test the opt-in signed access tokens"""
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        self.client = APIClient()
+        self.email = 'testunit@domain.com'
+        self.password = 'Testing321..'
+        self.user = User.objects.create_user(
+            email=self.email, first_name='UserFirstName',
+            last_name='Testsurname', password=self.password)
+
+    def login(self):
+        resp = self.client.post(URL_REST_AUTH_LOGIN, {
+            'email': self.email, 'password': self.password})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return resp.data
+
+    def authenticate(self, access):
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return SignedAccessTokenAuthentication().authenticate(request)
+
+    def test_login_returns_token_pair(self):
+        """Test login answers with signed tokens instead of a DRF token"""
+        data = self.login()
+        self.assertIn('access', data)
+        self.assertIn('refresh', data)
+        self.assertEqual(data['token_type'], 'Bearer')
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+    def test_access_token_needs_no_query(self):
+        """Test verifying an access token makes no database query"""
+        access = self.login()['access']
+        with self.assertNumQueries(0):
+            user, claims = self.authenticate(access)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, self.email)
+        self.assertFalse(user.is_staff)
+
+    def test_current_user_with_access_token(self):
+        access = self.login()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        resp = self.client.get(URL_CURRENT_USER_DISPLAY)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['email'], self.email)
+        self.assertIsNotNone(resp.data['timestamp'])
+        # permissions use the claims
+        resp = self.client.get(URL_USER_PROFILE_LIST)
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_refresh_token_rotation(self):
+        """Test refresh answers a new pair and the used token is revoked"""
+        refresh = self.login()['refresh']
+        resp = self.client.post(URL_TOKEN_REFRESH, {'refresh': refresh})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('access', resp.data)
+        resp = self.client.post(URL_TOKEN_REFRESH, {'refresh': refresh})
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_is_not_access_token(self):
+        refresh = self.login()['refresh']
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(refresh)
+
+    def test_logout_revokes_tokens(self):
+        """Test logout puts the access and refresh tokens on the revocation list"""
+        data = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {data["access"]}')
+        resp = self.client.post(URL_REST_AUTH_LOGOUT, {'refresh': data['refresh']})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(data['access'])
+        self.client.credentials()
+        resp = self.client.post(URL_TOKEN_REFRESH, {'refresh': data['refresh']})
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_tokens(self):
+        access = self.login()['access']
+        self.user.set_password('NewTesting321..')
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+
+    def test_claims_change_revokes_tokens(self):
+        """Test a demoted admin loses the admin claims of their tokens"""
+        self.user.is_staff = True
+        self.user.save()
+        access = self.login()['access']
+        self.assertTrue(self.authenticate(access)[0].is_staff)
+        self.user.is_staff = False
+        self.user.save(update_fields=['is_staff'])
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+
+    def test_other_changes_keep_tokens(self):
+        access = self.login()['access']
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        user.profile.save()
+        self.assertEqual(self.authenticate(access)[0].pk, self.user.pk)
+
+    @override_settings(CACHES={'default': SHARED_CACHES['default']})
+    def test_shared_revocation_cache_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            tokens.revocation_cache()
+        with self.settings(API_SIGNED_TOKENS=False):
+            self.assertIsNone(tokens.revocation_cache())
+            tokens.revoke_user(self.user.pk)
+
+    def test_password_change_with_access_token(self):
+        """Test writing requests get the user row, not the claims user"""
+        access = self.login()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        resp = self.client.post(URL_REST_AUTH_PASSWORD_CHANGE, {
+            'new_password1': 'NewTesting321..', 'new_password2': 'NewTesting321..'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('NewTesting321..'))
+        self.assertIsNotNone(self.user.timestamp)
+
+    def test_claims_user_refuses_save(self):
+        user, _ = self.authenticate(self.login()['access'])
+        with self.assertRaises(TypeError):
+            user.save()
+
+    def test_tampered_token(self):
+        access = self.login()['access']
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access[:-2] + 'xx')
+
+    @override_settings(API_SIGNED_TOKENS=False)
+    def test_disabled_by_default(self):
+        """Test bearer tokens are ignored when the mode is off"""
+        self.assertIsNone(self.authenticate('something'))
+        resp = self.client.post(URL_TOKEN_REFRESH, {'refresh': 'something'})
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
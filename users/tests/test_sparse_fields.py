@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.api.payloads import payload_cache
+
+User = get_user_model()
+
+URL_CURRENT_USER_DISPLAY = reverse('users:current-user')
+URL_CURRENT_USR = reverse('users:current-user-profile')
+URL_PROFILES = reverse('users:profile-list')
+
+
+class SparseFieldsTests(TestCase):
+    """Test ?fields= / ?expand= on the users.api reads"""
+
+    def setUp(self):
+        payload_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..', is_staff=True,
+            profile={'company': 'TestCompany'})
+        self.user.user_permissions.add(Permission.objects.first())
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        # the last query reads the payload, the ETag one comes first
+        return resp.json(), queries.captured_queries[-1]['sql']
+
+    def test_current_user_fields(self):
+        data, sql = self.get(URL_CURRENT_USER_DISPLAY, fields='email,profile.company')
+        self.assertEqual(data, {'profile': {'company': 'TestCompany'}, 'email': 'testunit@domain.com'})
+        self.assertNotIn('last_name', sql)
+        self.assertNotIn('permission', sql)
+
+    def test_unused_join_skipped(self):
+        data, sql = self.get(URL_CURRENT_USER_DISPLAY, fields='email')
+        self.assertEqual(data, {'email': 'testunit@domain.com'})
+        self.assertNotIn('core_profile', sql)
+
+        data, sql = self.get(URL_PROFILES, fields='id,company')
+        self.assertEqual(data['results'], [{'id': self.user.profile.pk, 'company': 'TestCompany'}])
+        self.assertNotIn('core_user', sql)
+
+    def test_many_to_many_read_when_asked(self):
+        data, sql = self.get(URL_CURRENT_USER_DISPLAY, fields='user_permissions')
+        self.assertEqual(data, {'user_permissions': [Permission.objects.first().pk]})
+        self.assertIn('core_user_user_permissions', sql)
+
+    def test_expand_user(self):
+        user = {'id': self.user.pk, 'email': 'testunit@domain.com',
+                'first_name': 'UserFirstName', 'last_name': 'TESTSURNAME'}
+        data, _ = self.get(URL_CURRENT_USR, fields='user,company', expand='user')
+        self.assertEqual(data, {'user': user, 'company': 'TestCompany'})
+        data, _ = self.get(URL_PROFILES, fields='user.email', expand='user')
+        self.assertEqual(data['results'], [{'user': {'email': 'testunit@domain.com'}}])
+        data, _ = self.get(reverse('users:profile-detail', args=[self.user.profile.pk]), expand='user')
+        self.assertEqual(data['user'], user)
+        self.assertEqual(data['company'], 'TestCompany')
+
+    def test_without_params_unchanged(self):
+        full = self.client.get(URL_CURRENT_USER_DISPLAY).json()
+        self.assertEqual(self.client.get(URL_CURRENT_USER_DISPLAY, {'fields': ''}).json(), full)
+        self.assertEqual(full['profile']['company'], 'TestCompany')
+        self.assertNotIn('search_text', full)
+        self.assertNotIn('password', full)
+
+    def test_trimmed_from_cached_payload(self):
+        """Test a sparse read of a cached payload costs only the ETag query"""
+        self.client.get(URL_CURRENT_USR)
+        with self.assertNumQueries(1):
+            resp = self.client.get(URL_CURRENT_USR, {'fields': 'company'})
+        self.assertEqual(resp.json(), {'company': 'TestCompany'})
+
+    def test_unknown_names(self):
+        for params, error in (
+                ({'fields': 'company,nope'}, {'fields': 'Unknown fields: nope.'}),
+                ({'fields': 'company.name'}, {'fields': 'Unknown fields: company.name.'}),
+                ({'expand': 'company'}, {'expand': 'Cannot expand: company.'})):
+            resp = self.client.get(URL_PROFILES, params)
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(resp.json(), error)
@@ -0,0 +1,187 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.api.authentication import CachedTokenAuthentication, token_cache
+
+User = get_user_model()
+
+URL_CURRENT_USER_DISPLAY = reverse('users:current-user')
+URL_REST_AUTH_LOGOUT = reverse('users:rest_logout')
+
+
+SHARED_CACHE = override_settings(
+    TOKEN_AUTH_CACHE_ALIAS='default',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+
+
+@SHARED_CACHE
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self):
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return self.auth.authenticate(request)
+
+    def test_second_lookup_is_cached(self):
+        """Test only the first authentication hits the database"""
+        before = token_cache.stats()
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        with self.assertNumQueries(0):
+            cached_user, cached_token = self.authenticate()
+        self.assertEqual(cached_user, self.user)
+        self.assertEqual(cached_user.email, self.user.email)
+        self.assertEqual(cached_token.key, self.token.key)
+        # a fresh instance per request
+        self.assertIsNot(user, cached_user)
+        stats = token_cache.stats()
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+
+    def test_invalid_token(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION='Token wrongkey')
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate(request)
+
+    def test_deactivation_invalidates(self):
+        """Test a deactivated user cannot use the cached token"""
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_change_invalidates(self):
+        """Test the user is reloaded after a password change"""
+        self.authenticate()
+        self.user.set_password('NewTesting321..')
+        self.user.save()
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+        self.assertTrue(user.check_password('NewTesting321..'))
+
+    def test_password_not_cached(self):
+        """Test the password hash stays out of the cache, loaded on access"""
+        self.authenticate()
+        entry = token_cache.get(self.token.key)
+        self.assertNotIn(self.user.password, entry['user'])
+        user, _ = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('Testing321..'))
+
+    def test_logout_invalidates(self):
+        """Test rest-auth logout deletes the token from the cache"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        resp = client.get(URL_CURRENT_USER_DISPLAY)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_cache), 1)
+
+        resp = client.post(URL_REST_AUTH_LOGOUT)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_cache), 0)
+        resp = client.get(URL_CURRENT_USER_DISPLAY)
+        # SessionAuthentication comes first, so failures are 403
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@SHARED_CACHE
+class SharedTokenCacheTests(TestCase):
+    """Test the shared cache tier"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..')
+        self.token = Token.objects.create(user=self.user)
+        self.request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_shared_tier_hit(self):
+        """Test another process (empty local tier) uses the shared cache"""
+        CachedTokenAuthentication().authenticate(self.request)
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            user, _ = CachedTokenAuthentication().authenticate(self.request)
+        self.assertEqual(user, self.user)
+
+    def test_shared_tier_invalidation(self):
+        """Test deactivation drops the shared entry too"""
+        CachedTokenAuthentication().authenticate(self.request)
+        self.user.is_active = False
+        self.user.save()
+        token_cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate(self.request)
+
+    def test_other_process_local_entry_dropped(self):
+        """Test a local entry of another process is not used after a deactivation"""
+        CachedTokenAuthentication().authenticate(self.request)
+        entry = token_cache.get(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        # the LRU of another worker still holds the entry
+        token_cache.set(self.token.key, entry)
+        with self.assertRaises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate(self.request)
+
+    def test_other_process_logout(self):
+        """Test a token deleted in another process is rejected at once"""
+        CachedTokenAuthentication().authenticate(self.request)
+        entry = token_cache.get(self.token.key)
+        self.token.delete()
+        token_cache.set(self.token.key, entry)
+        with self.assertRaises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate(self.request)
+
+
+@override_settings(TOKEN_AUTH_CACHE_ALIAS=None)
+class NoSharedTokenCacheTests(TestCase):
+    """Test nothing is cached when other processes cannot be told"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..')
+        self.token = Token.objects.create(user=self.user)
+        self.request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_not_cached(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                CachedTokenAuthentication().authenticate(self.request)
+        self.assertEqual(len(token_cache), 0)
+
+    @override_settings(TOKEN_AUTH_CACHE_LOCAL_ONLY=True)
+    def test_local_only(self):
+        """Test the opt-in per process LRU, invalidated in this process"""
+        CachedTokenAuthentication().authenticate(self.request)
+        with self.assertNumQueries(0):
+            user, _ = CachedTokenAuthentication().authenticate(self.request)
+        self.assertEqual(user, self.user)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate(self.request)
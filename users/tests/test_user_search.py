@@ -0,0 +1,42 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+User = get_user_model()
+
+URL_PROFILE_SEARCH = reverse('users:profile-search')
+
+
+class ProfileSearchAPITests(TestCase):
+    """Test /api/user/profiles/search/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@domain.com', first_name='Admin',
+            last_name='Testsurname', password='Testing321..', is_staff=True)
+        self.user = User.objects.create_user(
+            email='testunit@domain.com', first_name='UserFirstName',
+            last_name='Testsurname', password='Testing321..',
+            profile={'company': 'TestCompany'})
+
+    def test_search_profiles(self):
+        self.client.force_authenticate(self.admin)
+        resp = self.client.get(URL_PROFILE_SEARCH, {'q': 'TestUnit'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.data['results']), 1)
+        self.assertEqual(resp.data['results'][0]['user'], 'testunit@domain.com')
+        self.assertEqual(resp.data['results'][0]['company'], 'TestCompany')
+
+    def test_search_requires_term(self):
+        self.client.force_authenticate(self.admin)
+        resp = self.client.get(URL_PROFILE_SEARCH)
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_for_admin_only(self):
+        self.client.force_authenticate(self.user)
+        resp = self.client.get(URL_PROFILE_SEARCH, {'q': 'admin'})
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
@@ -2,7 +2,7 @@ from django.shortcuts import render, redirect
 from django.urls import reverse
 from users.forms import UserRegisterForm, ProfileRegisterForm, UserUpdateForm
 from django.contrib import messages
-from core.models import Profile
+from users.services import register_user
 from django.contrib.auth import get_user_model
 # USER AUTH IMPORTS
 from django.shortcuts import reverse
@@ -22,19 +22,13 @@ def Register(request):
 
         if u_form.is_valid() and p_form.is_valid():
             email = u_form.cleaned_data.get('email')
-            user = u_form.save()
-            user.set_password(user.password)
-            user.save()
-
-            profile = Profile.objects.get(user=user)  # Created via signals
-
-            profile.title = p_form.cleaned_data.get('title')
-            profile.company = p_form.cleaned_data.get('company')
-            profile.position = p_form.cleaned_data.get('position')
-            profile.country = p_form.cleaned_data.get('country')
-            profile.city = p_form.cleaned_data.get('city')
-
-            profile.save()
+            register_user(
+                email=email,
+                first_name=u_form.cleaned_data.get('first_name'),
+                last_name=u_form.cleaned_data.get('last_name'),
+                password=u_form.cleaned_data.get('password1'),
+                **p_form.cleaned_data
+            )
 
             messages.success(
                 request, f'Account is succesfully created for {email}. You can login now.')